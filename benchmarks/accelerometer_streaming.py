@@ -0,0 +1,109 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+"""Compare per-sample and batched sample streaming of the real-time-accelerometer example.
+
+The sketch notifies 62.5 samples per second. The benchmark replays a number of simulated seconds of samples
+as fast as possible and reports, per simulated second, how many websocket messages the clients receive,
+how many bytes go on the wire and how much CPU time the Python side spends.
+
+Usage:
+    python benchmarks/accelerometer_streaming.py [--seconds 60] [--clients 4] [--flush-hz 15]
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "examples", "real-time-accelerometer", "python"))
+
+from sample_stream import SampleRingBuffer, SampleStreamer  # noqa: E402
+
+SENSOR_HZ = 62.5
+
+
+class FakeWebUI:
+    """Counts and serializes the messages the WebUI brick would emit to every connected client."""
+
+    def __init__(self, clients: int):
+        self.clients = clients
+        self.messages = 0
+        self.bytes = 0
+
+    def send_message(self, message_type: str, message: dict | str, room: str = None):
+        attachments = []
+
+        def _binary(obj):
+            attachments.append(obj)
+            return {"_placeholder": True, "num": len(attachments) - 1}
+
+        packet = json.dumps([message_type, message], default=_binary).encode("utf-8")
+        size = len(packet) + sum(len(a) for a in attachments)
+        for _ in range(self.clients):
+            # Every client gets its own copy of the frames
+            bytes(packet)
+            for a in attachments:
+                bytes(a)
+        self.messages += self.clients
+        self.bytes += size * self.clients
+
+
+def _sensor(i: int) -> tuple[float, float, float]:
+    return math.sin(i / 10), math.cos(i / 10), 1.0 + math.sin(i / 30) / 10
+
+
+def run_per_sample(seconds: int, clients: int) -> FakeWebUI:
+    ui = FakeWebUI(clients)
+    samples = SampleRingBuffer(200)
+    for i in range(int(seconds * SENSOR_HZ)):
+        x, y, z = _sensor(i)
+        sample = {"t": time.time(), "x": float(x), "y": float(y), "z": float(z)}
+        samples.append(sample["t"], sample["x"], sample["y"], sample["z"])
+        ui.send_message("sample", sample)
+    return ui
+
+
+def run_batched(seconds: int, clients: int, flush_hz: float, encoding: str) -> FakeWebUI:
+    ui = FakeWebUI(clients)
+    samples = SampleRingBuffer(200)
+    streamer = SampleStreamer(ui, samples, rate_hz=flush_hz, encoding=encoding)
+    samples_per_flush = SENSOR_HZ / flush_hz
+    next_flush = samples_per_flush
+    for i in range(int(seconds * SENSOR_HZ)):
+        x, y, z = _sensor(i)
+        samples.append(time.time(), float(x), float(y), float(z))
+        if i + 1 >= next_flush:
+            streamer.flush()
+            next_flush += samples_per_flush
+    streamer.flush()
+    return ui
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=60, help="Simulated seconds of sensor data")
+    parser.add_argument("--clients", type=int, default=4, help="Number of connected browsers")
+    parser.add_argument("--flush-hz", type=float, default=15.0, help="Batch flush rate")
+    args = parser.parse_args()
+
+    scenarios = [
+        ("per-sample", lambda: run_per_sample(args.seconds, args.clients)),
+        ("batched columnar", lambda: run_batched(args.seconds, args.clients, args.flush_hz, "columnar")),
+        ("batched binary", lambda: run_batched(args.seconds, args.clients, args.flush_hz, "binary")),
+    ]
+
+    print(f"{args.seconds} s of samples at {SENSOR_HZ} Hz, {args.clients} clients, flush at {args.flush_hz} Hz")
+    print(f"{'mode':<18} {'msgs/s':>10} {'bytes/s':>12} {'cpu ms/s':>10}")
+    for name, run in scenarios:
+        start = time.process_time()
+        ui = run()
+        cpu = time.process_time() - start
+        print(f"{name:<18} {ui.messages / args.seconds:>10.1f} {ui.bytes / args.seconds:>12.0f} {cpu * 1000 / args.seconds:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+"""Compare direct and cached AQI lookups of the air-quality-monitoring example against a local stand-in API.
+
+The stand-in serves AQICN-like feed responses after a configurable latency, and can be switched to failing
+(HTTP 503) or hanging. In "direct" mode every Bridge call makes a new `requests.get`, like the original App.
+In "cached" mode calls are answered by an AirQualityClient refreshed in the background. The benchmark reports the
+call latency seen by the sketch and the number of upstream requests, with the API healthy, failing and hanging.
+
+Usage:
+    python benchmarks/air_quality_cache.py [--calls 100] [--latency-ms 150]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "examples", "air-quality-monitoring", "python"))
+
+from air_quality_client import AirQualityClient  # noqa: E402
+
+
+class StandInAPI:
+    """Local HTTP server answering like the AQICN feed API."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.mode = "ok"  # "ok", "fail" or "hang"
+        self.requests = 0
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                api.requests += 1
+                if api.mode == "hang":
+                    time.sleep(30)
+                time.sleep(api.latency)
+                if api.mode == "fail":
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                body = json.dumps({"status": "ok", "data": {"aqi": 42, "city": {"name": "Torino"}}}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.endpoint = f"http://127.0.0.1:{self.server.server_port}/feed/Torino/?token=demo"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+def _calls(get, count: int, interval: float = 0.0) -> tuple[list[float], int]:
+    """Call get() count times, every interval seconds. Returns (latencies in seconds, failed calls)."""
+    latencies, failures = [], 0
+    for _ in range(count):
+        time.sleep(interval)
+        t0 = time.perf_counter()
+        try:
+            if get() is None:
+                failures += 1
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - t0)
+    return latencies, failures
+
+
+def run_direct(api: StandInAPI, count: int):
+    def get():
+        # Same as the original get_air_quality, with a timeout so that the hanging API doesn't hang the benchmark
+        response_json = requests.get(api.endpoint, timeout=10).json()
+        return response_json.get("data") if response_json.get("status") == "ok" else None
+
+    return _calls(get, count)
+
+
+def run_cached(api: StandInAPI, count: int, client: AirQualityClient, interval: float):
+    return _calls(client.get, count, interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100, help="Bridge calls per run")
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="Latency of the stand-in API")
+    args = parser.parse_args()
+
+    api = StandInAPI(args.latency_ms / 1000)
+    # A TTL shorter than the runs, so that refreshes happen during the benchmark
+    client = AirQualityClient(api.endpoint, ttl=0.5, retry_interval=0.5, timeout=(1.0, 1.0))
+    running = threading.Event()
+    running.set()
+
+    def refresher():
+        while running.is_set():
+            client.loop()
+
+    threading.Thread(target=refresher, daemon=True).start()
+    while client.get() is None:
+        time.sleep(0.01)
+
+    print(f"{args.calls} calls per run, API latency {args.latency_ms} ms")
+    print(f"{'API':<8} {'mode':<7} {'avg ms':>9} {'max ms':>9} {'failed':>7} {'upstream':>9}")
+    for mode in ("ok", "fail", "hang"):
+        api.mode = mode
+        # Like the sketch, which calls get_air_quality regularly, so that the data gets stale during the run
+        runs = [("cached", lambda: run_cached(api, args.calls, client, interval=args.latency_ms / 1000))]
+        if mode != "hang":
+            runs.insert(0, ("direct", lambda: run_direct(api, args.calls)))
+        for name, run in runs:
+            before = api.requests
+            latencies, failures = run()
+            print(f"{mode:<8} {name:<7} {sum(latencies) / len(latencies) * 1000:>9.3f} {max(latencies) * 1000:>9.3f} "
+                  f"{failures:>7} {api.requests - before:>9}")
+    running.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,593 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+"""Benchmark the handlers of every example App offline, against the stand-in bricks of `standins.py`.
+
+Each App runs in its own process: its python/main.py is loaded with the `arduino` package replaced by local
+stand-ins, then the handlers it registered are driven with synthetic load, one scenario after the other: Bridge
+notifications at sensor rates, websocket messages and image or audio uploads, REST requests, detection and
+camera callbacks. A scenario either runs at a fixed rate, like a sensor, or as fast as its clients can go, each
+client waiting for the answer to its request before sending the next one.
+
+For each scenario the benchmark reports the throughput, the p50/p95/p99 latencies of the operations, from the
+request to the answer the App sends back, and the peak memory allocated by Python while handling them (measured
+with tracemalloc in a second, shorter pass, so that tracing doesn't skew the latencies). The startup time and
+memory of each App are reported too. Results are written as JSON, and can be compared with the results of a
+previous revision to spot regressions.
+
+Usage:
+    python benchmarks/app_harness.py [--apps object-detection,blink] [--duration 3] [--output results.json]
+                                     [--compare previous.json] [--tolerance 0.2] [--fail-on-regression]
+"""
+
+import argparse
+import base64
+import io
+import json
+import math
+import os
+import platform
+import runpy
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import wave
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, UTC
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+EXAMPLES_DIR = os.path.join(ROOT, "examples")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import standins  # noqa: E402
+from standins import Runtime  # noqa: E402
+
+# Requests are answered within this time, or counted as errors
+REPLY_TIMEOUT = 10.0
+
+
+class Harness:
+    """Drives the handlers an App registered with the stand-in bricks."""
+
+    @property
+    def ui(self) -> standins.WebUI:
+        return Runtime.ui
+
+    def source(self, name: str):
+        """First instance of a stand-in brick class, e.g. the VideoObjectDetection stream of the App."""
+        return Runtime.sources[name][0]
+
+    def connect(self, sid: str):
+        if self.ui.on_connect_cb:
+            self.ui.on_connect_cb(sid)
+
+    def disconnect(self, sid: str):
+        if self.ui.on_disconnect_cb:
+            self.ui.on_disconnect_cb(sid)
+
+    def message(self, sid: str, message_type: str, data):
+        """Deliver a websocket message, without waiting for an answer."""
+        self.ui.handlers[message_type](sid, data)
+
+    def request(self, sid: str, message_type: str, data, replies: tuple[str, ...]):
+        """Deliver a websocket message, and wait for one of the `replies` message types to be sent to the client,
+        or broadcast.
+
+        Raises:
+            TimeoutError: If no reply is sent within REPLY_TIMEOUT.
+            RuntimeError: If the reply is an error message.
+        """
+        done = threading.Event()
+        reply = {}
+
+        def listener(reply_type, message, room):
+            if reply_type in replies and room in (sid, None) and not done.is_set():
+                reply["type"], reply["message"] = reply_type, message
+                done.set()
+
+        self.ui.add_listener(listener)
+        try:
+            self.ui.handlers[message_type](sid, data)
+            if not done.wait(REPLY_TIMEOUT):
+                raise TimeoutError(f"No reply to '{message_type}'")
+        finally:
+            self.ui.remove_listener(listener)
+        if "error" in reply["type"]:
+            raise RuntimeError(f"{reply['type']}: {reply['message']}")
+        return reply["message"]
+
+    def rest(self, method: str, path: str, *args, **kwargs):
+        """Call a REST route, with its path parameters as keyword arguments."""
+        return self.ui.routes[(method, path)](*args, **kwargs)
+
+    def bridge(self, method: str, *params):
+        """Call a Bridge provider, like the sketch does with Bridge.call or Bridge.notify."""
+        return Runtime.providers[method](*params)
+
+
+# (harness, operation index, client id) -> None. Performs one operation and returns when it is done.
+Operation = Callable[[Harness, int, str], None]
+
+
+@dataclass
+class Scenario:
+    name: str
+    op: Operation
+    rate: float | None = None  # Operations per second, None for as fast as possible
+    clients: int = 1  # Clients running operations concurrently, each waiting for its previous one
+    setup: Callable[[Harness], None] | None = None
+
+
+@dataclass
+class Measurement:
+    latencies: list[float] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+def _drive(harness: Harness, scenario: Scenario, duration: float, max_ops: int | None = None) -> Measurement:
+    result = Measurement()
+    lock = threading.Lock()
+    counter = iter(range(max_ops if max_ops is not None else sys.maxsize))
+    interval = scenario.clients / scenario.rate if scenario.rate else 0.0
+    start = time.perf_counter()
+    deadline = start + duration
+
+    def client(n: int):
+        sid = f"bench-{n}"
+        next_at = start + n * interval / scenario.clients
+        while True:
+            if interval:
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_at += interval
+            if time.perf_counter() >= deadline:
+                return
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            t0 = time.perf_counter()
+            try:
+                scenario.op(harness, i, sid)
+                latency, error = time.perf_counter() - t0, None
+            except Exception as e:
+                latency, error = time.perf_counter() - t0, f"{type(e).__name__}: {e}"
+            with lock:
+                result.latencies.append(latency)
+                if error is not None:
+                    result.errors.append(error)
+
+    threads = [threading.Thread(target=client, args=(n,), daemon=True) for n in range(scenario.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def _ms(value: float | None) -> float | None:
+    return round(value * 1000, 3) if value is not None else None
+
+
+def run_scenario(harness: Harness, scenario: Scenario, duration: float, memory_ops: int) -> dict:
+    if scenario.setup:
+        scenario.setup(harness)
+    ui = harness.ui
+    messages, sent = (ui.messages, ui.bytes) if ui else (0, 0)
+    bridge_calls = Runtime.bridge_calls
+
+    timed = _drive(harness, scenario, duration)
+
+    # Second pass, with allocations traced
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    _drive(harness, scenario, duration / 4, max_ops=memory_ops)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    latencies = timed.latencies
+    return {
+        "operations": len(latencies),
+        "errors": len(timed.errors),
+        "first_error": timed.errors[0] if timed.errors else None,
+        "duration_s": round(timed.elapsed, 3),
+        "throughput_per_s": round(len(latencies) / timed.elapsed, 2) if timed.elapsed else None,
+        "target_rate_per_s": scenario.rate,
+        "clients": scenario.clients,
+        "p50_ms": _ms(_percentile(latencies, 0.50)),
+        "p95_ms": _ms(_percentile(latencies, 0.95)),
+        "p99_ms": _ms(_percentile(latencies, 0.99)),
+        "max_ms": _ms(max(latencies) if latencies else None),
+        "peak_memory_kb": round(peak / 1024, 1),
+        "messages_sent": (ui.messages - messages) if ui else 0,
+        "bytes_sent": (ui.bytes - sent) if ui else 0,
+        "bridge_calls": Runtime.bridge_calls - bridge_calls,
+    }
+
+
+# ---------- Synthetic inputs ----------
+
+def _jpeg_b64(size: tuple[int, int], quality: int = 85) -> str:
+    image = Image.effect_noise(size, 40).convert("RGB").filter(ImageFilter.GaussianBlur(2))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def _wav(seconds: float, rate: int = 16000, seed: int = 0) -> bytes:
+    t = np.arange(int(seconds * rate)) / rate
+    noise = np.random.default_rng(seed).normal(0, 0.05, len(t))
+    samples = (np.sin(2 * np.pi * 440 * t) * 0.5 + noise).clip(-1, 1)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes((samples * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+class Inputs:
+    """Synthetic inputs, built once per process on first use."""
+
+    _cache: dict = {}
+
+    @classmethod
+    def get(cls, name: str, build: Callable):
+        if name not in cls._cache:
+            cls._cache[name] = build()
+        return cls._cache[name]
+
+    @classmethod
+    def photo(cls) -> str:
+        return cls.get("photo", lambda: _jpeg_b64((640, 480)))
+
+    @classmethod
+    def texture(cls) -> str:
+        return cls.get("texture", lambda: _jpeg_b64((256, 256)))
+
+    @classmethod
+    def large_photo(cls) -> str:
+        return cls.get("large_photo", lambda: _jpeg_b64((2048, 1536)))
+
+    @classmethod
+    def frame(cls) -> Image.Image:
+        return cls.get("frame", lambda: Image.effect_noise((640, 480), 40).convert("RGB"))
+
+    @classmethod
+    def clip(cls) -> bytes:
+        return cls.get("clip", lambda: _wav(1.0))
+
+    @classmethod
+    def long_clip(cls) -> bytes:
+        return cls.get("long_clip", lambda: _wav(10.0, seed=1))
+
+
+def _unique_clip(i: int) -> str:
+    """A 1 s clip whose content differs for every i, so that it is never memoized."""
+    data = bytearray(Inputs.clip())
+    data[-4:] = i.to_bytes(4, "little")
+    return base64.b64encode(bytes(data)).decode("ascii")
+
+
+def _detections(i: int) -> dict:
+    # An object moving slowly across the frame, and another one appearing every few seconds
+    x = 100 + (i % 300)
+    detections = {"face": {"confidence": 0.9, "bounding_box_xyxy": [x, 100, x + 80, 180]}}
+    if (i // 60) % 2:
+        detections["person"] = {"confidence": 0.7, "bounding_box_xyxy": [300, 50, 450, 400]}
+    return detections
+
+
+def _audio_stream(h: Harness, i: int, sid: str):
+    stream_id = f"{sid}-{i}"
+    data = Inputs.long_clip()
+    chunk = 64 * 1024
+    done = threading.Event()
+
+    def listener(reply_type, message, room):
+        if room == sid and reply_type in ("classification_stream_complete", "classification_error") \
+                and isinstance(message, dict) and message.get("stream_id") == stream_id:
+            done.set()
+
+    h.ui.add_listener(listener)
+    try:
+        h.message(sid, "audio_stream_start", {"stream_id": stream_id, "confidence": 0.5})
+        for seq, offset in enumerate(range(0, len(data), chunk), start=1):
+            h.message(sid, "audio_stream_chunk", {"stream_id": stream_id, "seq": seq, "data": data[offset:offset + chunk]})
+        h.message(sid, "audio_stream_end", {"stream_id": stream_id})
+        if not done.wait(REPLY_TIMEOUT):
+            raise TimeoutError("Stream not completed")
+    finally:
+        h.ui.remove_listener(listener)
+
+
+def _auto_ack_frames(h: Harness):
+    """Connect a client acknowledging every preview frame it receives, like the browser does."""
+    def listener(message_type, message, room):
+        if message_type == "frame_detected" and room == "viewer":
+            h.message("viewer", "frame_ack", {"seq": message["seq"]})
+
+    h.ui.add_listener(listener)
+    h.connect("viewer")
+
+
+def _pins_pattern(i: int) -> dict:
+    return {"mask": (1 << 28) - 1, "values": 0x5555555 if i % 2 else 0xAAAAAAA}
+
+
+DETECTION_REPLIES = ("detection_result", "detection_error")
+CLASSIFICATION_REPLIES = ("classification_complete", "classification_error")
+CITIES = ("Torino", "Milano", "Roma", "Napoli", "Firenze", "Bologna", "Genova", "Venezia")
+
+# Scenarios of each App. Apps without scenarios are only measured at startup.
+SCENARIOS: dict[str, list[Scenario]] = {
+    "air-quality-monitoring": [
+        Scenario("bridge get_air_quality", lambda h, i, sid: h.bridge("get_air_quality")),
+    ],
+    "anomaly-detection": [
+        Scenario("ws detect_anomalies (geometry)", lambda h, i, sid: h.request(
+            sid, "detect_anomalies", {"image": Inputs.texture(), "confidence": 0.5}, DETECTION_REPLIES), clients=2),
+        Scenario("ws detect_anomalies (image)", lambda h, i, sid: h.request(
+            sid, "detect_anomalies", {"image": Inputs.texture(), "response_mode": "image"}, DETECTION_REPLIES), clients=2),
+        Scenario("ws detect_anomalies (3 MP, tiled)", lambda h, i, sid: h.request(
+            sid, "detect_anomalies", {"image": Inputs.large_photo()}, DETECTION_REPLIES)),
+    ],
+    "audio-classification": [
+        Scenario("ws run_classification (memoized)", lambda h, i, sid: h.request(
+            sid, "run_classification", {"audio_data": base64.b64encode(Inputs.clip()).decode(), "confidence": 0.3},
+            CLASSIFICATION_REPLIES)),
+        Scenario("ws run_classification (new clip)", lambda h, i, sid: h.request(
+            sid, "run_classification", {"audio_data": _unique_clip(i), "confidence": 0.3}, CLASSIFICATION_REPLIES)),
+        Scenario("ws audio_stream (10 s upload)", _audio_stream),
+    ],
+    "blink-with-ui": [
+        Scenario("ws toggle_led", lambda h, i, sid: h.request(sid, "toggle_led", {}, ("led_status_update", "error"))),
+    ],
+    "cloud-blink": [
+        Scenario("cloud led write", lambda h, i, sid: h.source("ArduinoCloud").write("led", bool(i % 2))),
+    ],
+    "code-detector": [
+        Scenario("camera frame (1 viewer)", lambda h, i, sid: h.source("CameraCodeDetection").callbacks["frame"](Inputs.frame()),
+                 setup=_auto_ack_frames),
+        Scenario("code detected + reset", lambda h, i, sid: (
+            h.source("CameraCodeDetection").callbacks["detect"](Inputs.frame(), standins.Detection(f"code-{i}", "QRCODE")),
+            h.message(sid, "reset_detection", {}))),
+        Scenario("GET /list_scans", lambda h, i, sid: h.rest("GET", "/list_scans")),
+    ],
+    "home-climate-monitoring-and-storage": [
+        Scenario("bridge record_sensor_samples (1 Hz)", lambda h, i, sid: h.bridge("record_sensor_samples", 21.5 + i % 3, 48.0), rate=1.0),
+        Scenario("bridge record_sensor_samples (max)", lambda h, i, sid: h.bridge("record_sensor_samples", 21.5 + i % 3, 48.0)),
+        Scenario("GET /get_samples (rollup)", lambda h, i, sid: h.rest(
+            "GET", "/get_samples/{resource}/{start}/{aggr_window}", resource="temperature", start="-1h", aggr_window="1m")),
+    ],
+    "image-classification": [
+        Scenario("ws classify_image", lambda h, i, sid: h.request(
+            sid, "classify_image", {"image": Inputs.photo(), "image_type": "image/jpeg", "confidence": 0.25},
+            ("classification_result", "classification_error")), clients=2),
+    ],
+    "keyword-spotting": [
+        Scenario("keyword detected", lambda h, i, sid: h.source("KeywordSpotting").callbacks["hey_arduino"](), rate=1.0),
+    ],
+    "object-detection": [
+        Scenario("ws detect_objects (geometry)", lambda h, i, sid: h.request(
+            sid, "detect_objects", {"image": Inputs.photo(), "confidence": 0.5}, DETECTION_REPLIES), clients=2),
+        Scenario("ws detect_objects (image)", lambda h, i, sid: h.request(
+            sid, "detect_objects", {"image": Inputs.photo(), "response_mode": "image"}, DETECTION_REPLIES), clients=2),
+    ],
+    "real-time-accelerometer": [
+        Scenario("bridge record_sensor_movement (62.5 Hz)", lambda h, i, sid: h.bridge(
+            "record_sensor_movement", math.sin(i / 10), math.cos(i / 10), 1.0), rate=62.5, setup=lambda h: h.connect("viewer")),
+        Scenario("bridge record_sensor_movement (max)", lambda h, i, sid: h.bridge(
+            "record_sensor_movement", math.sin(i / 10), math.cos(i / 10), 1.0)),
+        Scenario("movement detected", lambda h, i, sid: h.source("MotionDetection").callbacks["wave"](
+            {"idle": 0.1, "snake": 0.05, "updown": 0.05, "wave": 0.8})),
+        Scenario("GET /detection", lambda h, i, sid: h.rest("GET", "/detection")),
+        Scenario("GET /samples", lambda h, i, sid: h.rest("GET", "/samples")),
+        # A client polling every 250 ms, only fetching the samples newer than the ones it has
+        Scenario("GET /samples (since, columnar)", lambda h, i, sid: h.rest(
+            "GET", "/samples", since_t=time.time() - 0.25, encoding="columnar")),
+    ],
+    "system-resources-logger": [
+        Scenario("GET /get_samples (rollup)", lambda h, i, sid: h.rest(
+            "GET", "/get_samples/{resource}/{start}/{aggr_window}", resource="cpu", start="-1h", aggr_window="1m")),
+    ],
+    "unoq-pin-toggle": [
+        Scenario("ws pin_toggle", lambda h, i, sid: h.request(
+            sid, "pin_toggle", {"name": "D13", "state": "on" if i % 2 else "off"}, ("pin_states_update", "error"))),
+        Scenario("ws pins_set (28 pins)", lambda h, i, sid: h.request(sid, "pins_set", _pins_pattern(i), ("pin_states_update", "error"))),
+        Scenario("POST /pins (28 pins)", lambda h, i, sid: h.rest("POST", "/pins", _pins_pattern(i))),
+        Scenario("GET /states", lambda h, i, sid: h.rest("GET", "/states")),
+    ],
+    "video-face-detection": [
+        Scenario("detections (30 FPS)", lambda h, i, sid: h.source("VideoObjectDetection").all_callback(_detections(i)),
+                 rate=30.0, setup=lambda h: h.connect("viewer")),
+    ],
+    "video-generic-object-detection": [
+        Scenario("detections (30 FPS)", lambda h, i, sid: h.source("VideoObjectDetection").all_callback(_detections(i)),
+                 rate=30.0, setup=lambda h: h.connect("viewer")),
+    ],
+    "video-person-classification": [
+        Scenario("classifications (30 FPS)", lambda h, i, sid: (
+            h.source("VideoImageClassification").callbacks["person"](),
+            h.source("VideoImageClassification").all_callback({"person": 0.8 + (i % 10) / 100})),
+                 rate=30.0, setup=lambda h: h.connect("viewer")),
+    ],
+    "weather-forecast": [
+        Scenario("bridge get_weather_forecast", lambda h, i, sid: h.bridge("get_weather_forecast", CITIES[i % len(CITIES)]), clients=4),
+    ],
+}
+
+
+# ---------- Worker: one App in this process ----------
+
+def run_app(app: str, duration: float, memory_ops: int, latencies: dict) -> dict:
+    app_dir = os.path.join(EXAMPLES_DIR, app, "python")
+    standins.install(**latencies)
+    sys.path.insert(0, app_dir)
+    sys.argv = [os.path.join(app_dir, "main.py")]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    runpy.run_path(os.path.join(app_dir, "main.py"), run_name="__main__")
+    startup = time.perf_counter() - start
+    startup_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    harness = Harness()
+    results = {"startup_ms": _ms(startup), "startup_peak_memory_kb": round(startup_peak / 1024, 1), "scenarios": {}}
+    try:
+        for scenario in SCENARIOS.get(app, []):
+            results["scenarios"][scenario.name] = run_scenario(harness, scenario, duration, memory_ops)
+    finally:
+        standins.App.stop()
+    return results
+
+
+def _worker(args):
+    # No App reaches the network: HTTP goes through a proxy on a closed local port
+    results = run_app(args.worker, args.duration, args.memory_ops, {
+        "mcu_latency": args.mcu_latency_ms / 1000,
+        "inference_latency": args.inference_latency_ms / 1000,
+        "network_latency": args.network_latency_ms / 1000,
+    })
+    with open(args.result_file, "w") as f:
+        json.dump(results, f)
+    sys.stdout.flush()
+    os._exit(0)  # Don't wait for the threads the App left behind
+
+
+# ---------- Driver: every App in its own process ----------
+
+def _revision() -> str | None:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD", "--", "examples"], cwd=ROOT).returncode != 0
+        return revision + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _run_in_subprocess(app: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        result_file = os.path.join(workdir, "result.json")
+        env = dict(os.environ, HTTP_PROXY="http://127.0.0.1:9", HTTPS_PROXY="http://127.0.0.1:9", NO_PROXY="")
+        command = [sys.executable, os.path.abspath(__file__), "--worker", app, "--result-file", result_file,
+                   "--duration", str(args.duration), "--memory-ops", str(args.memory_ops),
+                   "--mcu-latency-ms", str(args.mcu_latency_ms), "--inference-latency-ms", str(args.inference_latency_ms),
+                   "--network-latency-ms", str(args.network_latency_ms)]
+        process = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+        if process.returncode != 0 or not os.path.exists(result_file):
+            return {"error": (process.stderr.strip().splitlines() or [f"exit code {process.returncode}"])[-1]}
+        with open(result_file) as f:
+            return json.load(f)
+
+
+def _print_app(app: str, result: dict):
+    if "error" in result:
+        print(f"\n{app}: FAILED - {result['error']}")
+        return
+    print(f"\n{app}: startup {result['startup_ms']:.0f} ms, {result['startup_peak_memory_kb']:.0f} KB")
+    if result["scenarios"]:
+        print(f"  {'scenario':<42} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KB':>9} {'errors':>7}")
+    for name, s in result["scenarios"].items():
+        def fmt(value, spec):
+            return format(value, spec) if value is not None else "-"
+        print(f"  {name:<42} {fmt(s['throughput_per_s'], '9.1f')} {fmt(s['p50_ms'], '9.2f')} {fmt(s['p95_ms'], '9.2f')} "
+              f"{fmt(s['p99_ms'], '9.2f')} {s['peak_memory_kb']:>9.0f} {s['errors']:>7}")
+        if s["first_error"]:
+            print(f"    first error: {s['first_error']}")
+
+
+def compare(previous: dict, current: dict, tolerance: float) -> list[str]:
+    """Return the scenarios whose throughput dropped, or p95 latency grew, by more than `tolerance`."""
+    regressions = []
+    for app, result in current["apps"].items():
+        old_app = previous.get("apps", {}).get(app, {})
+        for name, s in result.get("scenarios", {}).items():
+            old = old_app.get("scenarios", {}).get(name)
+            if not old:
+                continue
+            if s["throughput_per_s"] and old["throughput_per_s"] and s["throughput_per_s"] < old["throughput_per_s"] * (1 - tolerance):
+                regressions.append(f"{app} / {name}: throughput {old['throughput_per_s']} -> {s['throughput_per_s']} ops/s")
+            if s["p95_ms"] and old["p95_ms"] and s["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{app} / {name}: p95 {old['p95_ms']} -> {s['p95_ms']} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", help="Comma-separated App names. Defaults to every App with a python/main.py")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds each scenario runs for")
+    parser.add_argument("--memory-ops", type=int, default=50, help="Operations of the memory tracing pass")
+    parser.add_argument("--mcu-latency-ms", type=float, default=2.0, help="Simulated Bridge.call round trip")
+    parser.add_argument("--inference-latency-ms", type=float, default=10.0, help="Simulated model inference time")
+    parser.add_argument("--network-latency-ms", type=float, default=20.0, help="Simulated DB and web API latency")
+    parser.add_argument("--output", default="bench_results.json", help="Path of the JSON results")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative change reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 if a regression is found")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args)
+        return
+
+    available = sorted(name for name in os.listdir(EXAMPLES_DIR) if os.path.isfile(os.path.join(EXAMPLES_DIR, name, "python", "main.py")))
+    apps = args.apps.split(",") if args.apps else available
+    unknown = sorted(set(apps) - set(available))
+    if unknown:
+        parser.error(f"Unknown Apps: {', '.join(unknown)}")
+
+    results = {
+        "revision": _revision(),
+        "timestamp": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "settings": {key: getattr(args, key) for key in ("duration", "memory_ops", "mcu_latency_ms", "inference_latency_ms", "network_latency_ms")},
+        "apps": {},
+    }
+    print(f"Revision {results['revision']}, {args.duration} s per scenario")
+    for app in apps:
+        results["apps"][app] = _run_in_subprocess(app, args)
+        _print_app(app, results["apps"][app])
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        regressions = compare(previous, results, args.tolerance)
+        print(f"\nCompared with {previous.get('revision')}: {len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        for line in regressions:
+            print(f"  {line}")
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+"""Compare direct and write-behind TimeSeriesStore writes of the home-climate-monitoring-and-storage example.
+
+The Bridge callback produces five measures per sample. In "direct" mode every measure is written with its own
+TimeSeriesStore.write_sample call, in "write-behind" mode samples are queued to a SampleWriter and written in
+batches by a background thread. The store is replaced by a stand-in whose write requests take a fixed latency,
+and the producer runs in real time at each sensor rate.
+
+Usage:
+    python benchmarks/climate_write_behind.py [--duration 5] [--latency-ms 5] [--rates 1 100]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "examples", "home-climate-monitoring-and-storage", "python"))
+
+from arduino.app_bricks.dbstorage_tsstore import TimeSeriesStore  # noqa: E402
+from sample_writer import SampleWriter  # noqa: E402
+
+MEASURES = ("temperature", "humidity", "dew_point", "heat_index", "absolute_humidity")
+
+
+class FakeWriteApi:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+        self.points = 0
+
+    def write(self, bucket: str, record=None, **kwargs):
+        time.sleep(self.latency)
+        self.requests += 1
+        self.points += len(record) if isinstance(record, list) else 1
+
+
+class FakeStore:
+    """Stands in for TimeSeriesStore: same write path, simulated round-trip latency."""
+
+    bucket = "arduino"
+
+    def __init__(self, latency: float):
+        self.write_api = FakeWriteApi(latency)
+
+    def write_sample(self, measure: str, value, ts: int = 0, measurement_name: str = "arduino"):
+        TimeSeriesStore.write_sample(self, measure, value, ts, measurement_name)
+
+
+def _produce(rate: float, duration: float, callback) -> tuple[int, float, list[float]]:
+    """Call callback(ts, values) at the given rate. Returns (samples, elapsed seconds, callback latencies)."""
+    latencies = []
+    count = int(rate * duration)
+    start = time.monotonic()
+    for i in range(count):
+        delay = start + i / rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        ts = int(time.time() * 1000)
+        values = {m: 20.0 + i % 10 for m in MEASURES}
+        t0 = time.perf_counter()
+        callback(ts, values)
+        latencies.append(time.perf_counter() - t0)
+    # The run lasts at least count / rate seconds, even if the last sample is produced earlier
+    return count, max(time.monotonic() - start, count / rate), latencies
+
+
+def run_direct(rate: float, duration: float, latency: float) -> dict:
+    db = FakeStore(latency)
+
+    def callback(ts, values):
+        for measure, value in values.items():
+            db.write_sample(measure, value, ts)
+
+    count, elapsed, latencies = _produce(rate, duration, callback)
+    return {"samples": count, "stored": db.write_api.points // len(MEASURES), "elapsed": elapsed,
+            "requests": db.write_api.requests, "dropped": 0, "latencies": latencies}
+
+
+def run_write_behind(rate: float, duration: float, latency: float) -> dict:
+    db = FakeStore(latency)
+    writer = SampleWriter(db, max_batch=50, flush_interval=1.0, max_queue=1000)
+    running = threading.Event()
+    running.set()
+
+    def flusher():
+        while running.is_set():
+            writer.loop()
+
+    thread = threading.Thread(target=flusher, daemon=True)
+    thread.start()
+    count, elapsed, latencies = _produce(rate, duration, writer.write)
+    running.clear()
+    thread.join()
+    writer.stop()
+    return {"samples": count, "stored": writer.written, "elapsed": elapsed,
+            "requests": db.write_api.requests, "dropped": writer.dropped, "latencies": latencies}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of simulated sensor data per run")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Simulated latency of a store write request")
+    parser.add_argument("--rates", type=float, nargs="+", default=[1.0, 100.0], help="Sensor rates in Hz")
+    args = parser.parse_args()
+
+    print(f"{args.duration} s per run, {args.latency_ms} ms per store request")
+    print(f"{'mode':<14} {'rate Hz':>8} {'samples/s':>10} {'requests':>9} {'dropped':>8} {'cb avg ms':>10} {'cb max ms':>10}")
+    for rate in args.rates:
+        for name, run in (("direct", run_direct), ("write-behind", run_write_behind)):
+            r = run(rate, args.duration, args.latency_ms / 1000)
+            lat = r["latencies"]
+            print(f"{name:<14} {rate:>8.1f} {r['stored'] / r['elapsed']:>10.1f} {r['requests']:>9} {r['dropped']:>8} "
+                  f"{sum(lat) / len(lat) * 1000:>10.3f} {max(lat) * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
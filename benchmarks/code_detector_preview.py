@@ -0,0 +1,133 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+"""Compare the original and the adaptive camera preview streaming of the code-detector example.
+
+The camera produces 640x480 frames at 5 fps. The original preview JPEG-encodes every frame at quality 100,
+base64-encodes it and broadcasts it, whether a client is connected or not. The FrameStreamer only encodes frames
+when somebody is watching, sends them as binary, waits for each client to acknowledge a frame before sending the
+next one and adapts quality and resolution to the client throughput. Clients are simulated as links with a fixed
+bandwidth, acknowledging a frame once it is fully transferred. The benchmark runs in real time and reports the
+bytes sent and the CPU time spent by the Python side per second.
+
+Usage:
+    python benchmarks/code_detector_preview.py [--seconds 6] [--fps 5]
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import sys
+import threading
+import time
+from PIL import Image, ImageDraw, ImageFilter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "examples", "code-detector", "python"))
+
+from frame_stream import FrameStreamer  # noqa: E402
+
+# name -> link bandwidth in bytes/s of each connected client
+SCENARIOS = {
+    "no client": [],
+    "1 fast client": [5_000_000],
+    "1 slow client": [100_000],
+    "3 mixed clients": [5_000_000, 500_000, 100_000],
+}
+
+
+class FakeWebUI:
+    """Counts the bytes the WebUI brick would emit, and simulates clients acknowledging frames."""
+
+    def __init__(self, bandwidths: list[float]):
+        self.clients = {f"client{i}": b for i, b in enumerate(bandwidths)}
+        self.streamer: FrameStreamer | None = None
+        self.bytes = 0
+
+    def send_message(self, message_type: str, message: dict | str, room: str = None):
+        attachments = []
+
+        def _binary(obj):
+            attachments.append(obj)
+            return {"_placeholder": True, "num": len(attachments) - 1}
+
+        packet = json.dumps([message_type, message], default=_binary).encode("utf-8")
+        size = len(packet) + sum(len(a) for a in attachments)
+        for sid, bandwidth in self.clients.items():
+            if room is not None and room != sid:
+                continue
+            self.bytes += size
+            if self.streamer is not None and "seq" in message:
+                ack = threading.Timer(size / bandwidth, self.streamer.ack, (sid, {"seq": message["seq"]}))
+                ack.daemon = True
+                ack.start()
+
+
+def _frames(count: int) -> list[Image.Image]:
+    """Camera-like frames: a textured background with a moving shape."""
+    background = Image.effect_noise((640, 480), 40).convert("RGB").filter(ImageFilter.GaussianBlur(2))
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        draw = ImageDraw.Draw(frame)
+        x = 100 + (i * 7) % 400
+        draw.rectangle([x, 150, x + 120, 300], fill=(230, 230, 230), outline=(20, 20, 20), width=4)
+        frames.append(frame)
+    return frames
+
+
+def _run(frames: list[Image.Image], fps: float, on_frame) -> tuple[float, float]:
+    """Call on_frame at the camera rate. Returns (elapsed seconds, CPU seconds)."""
+    start, cpu_start = time.monotonic(), time.process_time()
+    for i, frame in enumerate(frames):
+        delay = start + i / fps - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        on_frame(frame)
+    return max(time.monotonic() - start, len(frames) / fps), time.process_time() - cpu_start
+
+
+def run_original(frames: list[Image.Image], fps: float, bandwidths: list[float]) -> dict:
+    ui = FakeWebUI(bandwidths)
+
+    def on_frame(frame):
+        buffer = io.BytesIO()
+        frame.save(buffer, format="JPEG", quality=100)
+        b64_frame = base64.b64encode(buffer.getvalue()).decode("utf-8")
+        ui.send_message("frame_detected", {"timestamp": "2025-01-01T00:00:00+00:00", "image": b64_frame, "image_type": "image/jpeg"})
+
+    elapsed, cpu = _run(frames, fps, on_frame)
+    return {"bytes": ui.bytes, "elapsed": elapsed, "cpu": cpu, "levels": []}
+
+
+def run_adaptive(frames: list[Image.Image], fps: float, bandwidths: list[float]) -> dict:
+    ui = FakeWebUI(bandwidths)
+    streamer = FrameStreamer(ui, fps=fps)
+    ui.streamer = streamer
+    for sid in ui.clients:
+        streamer.add_client(sid)
+
+    elapsed, cpu = _run(frames, fps, lambda frame: streamer.push(frame, timestamp="2025-01-01T00:00:00+00:00"))
+    levels = [streamer._clients[sid].level for sid in ui.clients]
+    return {"bytes": ui.bytes, "elapsed": elapsed, "cpu": cpu, "levels": levels}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=6.0, help="Seconds of camera frames per run")
+    parser.add_argument("--fps", type=float, default=5.0, help="Camera frame rate")
+    args = parser.parse_args()
+
+    frames = _frames(int(args.seconds * args.fps))
+    print(f"{len(frames)} frames of 640x480 at {args.fps} fps per run")
+    print(f"{'scenario':<16} {'mode':<9} {'KB/s':>9} {'CPU ms/s':>9}  final levels")
+    for name, bandwidths in SCENARIOS.items():
+        for mode, run in (("original", run_original), ("adaptive", run_adaptive)):
+            r = run(frames, args.fps, bandwidths)
+            print(f"{name:<16} {mode:<9} {r['bytes'] / r['elapsed'] / 1000:>9.1f} {r['cpu'] / r['elapsed'] * 1000:>9.1f}  {r['levels']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+"""Compare the original and the lean scan log of the code-detector example.
+
+The original App stores every scan in the `scan_log` table with the full frame inline, as a base64 JPEG at quality
+100, and lists the latest scans with `SELECT * ... ORDER BY timestamp DESC LIMIT 5`. The ScanLog keeps the metadata
+in an indexed table, stores thumbnails and full images as binary in separate tables, and only keeps the full
+images of the latest scans. The benchmark stores the same number of scans in both, in a temporary directory, and
+reports the time to list the latest scans and the size of the database file.
+
+Usage:
+    python benchmarks/code_detector_scan_log.py [--scans 2000] [--max-images 100]
+"""
+
+import argparse
+import base64
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, UTC
+from PIL import Image, ImageDraw, ImageFilter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "examples", "code-detector", "python"))
+
+from arduino.app_bricks.dbstorage_sqlstore import SQLStore  # noqa: E402
+from scan_log import ScanLog  # noqa: E402
+
+
+def _frame() -> Image.Image:
+    frame = Image.effect_noise((640, 480), 40).convert("RGB").filter(ImageFilter.GaussianBlur(2))
+    ImageDraw.Draw(frame).rectangle([200, 150, 440, 330], outline=(0, 255, 0), width=4)
+    return frame
+
+
+def _timestamps(count: int) -> list[str]:
+    start = datetime(2025, 1, 1, tzinfo=UTC)
+    return [(start + timedelta(seconds=10 * i)).isoformat() for i in range(count)]
+
+
+def _list_ms(list_scans, repeat: int = 200) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        list_scans()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run_original(frame: Image.Image, scans: int) -> dict:
+    store = SQLStore("original.db")
+    buffer = io.BytesIO()
+    frame.save(buffer, format="JPEG", quality=100)
+    b64_frame = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    start = time.perf_counter()
+    for i, ts in enumerate(_timestamps(scans)):
+        store.store("scan_log", {"content": f"code-{i}", "type": "QRCODE", "timestamp": ts, "image": b64_frame, "image_type": "image/jpeg"})
+    store_ms = (time.perf_counter() - start) / scans * 1000
+    list_ms = _list_ms(lambda: store.read("scan_log", order_by="timestamp DESC", limit=5))
+    store.stop()
+    return {"store_ms": store_ms, "list_ms": list_ms, "size": os.path.getsize(store.database_name)}
+
+
+def run_lean(frame: Image.Image, scans: int, max_images: int) -> dict:
+    store = SQLStore("lean.db")
+    scan_log = ScanLog(store, max_images=max_images)
+    start = time.perf_counter()
+    for i, ts in enumerate(_timestamps(scans)):
+        scan_log.add(f"code-{i}", "QRCODE", ts, frame)
+    store_ms = (time.perf_counter() - start) / scans * 1000
+    list_ms = _list_ms(lambda: scan_log.latest(limit=5))
+    store.stop()
+    return {"store_ms": store_ms, "list_ms": list_ms, "size": os.path.getsize(store.database_name)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scans", type=int, default=2000, help="Number of scans stored")
+    parser.add_argument("--max-images", type=int, default=100, help="Number of full images kept by the ScanLog")
+    args = parser.parse_args()
+
+    frame = _frame()
+    with tempfile.TemporaryDirectory() as app_home:
+        # SQLStore puts its databases under $APP_HOME/data/dbstorage_sqlstore
+        os.environ["APP_HOME"] = app_home
+        print(f"{args.scans} scans of 640x480 frames")
+        print(f"{'schema':<10} {'store ms':>9} {'list ms':>9} {'DB MB':>8}")
+        for name, r in (("original", run_original(frame, args.scans)), ("lean", run_lean(frame, args.scans, args.max_images))):
+            print(f"{name:<10} {r['store_ms']:>9.2f} {r['list_ms']:>9.3f} {r['size'] / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
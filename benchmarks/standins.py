@@ -0,0 +1,525 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+"""Local stand-ins for the `arduino` package, to run the example Apps without a board.
+
+`install()` registers fake `arduino.app_utils`, `arduino.app_bricks.*` and `arduino.app_peripherals.*` modules in
+`sys.modules`, so that an App's main.py imports them instead of the real ones. The stand-ins keep the API used by
+the examples and record what the App registers (socket handlers, REST routes, Bridge providers, detection
+callbacks), so that a benchmark can drive it. Nothing reaches hardware, containers or the network:
+
+- `App.run()` starts the registered bricks like the real runtime, then returns instead of blocking.
+- `Bridge.call` answers after `Runtime.mcu_latency` seconds.
+- `WebUI.send_message` serializes messages like Socket.IO, and counts messages and bytes.
+- The stores keep their data in memory, the models answer synthetic results after `Runtime.inference_latency`.
+"""
+
+import inspect
+import io
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+import types
+from collections.abc import Callable
+from functools import wraps
+from typing import Any
+
+import numpy as np
+from PIL import Image
+
+
+class Runtime:
+    """State shared by the stand-ins of a process."""
+
+    mcu_latency = 0.002
+    inference_latency = 0.01
+    network_latency = 0.02
+    bricks: list = []
+    user_loop: Callable | None = None
+    running = threading.Event()
+    threads: list[threading.Thread] = []
+    providers: dict[str, Callable] = {}
+    bridge_calls = 0
+    ui: "WebUI | None" = None
+    sources: dict[str, list] = {}  # stand-in class name -> instances, e.g. the detection streams to drive
+
+    @classmethod
+    def track(cls, instance):
+        cls.sources.setdefault(type(instance).__name__, []).append(instance)
+
+
+# ---------- arduino.app_utils ----------
+
+class Logger(logging.Logger):
+    def __init__(self, name: str, level: int = logging.WARNING):
+        super().__init__(name, level)
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(name)s %(levelname)s: %(message)s"))
+        self.addHandler(handler)
+
+
+class _Brick:
+    """`@brick` decorator: registers every instance of the class with the App, like the real one."""
+
+    def __call__(self, user_class=None):
+        if user_class is None:
+            return self._decorate
+        return self._decorate(user_class)
+
+    def _decorate(self, user_class):
+        original_init = user_class.__init__
+
+        @wraps(original_init)
+        def new_init(instance, *args, **kwargs):
+            original_init(instance, *args, **kwargs)
+            App.register(instance)
+
+        user_class.__init__ = new_init
+        return user_class
+
+    @staticmethod
+    def loop(method):
+        method._is_loop = True
+        return method
+
+    @staticmethod
+    def execute(method):
+        method._is_execute = True
+        return method
+
+
+brick = _Brick()
+
+
+class _App:
+    def register(self, instance):
+        # Like the real App, bricks created once it runs are not started
+        if not Runtime.running.is_set():
+            Runtime.bricks.append(instance)
+
+    def run(self, user_loop: Callable = None):
+        """Start the bricks and return. The user loop is recorded, not run."""
+        Runtime.user_loop = user_loop
+        Runtime.running.set()
+        for instance in list(Runtime.bricks):
+            self._start(instance)
+
+    def stop(self):
+        Runtime.running.clear()
+        for instance in Runtime.bricks:
+            if hasattr(instance, "stop"):
+                try:
+                    instance.stop()
+                except Exception as e:
+                    print(f"Failed to stop {type(instance).__name__}: {e}", file=sys.stderr)
+        for thread in Runtime.threads:
+            thread.join(timeout=2.0)
+
+    def _start(self, instance):
+        if hasattr(instance, "start"):
+            instance.start()
+        for name in dir(type(instance)):
+            method = getattr(instance, name, None)
+            if callable(method) and (name == "loop" or getattr(method, "_is_loop", False)):
+                thread = threading.Thread(target=self._run_loop, args=(method,), daemon=True, name=f"{type(instance).__name__}.{name}")
+                Runtime.threads.append(thread)
+                thread.start()
+
+    @staticmethod
+    def _run_loop(method):
+        while Runtime.running.is_set():
+            try:
+                method()
+            except StopIteration:
+                return
+            except Exception as e:
+                print(f"Error in {method.__qualname__}: {e}", file=sys.stderr)
+                time.sleep(0.1)
+
+
+App = _App()
+
+
+class Bridge:
+    @staticmethod
+    def provide(method_name: str, handler: Callable):
+        if method_name in Runtime.providers:
+            raise RuntimeError(f"Method '{method_name}' already provided")
+        Runtime.providers[method_name] = handler
+
+    @staticmethod
+    def call(method_name: str, *params, timeout: int = 10):
+        time.sleep(Runtime.mcu_latency)
+        Runtime.bridge_calls += 1
+        return None
+
+    @staticmethod
+    def notify(method_name: str, *params):
+        Runtime.bridge_calls += 1
+
+
+def draw_anomaly_markers(image, detection: dict):
+    return image if isinstance(image, Image.Image) else Image.new("RGB", (64, 64))
+
+
+def draw_bounding_boxes(image, detection: dict, **kwargs):
+    return image
+
+
+# ---------- arduino.app_bricks.web_ui ----------
+
+class WebUI:
+    """Records the handlers registered by the App, and serializes the messages it sends like Socket.IO."""
+
+    def __init__(self, *args, **kwargs):
+        self.handlers: dict[str, Callable] = {}
+        self.routes: dict[tuple[str, str], Callable] = {}
+        self.on_connect_cb: Callable | None = None
+        self.on_disconnect_cb: Callable | None = None
+        self.messages = 0
+        self.bytes = 0
+        self._listeners: list[Callable[[str, Any, str | None], None]] = []
+        self._lock = threading.Lock()
+        Runtime.ui = self
+
+    def on_message(self, message_type: str, callback: Callable):
+        self.handlers[message_type] = callback
+
+    def on_connect(self, callback: Callable):
+        self.on_connect_cb = callback
+
+    def on_disconnect(self, callback: Callable):
+        self.on_disconnect_cb = callback
+
+    def expose_api(self, method: str, path: str, function: Callable):
+        self.routes[(method, path)] = function
+
+    def send_message(self, message_type: str, message: Any, room: str = None):
+        attachments = []
+
+        def _binary(obj):
+            attachments.append(obj)
+            return {"_placeholder": True, "num": len(attachments) - 1}
+
+        size = len(json.dumps([message_type, message], default=_binary)) + sum(len(a) for a in attachments)
+        with self._lock:
+            self.messages += 1
+            self.bytes += size
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(message_type, message, room)
+
+    def add_listener(self, listener: Callable[[str, Any, str | None], None]):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str, Any, str | None], None]):
+        with self._lock:
+            self._listeners.remove(listener)
+
+
+# ---------- arduino.app_bricks.dbstorage_* ----------
+
+class _WriteApi:
+    def __init__(self):
+        self.requests = 0
+        self.points = 0
+
+    def write(self, bucket: str, record=None, **kwargs):
+        time.sleep(Runtime.network_latency / 4)
+        self.requests += 1
+        self.points += len(record) if isinstance(record, list) else 1
+
+
+class TimeSeriesStore:
+    """In-memory TimeSeriesStore: writes are counted, reads return evenly spaced synthetic samples."""
+
+    bucket = "arduino"
+
+    def __init__(self, *args, **kwargs):
+        self.write_api = _WriteApi()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def write_sample(self, measure: str, value, ts: int = 0, measurement_name: str = "arduino"):
+        self.write_api.write(self.bucket, record={"measure": measure, "value": value, "ts": ts})
+
+    def read_samples(self, measure: str, measurement_name: str = "arduino", start_from: str = "-1d", end_to: str = None,
+                     aggr_window: str = None, aggr_func: str = None, limit: int = 1000, order: str = "asc") -> list:
+        time.sleep(Runtime.network_latency)
+        now = time.time()
+        count = min(limit, 100)
+        rows = [(measure, time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(now - 60 * (count - i))), 20.0 + i % 5)
+                for i in range(count)]
+        return rows if order == "asc" else rows[::-1]
+
+
+class SQLStore:
+    """SQLStore backed by an in-memory SQLite database."""
+
+    def __init__(self, database_name: str = "arduino.db", *args, **kwargs):
+        self.database_name = database_name
+        # Public like in the brick, which Apps lock to use the connection directly
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn_lock = threading.RLock()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def execute_sql(self, sql: str, args: tuple = ()) -> list[dict] | None:
+        with self.conn_lock:
+            cursor = self.conn.execute(sql, args)
+            rows = cursor.fetchall()
+        return [dict(row) for row in rows] if cursor.description else None
+
+
+# ---------- arduino.app_bricks detection classes ----------
+
+class _Model:
+    """Base of the model stand-ins: answers after the simulated inference latency."""
+
+    def __init__(self, *args, confidence: float = 0.5, **kwargs):
+        self.confidence = confidence
+        Runtime.track(self)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def get_model_info(self):
+        # Like EdgeImpulseRunnerFacade.get_model_info when the runner can't be reached
+        return None
+
+    @staticmethod
+    def _infer():
+        time.sleep(Runtime.inference_latency)
+
+
+class ObjectDetection(_Model):
+    def detect(self, image, image_type: str = "jpg", confidence: float = None) -> dict:
+        self._infer()
+        # Boxes in pixels of the image received, like the model runner
+        width, height = (image if isinstance(image, Image.Image) else Image.open(io.BytesIO(image))).size
+        return {"detection": [
+            {"class_name": "cat", "confidence": "87.5", "bounding_box_xyxy": [0.1 * width, 0.2 * height, 0.5 * width, 0.7 * height]},
+            {"class_name": "dog", "confidence": "61.0", "bounding_box_xyxy": [0.5 * width, 0.1 * height, 0.9 * width, 0.6 * height]},
+        ]}
+
+    def draw_bounding_boxes(self, image, detections: dict):
+        return image
+
+
+class ImageClassification(_Model):
+    def classify(self, image, image_type: str = "jpg", confidence: float = None) -> dict:
+        self._infer()
+        return {"classification": [{"class_name": "cat", "confidence": "87.5"}, {"class_name": "dog", "confidence": "10.1"}]}
+
+
+class VisualAnomalyDetection(_Model):
+    def detect(self, image, image_type: str = "jpg") -> dict:
+        self._infer()
+        width, height = image.size if isinstance(image, Image.Image) else (256, 256)
+        cells = [(x, y) for x in range(0, width - 32, 64) for y in range(0, height - 32, 64)][:8]
+        return {
+            "anomaly_max_score": 9.5,
+            "anomaly_mean_score": 2.1,
+            "detection": [{"class_name": "anomaly", "score": 5.0 + i / 2, "bounding_box_xyxy": [x, y, x + 32, y + 32]}
+                          for i, (x, y) in enumerate(cells)],
+        }
+
+
+class _ModelInfo:
+    def __init__(self, features: int, frequency: int):
+        self.input_features_count = features
+        self.frequency = frequency
+        self.image_input_width = self.image_input_height = -1
+
+
+class AudioClassification(_Model):
+    def __init__(self, mic=None, confidence: float = 0.8):
+        super().__init__(confidence=confidence)
+        self.model_info = _ModelInfo(16000, 16000)
+
+    def infer_from_features(self, features: list) -> dict | None:
+        self._infer()
+        energy = float(np.abs(np.asarray(features[:1600], dtype=np.float64)).mean()) if features else 0.0
+        return {"result": {"classification": {"glass_breaking": min(energy / 5000, 1.0), "noise": 0.2}}}
+
+    def get_best_match(self, item: dict, confidence: float = None) -> tuple[str, float] | None:
+        scores = item["result"]["classification"]
+        label, value = max(scores.items(), key=lambda kv: kv[1])
+        return (label, value * 100) if value >= (confidence if confidence is not None else self.confidence) else None
+
+
+def _check_callback(callback: Callable, max_args: int, min_args: int = 0):
+    # Same checks as the real bricks: a function or lambda, not a bound method or other callable, taking
+    # the given number of arguments, so that registrations failing on the board fail here too
+    if not inspect.isfunction(callback):
+        raise TypeError("Callback must be a callable function.")
+    if not min_args <= len(inspect.signature(callback).parameters) <= max_args:
+        raise ValueError(f"Callback must accept between {min_args} and {max_args} arguments.")
+
+
+class _CallbackSource(_Model):
+    """A brick producing events: callbacks are registered by the App and invoked by the benchmark."""
+
+    # Arguments accepted by the callbacks of on_detect, as checked by the real brick
+    DETECT_ARGS = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **{k: v for k, v in kwargs.items() if k == "confidence"})
+        self.callbacks: dict[str, Callable] = {}
+        self.all_callback: Callable | None = None
+
+    def on_detect(self, label: str, callback: Callable):
+        _check_callback(callback, self.DETECT_ARGS)
+        self.callbacks[label] = callback
+
+    def on_detect_all(self, callback: Callable):
+        _check_callback(callback, 1, 1)
+        self.all_callback = callback
+
+    def override_threshold(self, threshold: float):
+        self.confidence = float(threshold)
+
+
+class VideoObjectDetection(_CallbackSource):
+    DETECT_ARGS = 1
+
+
+class VideoImageClassification(_CallbackSource):
+    pass
+
+
+class KeywordSpotting(_CallbackSource):
+    pass
+
+
+class MotionDetection(_CallbackSource):
+    def __init__(self, confidence: float = 0.4):
+        super().__init__(confidence=confidence)
+        self.samples = 0
+
+    def on_movement_detection(self, movement: str, callback: Callable):
+        self.callbacks[movement] = callback
+
+    def accumulate_samples(self, sample: tuple[float, float, float]):
+        self.samples += 1
+
+
+class Detection:
+    def __init__(self, content: str, type: str, coords=None):
+        self.content = content
+        self.type = type
+        self.coords = coords if coords is not None else np.array([[10, 10], [110, 10], [110, 110], [10, 110]])
+
+
+def draw_bounding_box(frame, detection):
+    return frame
+
+
+class CameraCodeDetection(_CallbackSource):
+    def on_detect(self, callback: Callable):
+        self.callbacks["detect"] = callback
+
+    def on_frame(self, callback: Callable):
+        self.callbacks["frame"] = callback
+
+    def on_error(self, callback: Callable):
+        self.callbacks["error"] = callback
+
+
+class _Forecast:
+    def __init__(self, city: str):
+        self.city = city
+        self.description = "Partly cloudy"
+        self.category = "cloudy"
+
+
+class WeatherForecast(_Model):
+    def get_forecast_by_city(self, city: str) -> _Forecast:
+        time.sleep(Runtime.network_latency)
+        return _Forecast(city)
+
+
+class ArduinoCloud(_Model):
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.properties: dict[str, Callable] = {}
+
+    def register(self, name: str, value=None, on_write: Callable = None, **kwargs):
+        self.properties[name] = on_write
+
+    def write(self, name: str, value):
+        """Simulate a property updated from the cloud."""
+        self.properties[name](self, value)
+
+
+class USBCamera(_Model):
+    pass
+
+
+class Microphone(_Model):
+    pass
+
+
+# ---------- installation ----------
+
+MODULES = {
+    "arduino": {},
+    "arduino.app_utils": {"App": App, "Bridge": Bridge, "Logger": Logger, "brick": brick,
+                          "draw_anomaly_markers": draw_anomaly_markers, "draw_bounding_boxes": draw_bounding_boxes},
+    "arduino.app_bricks": {},
+    "arduino.app_bricks.web_ui": {"WebUI": WebUI},
+    "arduino.app_bricks.dbstorage_tsstore": {"TimeSeriesStore": TimeSeriesStore},
+    "arduino.app_bricks.dbstorage_sqlstore": {"SQLStore": SQLStore},
+    "arduino.app_bricks.object_detection": {"ObjectDetection": ObjectDetection},
+    "arduino.app_bricks.image_classification": {"ImageClassification": ImageClassification},
+    "arduino.app_bricks.visual_anomaly_detection": {"VisualAnomalyDetection": VisualAnomalyDetection},
+    "arduino.app_bricks.audio_classification": {"AudioClassification": AudioClassification},
+    "arduino.app_bricks.keyword_spotting": {"KeywordSpotting": KeywordSpotting},
+    "arduino.app_bricks.motion_detection": {"MotionDetection": MotionDetection},
+    "arduino.app_bricks.video_objectdetection": {"VideoObjectDetection": VideoObjectDetection},
+    "arduino.app_bricks.video_imageclassification": {"VideoImageClassification": VideoImageClassification},
+    "arduino.app_bricks.camera_code_detection": {"CameraCodeDetection": CameraCodeDetection, "Detection": Detection,
+                                                 "draw_bounding_box": draw_bounding_box},
+    "arduino.app_bricks.weather_forecast": {"WeatherForecast": WeatherForecast},
+    "arduino.app_bricks.arduino_cloud": {"ArduinoCloud": ArduinoCloud},
+    "arduino.app_peripherals": {},
+    "arduino.app_peripherals.usb_camera": {"USBCamera": USBCamera},
+    "arduino.app_peripherals.microphone": {"Microphone": Microphone},
+}
+
+
+def install(mcu_latency: float = None, inference_latency: float = None, network_latency: float = None):
+    """Register the stand-in modules in sys.modules, replacing the real `arduino` package if it was imported."""
+    for name, attributes in MODULES.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        module.__all__ = list(attributes)
+        if name in ("arduino", "arduino.app_bricks", "arduino.app_peripherals"):
+            module.__path__ = []  # A package, so that submodules can be imported
+        sys.modules[name] = module
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(sys.modules[parent], child, module)
+    if mcu_latency is not None:
+        Runtime.mcu_latency = mcu_latency
+    if inference_latency is not None:
+        Runtime.inference_latency = inference_latency
+    if network_latency is not None:
+        Runtime.network_latency = network_latency
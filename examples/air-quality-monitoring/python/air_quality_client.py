@@ -0,0 +1,123 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from arduino.app_utils import brick, Logger
+
+logger = Logger("AirQualityClient")
+
+
+class AirQualityAPIError(Exception):
+    """The AQICN API answered with an error."""
+
+
+@brick
+class AirQualityClient:
+    """Cached client of the AQICN feed API.
+
+    `get` never touches the network: it answers from memory with the last successfully fetched data. When that
+    data is older than `ttl`, it is still returned (stale-while-revalidate) and a background loop is asked to fetch
+    it again. Requests go through a pooled HTTP session that keeps the TLS connection alive between refreshes,
+    with bounded connect/read timeouts and a few retries on gateway errors. If a refresh fails, the last known good
+    data keeps being served and the refresh is retried after `retry_interval`.
+    """
+
+    def __init__(self, endpoint: str, ttl: float = 600.0, retry_interval: float = 30.0, timeout: tuple[float, float] = (3.0, 5.0)):
+        """Configure the client.
+
+        Args:
+            endpoint (str): URL of the feed, including the API token.
+            ttl (float, optional): Time in seconds after which the data is refreshed. Defaults to 600.
+            retry_interval (float, optional): Time in seconds before retrying a failed refresh. Defaults to 30.
+            timeout (tuple[float, float], optional): Connect and read timeouts of a request in seconds.
+                Defaults to (3, 5).
+        """
+        self._endpoint = endpoint
+        self._ttl = ttl
+        self._retry_interval = retry_interval
+        self._timeout = timeout
+        self._session = requests.Session()
+        retries = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retries)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._data: dict | None = None
+        self._fetched_at: float | None = None
+        self._next_attempt = 0.0
+        self._refresh_needed = threading.Event()
+        self._refresh_needed.set()  # Fetch as soon as the App starts
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def stop(self):
+        self._session.close()
+
+    @property
+    def age(self) -> float | None:
+        """Seconds since the data was fetched, or None if it never was."""
+        return None if self._fetched_at is None else time.monotonic() - self._fetched_at
+
+    def get(self) -> dict | None:
+        """Return the last known good feed data, without blocking. None if nothing was fetched yet."""
+        data, age = self._data, self.age
+        if data is None:
+            self.misses += 1
+            self._refresh_needed.set()
+        elif age > self._ttl:
+            self.stale_hits += 1
+            self._refresh_needed.set()
+        else:
+            self.hits += 1
+        return data
+
+    def fetch(self) -> dict:
+        """Fetch the feed data from the API.
+
+        Raises:
+            requests.RequestException: If the request fails or times out.
+            AirQualityAPIError: If the API answers with an error.
+        """
+        response = self._session.get(self._endpoint, timeout=self._timeout)
+        response.raise_for_status()
+        response_json = response.json()
+        data = response_json.get("data", None)
+        if response_json.get("status", None) != "ok" or not data:
+            raise AirQualityAPIError(f"API Error: {response_json}")
+        return data
+
+    def refresh(self) -> bool:
+        """Fetch the feed data and cache it. On failure the last known good data is kept.
+
+        Returns:
+            bool: True if the data was refreshed.
+        """
+        self._next_attempt = time.monotonic() + self._retry_interval
+        try:
+            data = self.fetch()
+        except Exception as e:
+            self.errors += 1
+            age = self.age
+            fallback = f"serving data from {age:.0f} s ago" if age is not None else "no data available yet"
+            logger.warning(f"Failed to refresh air quality data ({fallback}): {e}")
+            return False
+        self._data = data
+        self._fetched_at = time.monotonic()
+        return True
+
+    def loop(self):
+        if not self._refresh_needed.wait(timeout=1.0):
+            return
+        # Don't retry a failed refresh before retry_interval, however often the data is requested
+        delay = self._next_attempt - time.monotonic()
+        if delay > 0:
+            time.sleep(min(delay, 1.0))
+            return
+        self._refresh_needed.clear()
+        self.refresh()
@@ -4,7 +4,7 @@
 
 from arduino.app_utils import *
 
-import requests
+from air_quality_client import AirQualityClient
 
 
 # Insert your API token here
@@ -16,6 +16,10 @@ city = "Torino"
 # Endpoint for AQICN API
 endpoint = f"https://api.waqi.info/feed/{city}/?token={API_TOKEN}"
 
+# Air quality changes slowly: the data is fetched in the background at most every 10 minutes,
+# and the last successfully fetched data is served from memory in the meantime
+air_quality = AirQualityClient(endpoint, ttl=600, retry_interval=30, timeout=(3.0, 5.0))
+
 # AQI levels mapping as a list of dictionaries
 AQI_LEVELS = [
     {"min": 0, "max": 50, "description": "Good"},
@@ -36,13 +40,10 @@ def map_aqi_level(aqi_value: int) -> str:
 
 
 def get_air_quality():
-    """Fetch air quality data from AQICN API and return AQI level."""
-    response = requests.get(endpoint)
-    response_json = response.json()
-    status = response_json.get("status", None)
-    data = response_json.get("data", None)
-    if status != 'ok' or not data:
-        print(f"API Error: {response_json}")
+    """Return the AQI level of the latest air quality data from AQICN API."""
+    data = air_quality.get()
+    if not data:
+        # Nothing fetched yet
         return
     aqi = data.get("aqi", -1)
     aqi_level = map_aqi_level(aqi)
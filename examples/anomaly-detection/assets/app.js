@@ -4,6 +4,7 @@
 
 let socket;
 let currentImage = null;
+let currentImageUrl = null;
 let resultImage = null;
 let errorContainer;
 
@@ -129,6 +130,7 @@ function switchImageSource(source) {
         }
 
         currentImage = null;
+        currentImageUrl = null;
     } else {
         sampleImagesGrid.style.display = 'none';
         imagePreview.style.display = 'flex';
@@ -197,6 +199,7 @@ function selectSampleImage(index) {
 // Upload new image function
 function uploadNewImage() {
     currentImage = null;
+    currentImageUrl = null;
     resultImage = null;
     selectedSampleImage = null;
 
@@ -408,6 +411,7 @@ function handleImageFile(file) {
     const reader = new FileReader();
     reader.onload = (e) => {
         currentImage = e.target.result.split(',')[1];
+        currentImageUrl = e.target.result;
 
         const imagePreview = document.getElementById('imagePreview');
         imagePreview.innerHTML = `<img src="${e.target.result}" alt="Uploaded image" class="preview-image">`;
@@ -447,9 +451,11 @@ function sendDetectionRequest() {
 
     const confidence = parseFloat(document.getElementById('confidenceSlider').value);
 
+    // Only the anomalous areas are sent back, and drawn over the image by drawAnomalyMarkers()
     socket.emit('detect_anomalies', {
         image: currentImage,
-        confidence: confidence
+        confidence: confidence,
+        response_mode: 'geometry'
     });
 }
 
@@ -461,6 +467,7 @@ function loadSampleImageForDetection(imagePath) {
                 const reader = new FileReader();
                 reader.onload = (e) => {
                     currentImage = e.target.result.split(',')[1];
+                    currentImageUrl = e.target.result;
                     resolve();
                 };
                 reader.onerror = reject;
@@ -512,26 +519,70 @@ function handleDetectionResult(data) {
         return;
     }
 
-    if (data.result_image) {
-        // Store the result image
-        resultImage = data.result_image;
-
-        // Display the result image in the image container
-        displayImage(`data:image/png;base64,${data.result_image}`, '.image-container');
-
-        // Show result title and download button
-        showResultHeader();
-
-        showStatus('Detection completed successfully!', 'success');
+    if (data.detections) {
+        drawAnomalyMarkers(currentImageUrl, data.detections, data.anomaly_max_score)
+            .then(showResult)
+            .catch(error => {
+                console.error('❌ Error drawing anomaly markers:', error);
+                showError('Failed to draw detection results');
+                setButtonState('ready');
+            });
+    } else if (data.result_image) {
+        // Image drawn by the server (response_mode 'image')
+        showResult(`data:${data.image_type || 'image/png'};base64,${data.result_image}`);
     } else {
-        showError('No result image received from detection');
+        showError('No result received from detection');
         setButtonState('ready');
-        return;
     }
+}
+
+function showResult(imageUrl) {
+    // Store the result image
+    resultImage = imageUrl;
 
+    // Display the result image in the image container
+    displayImage(imageUrl, '.image-container');
+
+    // Show result title and download button
+    showResultHeader();
+
+    showStatus('Detection completed successfully!', 'success');
     setButtonState('completed');
 }
 
+// Draws the anomalous areas over the image like the server-side draw_anomaly_markers does:
+// red boxes, more opaque the higher their score, with a black outline.
+// Resolves with the resulting PNG data URL.
+function drawAnomalyMarkers(imageUrl, detections, maxScore) {
+    return new Promise((resolve, reject) => {
+        const img = new Image();
+        img.onload = () => {
+            const canvas = document.createElement('canvas');
+            canvas.width = img.naturalWidth;
+            canvas.height = img.naturalHeight;
+            const ctx = canvas.getContext('2d');
+            ctx.drawImage(img, 0, 0);
+
+            const boxThickness = Math.max(1, Math.floor(Math.max(canvas.width, canvas.height) / 400));
+
+            detections.forEach(({ score, bounding_box_xyxy }) => {
+                const [x1, y1, x2, y2] = bounding_box_xyxy.map(Math.floor);
+                const alpha = maxScore > 0 ? Math.min(Math.max(score / maxScore, 0), 1) : 0;
+
+                ctx.fillStyle = `rgba(255, 0, 0, ${alpha})`;
+                ctx.fillRect(x1, y1, x2 - x1 + 1, y2 - y1 + 1);
+                ctx.strokeStyle = '#000000';
+                ctx.lineWidth = boxThickness;
+                ctx.strokeRect(x1 + boxThickness / 2, y1 + boxThickness / 2, x2 - x1 + 1 - boxThickness, y2 - y1 + 1 - boxThickness);
+            });
+
+            resolve(canvas.toDataURL('image/png'));
+        };
+        img.onerror = reject;
+        img.src = imageUrl;
+    });
+}
+
 function setButtonState(state) {
     const detectButton = document.getElementById('detectButton');
     const uploadNewButton = document.getElementById('uploadNewButton');
@@ -595,8 +646,8 @@ function downloadResult() {
 
     // Create download link
     const link = document.createElement('a');
-    link.href = `data:image/png;base64,${resultImage}`;
-    link.download = 'anomaly-detection-result.png';
+    link.href = resultImage;
+    link.download = `anomaly-detection-result.${resultImage.slice(11, resultImage.indexOf(';')).replace('jpeg', 'jpg')}`;
 
     // Trigger download
     document.body.appendChild(link);
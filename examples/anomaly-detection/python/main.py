@@ -2,67 +2,157 @@
 #
 # SPDX-License-Identifier: MPL-2.0
 
+# Imported first, to time the imports of everything else
+from startup_profiler import StartupProfiler
+profiler = StartupProfiler()
+
 from arduino.app_utils import *
 from arduino.app_bricks.web_ui import WebUI
-from arduino.app_bricks.visual_anomaly_detection import VisualAnomalyDetection
 from arduino.app_utils import draw_anomaly_markers
 from PIL import Image
 import io
 import base64
-import time
 import os
 from pathlib import Path
+from inference_queue import InferenceQueue
+from tiled_detection import TiledDetector
+from handler_metrics import HandlerMetrics
+from lazy_brick import LazyBrick
+
+def load_anomaly_detection():
+    from arduino.app_bricks.visual_anomaly_detection import VisualAnomalyDetection
+    return VisualAnomalyDetection()
+
+# The model brick is created in the background once the App runs: the web UI serves without waiting for it
+anomaly_detection = LazyBrick(load_anomaly_detection, "VisualAnomalyDetection", profiler=profiler)
+# Handlers and the steps of the requests are timed, and the measures served in the Prometheus format on /metrics
+metrics = HandlerMetrics()
 
-anomaly_detection = VisualAnomalyDetection()
+# Images whose longest side reaches TILING_MIN_SIZE pixels are detected as overlapping TILE_SIZE tiles
+# instead of being scaled down to the model input as a whole, so small cracks remain visible. A request
+# can force it with 'tiling': true or disable it with 'tiling': false.
+TILE_SIZE = 512
+TILING_MIN_SIZE = 1024
+tiled_detection = TiledDetector(lambda tile: anomaly_detection.detect(tile), tile_size=TILE_SIZE, overlap=0.25)
 
 SCRIPT_DIR = Path(__file__).resolve().parent.parent
 IMAGES_DIR = SCRIPT_DIR / "assets"
 os.makedirs(IMAGES_DIR, exist_ok=True)
 
-def on_detect_anomalies(client_id, data):
-    """Callback function to handle anomaly detection requests."""
-    try:
-        image_data = data.get('image')
-        if not image_data:
-            ui.send_message('detection_error', {'error': 'No image data'})
-            return
+# "geometry" only returns the anomalous areas, drawn by the browser over the image it already has.
+# "image" returns the image with the markers drawn by the server, encoded as IMAGE_FORMATS[image_format].
+DEFAULT_RESPONSE_MODE = "geometry"
+IMAGE_FORMATS = {"jpeg": "JPEG", "webp": "WEBP", "png": "PNG"}
+DEFAULT_IMAGE_FORMAT = "jpeg"
+DEFAULT_IMAGE_QUALITY = 85
+
+def encode_image(image: Image.Image, image_format: str, quality: int) -> tuple[str, str]:
+    """Encode an image as base64 in the given format. Returns (base64 data, MIME type)."""
+    pil_format = IMAGE_FORMATS.get(image_format)
+    if pil_format is None:
+        raise ValueError(f"Unsupported image format '{image_format}'. Must be one of {', '.join(IMAGE_FORMATS)}.")
+    if pil_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    img_buffer = io.BytesIO()
+    image.save(img_buffer, format=pil_format, quality=int(quality))
+    return base64.b64encode(img_buffer.getvalue()).decode("utf-8"), f"image/{image_format}"
 
-        image_bytes = base64.b64decode(image_data)
+def detect(request: dict) -> tuple[Image.Image, dict | None]:
+    """Run anomaly detection on a request, in an inference worker. Returns (decoded image, results)."""
+    with metrics.stage('base64_decode', 'detect_anomalies'):
+        image_bytes = base64.b64decode(request['image'])
+    with metrics.stage('image_decode', 'detect_anomalies'):
         pil_image = Image.open(io.BytesIO(image_bytes))
+        pil_image.load()
+    tiling = request.get('tiling', 'auto')
+    if tiling is True or (tiling == 'auto' and max(pil_image.size) >= TILING_MIN_SIZE):
+        with metrics.stage('tiled_inference', 'detect_anomalies'):
+            return pil_image, tiled_detection.detect(pil_image)
+    with metrics.stage('inference', 'detect_anomalies'):
+        return pil_image, anomaly_detection.detect(pil_image)
 
-        start_time = time.time() * 1000
-        results = anomaly_detection.detect(pil_image)
-        diff = time.time() * 1000 - start_time
+# Requests from every client are served in arrival order by a single worker: the model runs one
+# image at a time. At most 8 requests wait for it, newer ones are rejected. Requests arriving
+# within 20 ms of each other are batched, so identical ones (e.g. the same sample image from
+# several browsers) are only processed once.
+inference = InferenceQueue(detect, workers=1, max_queue=8, max_batch=4, batch_window=0.02,
+                           batch_key=lambda request: (request['image'], request.get('tiling', 'auto')))
 
-        if results is None:
-            ui.send_message('detection_error', {'error': 'No results returned'})
+def send_detection_result(client_id, data, detection, error, timings):
+    """Build the response of a detection request and send it to the client that asked for it."""
+    try:
+        if error is not None:
+            ui.send_message('detection_error', {'error': str(error)}, room=client_id)
             return
 
-        img_with_markers = draw_anomaly_markers(pil_image, results)
-
-        if img_with_markers is not None:
-            img_buffer = io.BytesIO()
-            img_with_markers.save(img_buffer, format="PNG")
-            img_buffer.seek(0)
-            b64_result = base64.b64encode(img_buffer.getvalue()).decode("utf-8")
-        else:
-            img_buffer = io.BytesIO()
-            pil_image.save(img_buffer, format="PNG")
-            img_buffer.seek(0)
-            b64_result = base64.b64encode(img_buffer.getvalue()).decode("utf-8")
+        metrics.observe('queue', timings['queue_wait_ms'] / 1000)
+        pil_image, results = detection
+        if results is None:
+            ui.send_message('detection_error', {'error': 'No results returned'}, room=client_id)
+            return
 
+        detections = results.get("detection", [])
         response = {
             'success': True,
-            'result_image': b64_result,
-            'detection_count': len(results) if results else 0,
-            'processing_time': f"{diff:.2f} ms"
+            'detection_count': len(detections),
+            'processing_time': f"{timings['inference_ms']:.2f} ms",
+            'queue_time': f"{timings['queue_wait_ms']:.2f} ms",
+            'batch_size': timings['batch_size'],
+            'tiles': results.get('tiles', 1)
         }
-        ui.send_message('detection_result', response)
+
+        if data.get('response_mode', DEFAULT_RESPONSE_MODE) == "geometry":
+            # The client already has the image: only send what is needed to draw the markers
+            response['image_size'] = list(pil_image.size)
+            response['anomaly_max_score'] = float(results.get('anomaly_max_score', 0.0))
+            response['anomaly_mean_score'] = float(results.get('anomaly_mean_score', 0.0))
+            response['detections'] = [
+                {
+                    'class_name': d.get('class_name'),
+                    'score': float(d.get('score', 0)),
+                    'bounding_box_xyxy': [float(v) for v in d.get('bounding_box_xyxy', [])],
+                }
+                for d in detections
+            ]
+        else:
+            with metrics.stage('render'):
+                img_with_markers = draw_anomaly_markers(pil_image, results)
+                if img_with_markers is None:
+                    img_with_markers = pil_image
+            with metrics.stage('encode'):
+                response['result_image'], response['image_type'] = encode_image(
+                    img_with_markers,
+                    data.get('image_format', DEFAULT_IMAGE_FORMAT),
+                    data.get('image_quality', DEFAULT_IMAGE_QUALITY),
+                )
+
+        ui.send_message('detection_result', response, room=client_id)
 
     except Exception as e:
-        ui.send_message('detection_error', {'error': str(e)})
+        ui.send_message('detection_error', {'error': str(e)}, room=client_id)
+
+# The response is built and sent by the inference worker: its steps are timed as part of the request
+send_result = metrics.timed('inference', 'detect_anomalies', send_detection_result)
+
+def on_detect_anomalies(client_id, data):
+    """Callback function to handle anomaly detection requests."""
+    if not data.get('image'):
+        ui.send_message('detection_error', {'error': 'No image data'}, room=client_id)
+        return
+
+    queued = inference.submit(
+        data,
+        lambda detection, error, timings: send_result(client_id, data, detection, error, timings)
+    )
+    if not queued:
+        ui.send_message('detection_error', {'error': 'Too many requests, please try again later'}, room=client_id)
 
-ui = WebUI()
+with profiler.step("WebUI"):
+    ui = WebUI()
+metrics.instrument(ui)
 ui.on_message('detect_anomalies', on_detect_anomalies)
+# Import and initialisation times of the App
+ui.expose_api('GET', '/startup', profiler.stats)
 
+profiler.finish()
 App.run()
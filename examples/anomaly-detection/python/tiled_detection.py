@@ -0,0 +1,132 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+import math
+import os
+from PIL import Image
+from arduino.app_utils import brick, Logger
+
+logger = Logger("TiledDetection")
+
+# (x1, y1, x2, y2) in pixels of the full image
+Box = tuple[int, int, int, int]
+
+
+def tile_starts(size: int, tile_size: int, overlap: int) -> list[int]:
+    """Start positions of the tiles covering `size` pixels, overlapping by at least `overlap` pixels.
+
+    The first tile starts at 0, the last one ends at `size` and the others are spread evenly in between.
+    """
+    if size <= tile_size:
+        return [0]
+    count = math.ceil((size - overlap) / (tile_size - overlap))
+    return [round(i * (size - tile_size) / (count - 1)) for i in range(count)]
+
+
+def tile_grid(width: int, height: int, tile_size: int, overlap: int) -> list[tuple[Box, Box]]:
+    """Split an image into overlapping tiles.
+
+    Returns:
+        list[tuple[Box, Box]]: The area of each tile, and its core: the part of the tile closer to its center than
+            to the center of any neighbour, cut in the middle of the overlaps. The cores of all the tiles cover the
+            image exactly once.
+    """
+    def spans(size: int) -> list[tuple[int, int, int, int]]:
+        starts = tile_starts(size, tile_size, overlap)
+        ends = [min(start + tile_size, size) for start in starts]
+        cuts = [0] + [(ends[i] + starts[i + 1]) // 2 for i in range(len(starts) - 1)] + [size]
+        return [(starts[i], ends[i], cuts[i], cuts[i + 1]) for i in range(len(starts))]
+
+    return [
+        ((x1, y1, x2, y2), (cx1, cy1, cx2, cy2))
+        for y1, y2, cy1, cy2 in spans(height)
+        for x1, x2, cx1, cx2 in spans(width)
+    ]
+
+
+def merge_tile_results(tiles: list[tuple[Box, Box]], results: list[dict]) -> dict:
+    """Merge the detection results of the tiles of an image into a result for the full image.
+
+    Boxes are moved from tile to image coordinates. Where tiles overlap, the same area is seen by several tiles:
+    a detection is only kept by the tile whose core contains its center, so seams don't produce duplicates.
+    `anomaly_max_score` is the maximum over the tiles, `anomaly_mean_score` the mean of the tiles weighted by the
+    area of their core.
+    """
+    detections = []
+    max_score, mean_score, scored_area = None, 0.0, 0
+    for ((x, y, _, _), (cx1, cy1, cx2, cy2)), result in zip(tiles, results):
+        for detection in result.get("detection", []):
+            x1, y1, x2, y2 = detection["bounding_box_xyxy"]
+            x1, y1, x2, y2 = x1 + x, y1 + y, x2 + x, y2 + y
+            if not (cx1 <= (x1 + x2) / 2 < cx2 and cy1 <= (y1 + y2) / 2 < cy2):
+                continue
+            detections.append({**detection, "bounding_box_xyxy": [x1, y1, x2, y2]})
+        if "anomaly_max_score" in result:
+            area = (cx2 - cx1) * (cy2 - cy1)
+            max_score = max(max_score if max_score is not None else -math.inf, result["anomaly_max_score"])
+            mean_score += result["anomaly_mean_score"] * area
+            scored_area += area
+
+    merged = {"detection": detections, "tiles": len(tiles)}
+    if max_score is not None:
+        merged["anomaly_max_score"] = max_score
+        merged["anomaly_mean_score"] = mean_score / scored_area if scored_area else 0.0
+    return merged
+
+
+@brick
+class TiledDetector:
+    """Runs anomaly detection on large images as a grid of overlapping tiles, in parallel.
+
+    Feeding a multi-megapixel image to the model in one go scales it down to the model input size, and small
+    defects like thin cracks vanish. Here the image is split into `tile_size` pixel tiles overlapping by
+    `overlap` times their size, so that a defect cut by a seam is still seen whole by one of the tiles. The tiles
+    are detected by a pool of `workers` threads: the model runs in the inference container, so concurrent
+    requests keep all its cores busy while the tiles are cropped and encoded here. The results are merged back
+    into full-image coordinates by `merge_tile_results`.
+    """
+
+    def __init__(self, detect: Callable[[Image.Image], dict | None], tile_size: int = 512, overlap: float = 0.25,
+                 workers: int | None = None):
+        """Configure the detector.
+
+        Args:
+            detect (Callable[[Image.Image], dict | None]): Detects the anomalies of a tile, like
+                VisualAnomalyDetection.detect. Returns None on failure.
+            tile_size (int, optional): Width and height of the tiles in pixels. Defaults to 512.
+            overlap (float, optional): Overlap of adjacent tiles, as a fraction of the tile size, in [0, 0.5].
+                Defaults to 0.25.
+            workers (int, optional): Number of tiles detected in parallel. Defaults to the number of CPU cores.
+
+        Raises:
+            ValueError: If tile_size or workers is not positive, or overlap is not in [0, 0.5].
+        """
+        workers = workers or os.cpu_count() or 1
+        if tile_size <= 0 or workers <= 0 or not 0 <= overlap <= 0.5:
+            raise ValueError("tile_size and workers must be positive and overlap in [0, 0.5]")
+        self._detect = detect
+        self._tile_size = tile_size
+        self._overlap = int(tile_size * overlap)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="TiledDetection")
+
+    def stop(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def detect(self, image: Image.Image) -> dict | None:
+        """Detect the anomalies of an image, tile by tile.
+
+        Returns:
+            dict | None: The merged result, see `merge_tile_results`, with the number of tiles in ``tiles``, or
+                None if the detection of any tile failed: a partial result would silently miss defects.
+        """
+        image.load()  # Decode once, before the workers crop it concurrently
+        tiles = tile_grid(*image.size, self._tile_size, self._overlap)
+        results = list(self._executor.map(lambda tile: self._detect(image.crop(tile[0])), tiles))
+        failed = sum(result is None for result in results)
+        if failed:
+            logger.warning(f"Detection failed on {failed} of {len(tiles)} tiles")
+            return None
+        return merge_tile_results(tiles, results)
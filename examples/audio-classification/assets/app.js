@@ -5,8 +5,13 @@
 // Global variables to hold the application state
 let socket;
 let currentAudio = null; // This will hold base64 data for UPLOADED files only
+let currentFile = null; // The UPLOADED file, streamed in chunks when larger than STREAM_THRESHOLD
+let currentStream = null; // State of the upload being streamed, if any
 let resultAudio = null;
 
+const STREAM_THRESHOLD = 1024 * 1024; // Larger uploads are classified while they are streamed
+const STREAM_CHUNK_SIZE = 64 * 1024;
+
 let currentAudioSource = 'sample'; // 'sample' or 'upload'
 let sampleAudios = []; // Array of sample audio filenames
 let selectedSampleAudio = null; // Filename of the selected sample audio
@@ -58,7 +63,7 @@ function initializeElements() {
 
     audioInput.addEventListener('change', handleAudioUpload);
     audioPreview.addEventListener('click', () => {
-        if (!currentAudio && currentAudioSource === 'upload') {
+        if (!currentFile && currentAudioSource === 'upload') {
             audioInput.click();
         }
     });
@@ -258,6 +263,7 @@ function handleAudioUpload(event) {
 /**
  * Processes the selected audio file (from upload or drag-and-drop).
  * Reads the file as a Data URL to prepare it for sending and playback.
+ * Large files are not read: they are streamed when classified.
  */
 function handleAudioFile(file) {
     if (!file.type.startsWith('audio/')) {
@@ -265,30 +271,44 @@ function handleAudioFile(file) {
         return;
     }
 
+    currentFile = file;
+    if (file.size > STREAM_THRESHOLD) {
+        currentAudio = null;
+        showUploadedAudio(file, URL.createObjectURL(file));
+        return;
+    }
+
     const reader = new FileReader();
     reader.onload = (e) => {
         currentAudio = e.target.result.split(',')[1];
+        showUploadedAudio(file, e.target.result);
+    };
+    reader.readAsDataURL(file);
+}
 
-        const audioPreview = document.getElementById('audioPreview');
-        const audioPlayer = document.getElementById('audioPlayer');
-        const audioPlayerContainer = document.getElementById('audioPlayerContainer');
-        const audioInfo = document.getElementById('audioInfo');
+/**
+ * Shows the player of the uploaded file, playing it from the given URL.
+ */
+function showUploadedAudio(file, src) {
+    const audioPreview = document.getElementById('audioPreview');
+    const audioPlayer = document.getElementById('audioPlayer');
+    const audioPlayerContainer = document.getElementById('audioPlayerContainer');
+    const audioInfo = document.getElementById('audioInfo');
 
-        // Hide upload area and show player
-        if (audioPreview) audioPreview.style.display = 'none';
-        if (audioPlayerContainer) audioPlayerContainer.style.display = 'block';
+    // Hide upload area and show player
+    if (audioPreview) audioPreview.style.display = 'none';
+    if (audioPlayerContainer) audioPlayerContainer.style.display = 'block';
 
-        if (audioPlayer) {
-            audioPlayer.src = e.target.result;
-        }
-        if (audioInfo) {
-            audioInfo.textContent = `File: ${file.name} (${(file.size / 1024 / 1024).toFixed(2)} MB) | Processing time: --`;
-        }
+    if (audioPlayer) {
+        if (audioPlayer.src.startsWith('blob:')) URL.revokeObjectURL(audioPlayer.src);
+        audioPlayer.src = src;
+    }
+    if (audioInfo) {
+        audioInfo.textContent = `File: ${file.name} (${(file.size / 1024 / 1024).toFixed(2)} MB) | Processing time: --`;
+    }
 
-        setButtonState('ready');
-        clearStatus();
-    };
-    reader.readAsDataURL(file);
+    setButtonState('ready');
+    clearStatus();
 }
 
 /**
@@ -296,6 +316,8 @@ function handleAudioFile(file) {
  */
 function uploadNewAudio() {
     currentAudio = null;
+    currentFile = null;
+    currentStream = null;
     resultAudio = null;
     selectedSampleAudio = null;
 
@@ -408,7 +430,23 @@ function initSocketIO() {
     // Handles the final classification result from the server
     socket.on('classification_complete', handleClassificationResult);
 
+    // Streaming of large uploads: each acknowledgement asks for the next chunk
+    socket.on('audio_stream_ack', (data) => {
+        if (currentStream && data.stream_id === currentStream.id) {
+            sendNextStreamChunk();
+        }
+    });
+    socket.on('classification_partial', handlePartialClassification);
+    socket.on('classification_stream_complete', (data) => {
+        if (currentStream && data.stream_id === currentStream.id) {
+            currentStream = null;
+            clearStatus();
+            handleClassificationResult(data);
+        }
+    });
+
     socket.on('classification_error', (data) => {
+        currentStream = null;
         showError(`Audio classification failed: ${data.message}`);
         setButtonState('ready');
     });
@@ -528,7 +566,9 @@ function runClassification() {
     const payload = { confidence: confidence };
 
     if (currentAudioSource === 'upload') {
-        if (currentAudio) {
+        if (currentFile && currentFile.size > STREAM_THRESHOLD) {
+            streamClassification(currentFile, confidence);
+        } else if (currentAudio) {
             payload.audio_data = currentAudio;
             socket.emit('run_classification', payload);
         } else {
@@ -548,6 +588,52 @@ function runClassification() {
     }
 }
 
+/**
+ * Classifies a large file while streaming it to the board in chunks.
+ * The board acknowledges every message, and the next chunk is only sent then.
+ */
+function streamClassification(file, confidence) {
+    currentStream = {
+        id: `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 8)}`,
+        file: file,
+        offset: 0,
+        seq: 0,
+        windows: 0,
+        best: null,
+    };
+    showStatus('Streaming audio: 0%');
+    socket.emit('audio_stream_start', { stream_id: currentStream.id, confidence: confidence });
+}
+
+async function sendNextStreamChunk() {
+    const stream = currentStream;
+    if (stream.offset >= stream.file.size) {
+        socket.emit('audio_stream_end', { stream_id: stream.id });
+        return;
+    }
+    const chunk = await stream.file.slice(stream.offset, stream.offset + STREAM_CHUNK_SIZE).arrayBuffer();
+    if (stream !== currentStream) return; // Cancelled meanwhile
+    stream.offset += chunk.byteLength;
+    stream.seq += 1;
+    socket.emit('audio_stream_chunk', { stream_id: stream.id, seq: stream.seq, data: chunk });
+}
+
+/**
+ * Shows the progress of a streamed classification, and the best match so far.
+ */
+function handlePartialClassification(data) {
+    const stream = currentStream;
+    if (!stream || data.stream_id !== stream.id) return;
+
+    stream.windows += 1;
+    if (data.classification && (!stream.best || data.classification.confidence > stream.best.confidence)) {
+        stream.best = data.classification;
+        displayClassificationResults(stream.best);
+    }
+    const progress = Math.round(stream.offset / stream.file.size * 100);
+    showStatus(`Streaming audio: ${progress}% | ${stream.windows} windows classified, up to ${data.end_time.toFixed(1)} s`);
+}
+
 /**
  * Manages the state of the main action buttons (e.g., hiding/showing, enabling/disabling).
  */
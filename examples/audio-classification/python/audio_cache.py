@@ -0,0 +1,174 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from collections import OrderedDict
+from collections.abc import Callable
+import hashlib
+import io
+import os
+import threading
+import wave
+import numpy as np
+from arduino.app_utils import Logger
+
+logger = Logger("AudioCache")
+
+# WAV sample width in bytes -> dtype of the samples, as unpacked by AudioClassification.classify_from_file
+SAMPLE_DTYPES = {1: np.dtype("u1"), 2: np.dtype("<i2"), 4: np.dtype("<i4")}
+
+
+def content_hash(data: bytes) -> str:
+    """Return the hex digest identifying an audio clip by its content."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def decode_pcm(frames: bytes, samp_width: int) -> np.ndarray:
+    """Decode raw interleaved PCM frames into samples.
+
+    The samples are the same values `AudioClassification.classify_from_file` feeds to the model: 8-bit samples
+    are unsigned, 16, 24 and 32-bit samples are signed. Trailing bytes not making a whole sample are ignored.
+
+    Raises:
+        ValueError: If the sample width is not supported.
+    """
+    if samp_width not in (1, 2, 3, 4):
+        raise ValueError(f"Unsupported sample width: {samp_width} bytes. Cannot process this WAV file.")
+    frames = frames[: len(frames) - len(frames) % samp_width]
+    if samp_width == 3:
+        # No 24-bit dtype: sign-extend each sample into the upper bytes of a 32-bit integer
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        padded = np.zeros((len(raw), 4), dtype=np.uint8)
+        padded[:, 1:] = raw
+        return padded.view("<i4").ravel() >> 8
+    return np.frombuffer(frames, dtype=SAMPLE_DTYPES[samp_width])
+
+
+def decode_wav(data: bytes) -> np.ndarray:
+    """Decode a WAV file into its interleaved PCM samples, see `decode_pcm`.
+
+    Raises:
+        wave.Error: If the data is not a valid WAV file.
+        ValueError: If the file uses an unsupported sample width.
+    """
+    with wave.open(io.BytesIO(data), "rb") as wf:
+        samp_width = wf.getsampwidth()
+        frames = wf.readframes(wf.getnframes())
+    return decode_pcm(frames, samp_width)
+
+
+class AudioCache:
+    """Decoded audio clips and classification results, keyed by the content hash of the clips.
+
+    The bundled samples are decoded once, by `preload` or on first use, and kept in memory. Uploaded clips are
+    hashed on arrival and only decoded if their content wasn't classified before.
+
+    The raw model output is memoized per clip content, and the confidence threshold is applied to it on every
+    request, so running a clip again, even with a different confidence, doesn't run the model again. Only the
+    `max_results` most recently used results are kept.
+    """
+
+    def __init__(self, get_classifier: Callable, sample_dir: str, max_results: int = 256):
+        """Configure the cache.
+
+        Args:
+            get_classifier (Callable): Returns the AudioClassification brick. Called on the first classification,
+                so that the model is only loaded when needed.
+            sample_dir (str): Directory of the bundled WAV samples.
+            max_results (int, optional): Number of memoized classification results. Defaults to 256.
+        """
+        self._get_classifier = get_classifier
+        self._sample_dir = sample_dir
+        self._max_results = max_results
+        self._samples: dict[str, tuple[str, np.ndarray]] = {}  # file name -> (hash, samples)
+        self._results: OrderedDict[str, dict] = OrderedDict()  # hash -> raw model output, LRU
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def preload(self) -> int:
+        """Decode all the bundled samples. Returns the number of samples loaded."""
+        names = sorted(name for name in os.listdir(self._sample_dir) if name.lower().endswith(".wav")) if os.path.isdir(self._sample_dir) else []
+        for name in names:
+            try:
+                self.load_sample(name)
+            except Exception as e:
+                logger.warning(f"Skipping sample '{name}': {e}")
+        logger.info(f"Preloaded {len(self._samples)} audio samples from {self._sample_dir}")
+        return len(self._samples)
+
+    def load_sample(self, name: str) -> tuple[str, np.ndarray]:
+        """Return the content hash and samples of a bundled sample, decoding it if not done yet.
+
+        Raises:
+            FileNotFoundError: If there is no sample with this name.
+            wave.Error: If the sample is not a valid WAV file.
+            ValueError: If the sample uses an unsupported sample width.
+        """
+        entry = self._samples.get(name)
+        if entry is not None:
+            return entry
+        # Only plain file names, so that requests can't read outside the sample directory
+        path = os.path.join(self._sample_dir, name)
+        if os.path.basename(name) != name or not os.path.isfile(path):
+            raise FileNotFoundError(f"Sample file not found: {name}")
+        with open(path, "rb") as f:
+            data = f.read()
+        entry = self._samples[name] = (content_hash(data), decode_wav(data))
+        return entry
+
+    def classify_sample(self, name: str, confidence: float) -> tuple[dict | None, bool]:
+        """Classify a bundled sample. See `classify`.
+
+        Raises:
+            FileNotFoundError: If there is no sample with this name.
+        """
+        digest, samples = self.load_sample(name)
+        return self.classify(digest, lambda: samples, confidence)
+
+    def classify_upload(self, data: bytes, confidence: float) -> tuple[dict | None, bool]:
+        """Classify an uploaded WAV file. See `classify`."""
+        digest = content_hash(data)
+        return self.classify(digest, lambda: decode_wav(data), confidence)
+
+    def classify(self, digest: str, load: Callable[[], np.ndarray], confidence: float) -> tuple[dict | None, bool]:
+        """Classify a clip, running the model only if its output for this content isn't memoized.
+
+        Args:
+            digest (str): Content hash of the clip.
+            load (Callable[[], np.ndarray]): Returns the decoded samples of the clip. Only called on a miss.
+            confidence (float): Confidence threshold (0-1).
+
+        Returns:
+            tuple[dict | None, bool]: The best match, with keys ``class_name`` and ``confidence``, or None if no
+                class reaches the threshold, and whether the model output was memoized.
+
+        Raises:
+            wave.Error: If the clip is not a valid WAV file.
+            ValueError: If the clip uses an unsupported sample width.
+        """
+        classifier = self._get_classifier()
+        with self._lock:
+            classification = self._results.get(digest)
+            if classification is not None:
+                self._results.move_to_end(digest)
+                self.hits += 1
+            else:
+                self.misses += 1
+        cached = classification is not None
+
+        if not cached:
+            features = load()[: int(classifier.model_info.input_features_count)].tolist()
+            classification = classifier.infer_from_features(features)
+            if classification is None:
+                # The runner failed: don't memoize the failure
+                return None, False
+            with self._lock:
+                self._results[digest] = classification
+                while len(self._results) > self._max_results:
+                    self._results.popitem(last=False)
+
+        best_match = classifier.get_best_match(classification, confidence)
+        if not best_match or not best_match[0] or not best_match[1]:
+            return None, cached
+        return {"class_name": best_match[0], "confidence": best_match[1]}, cached
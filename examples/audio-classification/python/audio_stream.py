@@ -0,0 +1,311 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+import struct
+import threading
+import time
+import numpy as np
+from arduino.app_utils import brick, Logger
+from audio_cache import decode_pcm
+
+logger = Logger("AudioStream")
+
+# Bytes of WAV header buffered while looking for the start of the audio data
+MAX_HEADER_SIZE = 64 * 1024
+
+# WAVE_FORMAT_PCM and WAVE_FORMAT_EXTENSIBLE, the formats read by the wave module
+PCM_FORMATS = (0x0001, 0xFFFE)
+
+
+class WavStreamDecoder:
+    """Decodes a WAV file received in consecutive chunks into PCM samples, without keeping it in memory."""
+
+    def __init__(self):
+        self.channels: int | None = None
+        self.sample_rate: int | None = None
+        self.sample_width: int | None = None
+        self._header: bytearray | None = bytearray()
+        self._remaining: int | None = None  # Bytes of audio data left, None if the header doesn't tell
+        self._rest = b""  # Bytes of an incomplete sample, completed by the next chunk
+
+    @property
+    def ready(self) -> bool:
+        """True once the header is parsed."""
+        return self._header is None
+
+    def feed(self, data: bytes) -> np.ndarray:
+        """Decode the next chunk of the file.
+
+        Returns:
+            np.ndarray: The interleaved samples completed by this chunk, see `decode_pcm`. Empty while the header
+                is being received.
+
+        Raises:
+            ValueError: If the data is not a PCM WAV file.
+        """
+        if self._header is not None:
+            self._header += data
+            offset = self._parse_header()
+            if offset is None:
+                if len(self._header) > MAX_HEADER_SIZE:
+                    raise ValueError("No audio data found in the WAV header")
+                return np.empty(0)
+            data = bytes(self._header[offset:])
+            self._header = None
+
+        if self._remaining is not None:
+            data = data[: self._remaining]
+            self._remaining -= len(data)
+        data = self._rest + data
+        usable = len(data) - len(data) % self.sample_width
+        self._rest = data[usable:]
+        return decode_pcm(data[:usable], self.sample_width)
+
+    def _parse_header(self) -> int | None:
+        """Parse the RIFF chunks before the audio data. Returns the offset of the audio data, or None if incomplete."""
+        header = self._header
+        if len(header) < 12:
+            return None
+        if header[0:4] != b"RIFF" or header[8:12] != b"WAVE":
+            raise ValueError("Not a WAV file")
+        offset = 12
+        while len(header) >= offset + 8:
+            chunk_id = bytes(header[offset:offset + 4])
+            chunk_size = struct.unpack_from("<I", header, offset + 4)[0]
+            if chunk_id == b"data":
+                if self.sample_width is None:
+                    raise ValueError("WAV file without format chunk")
+                # Streamed WAV files may not know their size in advance
+                self._remaining = chunk_size if 0 < chunk_size < 0xFFFFFFFF else None
+                return offset + 8
+            if len(header) < offset + 8 + chunk_size:
+                return None
+            if chunk_id == b"fmt ":
+                audio_format, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", header, offset + 8)
+                if audio_format not in PCM_FORMATS:
+                    raise ValueError(f"Unsupported WAV format: {audio_format:#06x}. Only PCM is supported.")
+                self.channels, self.sample_rate, self.sample_width = channels, sample_rate, (bits + 7) // 8
+            offset += 8 + chunk_size + chunk_size % 2  # Chunks are padded to an even size
+        return None
+
+
+class _Stream:
+    """State of the audio stream of a client."""
+
+    def __init__(self, stream_id: str, confidence: float, max_pending: int):
+        self.stream_id = stream_id
+        self.confidence = confidence
+        self.decoder = WavStreamDecoder()
+        self.buffer = np.empty(0)  # The latest samples received, from absolute position buffer_start
+        self.buffer_start = 0
+        self.received = 0  # Samples received
+        self.next_start = 0  # Position of the next window
+        self.windows = 0
+        self.futures: list[Future] = []
+        self.pending = threading.BoundedSemaphore(max_pending)
+        self.best: dict | None = None
+        self.failed = 0
+        self.started = time.perf_counter()
+        self.cancelled = False
+        self.lock = threading.Lock()  # Held while processing a request of the client
+        self.results_lock = threading.Lock()  # Held by the workers, never while waiting for them
+
+
+@brick
+class AudioStreams:
+    """Classifies audio files streamed in chunks by the web clients, over a sliding window.
+
+    A client opens a stream with `open`, then sends the WAV file in consecutive chunks with `feed` and ends it with
+    `close`. Each request is acknowledged with an 'audio_stream_ack' message once processed, and the client waits
+    for it before sending the next one: this keeps the chunks in order and applies backpressure.
+
+    Every time enough samples are received, a window of the size of the model input is classified, the window
+    then slides by `slide` times its size. Each result is sent to the client as a 'classification_partial'
+    message as soon as it is available, and a 'classification_stream_complete' message with the best match over
+    all the windows ends the stream.
+
+    Windows are classified by a pool of `workers` threads, so that several inferences can run in parallel, on
+    different cores. At most `max_pending` windows of a stream are waiting to be classified: further chunks
+    are only acknowledged when a window is done. Memory used by a stream is thus bounded by the window size,
+    not by the length of the file.
+    """
+
+    def __init__(self, get_classifier: Callable, ui, workers: int = 1, slide: float = 0.5, max_pending: int | None = None):
+        """Configure the streams.
+
+        Args:
+            get_classifier (Callable): Returns the AudioClassification brick.
+            ui (WebUI): WebUI the messages are sent to.
+            workers (int, optional): Number of windows classified in parallel. Defaults to 1.
+            slide (float, optional): Fraction of the window the window slides by, between 0 and 1. Defaults to 0.5.
+            max_pending (int, optional): Number of windows of a stream waiting to be classified. Defaults to twice
+                the number of workers.
+
+        Raises:
+            ValueError: If workers is not positive or slide is not in (0, 1].
+        """
+        if workers < 1 or not 0 < slide <= 1:
+            raise ValueError("workers must be positive and slide in (0, 1]")
+        self._get_classifier = get_classifier
+        self._ui = ui
+        self._slide = slide
+        self._max_pending = max_pending or 2 * workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="AudioStream")
+        self._streams: dict[str, _Stream] = {}  # client sid -> stream
+        self._lock = threading.Lock()
+
+    def stop(self):
+        with self._lock:
+            for stream in self._streams.values():
+                stream.cancelled = True
+            self._streams.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def open(self, sid: str, stream_id: str, confidence: float):
+        """Start a new stream for a client, cancelling the previous one if any."""
+        self.cancel(sid)
+        with self._lock:
+            self._streams[sid] = _Stream(stream_id, confidence, self._max_pending)
+        self._ack(sid, stream_id, 0)
+
+    def feed(self, sid: str, stream_id: str, seq: int, data: bytes):
+        """Process the next chunk of the WAV file of a client's stream.
+
+        Raises:
+            ValueError: If there is no such stream, or the data is not a PCM WAV file.
+        """
+        stream = self._get(sid, stream_id)
+        classifier = self._get_classifier()
+        window = int(classifier.model_info.input_features_count)
+        step = max(int(window * self._slide), 1)
+
+        with stream.lock:
+            ready = stream.decoder.ready
+            samples = stream.decoder.feed(data)
+            if not ready and stream.decoder.ready and stream.decoder.sample_rate != classifier.model_info.frequency:
+                logger.warning(f"Stream {stream_id} is sampled at {stream.decoder.sample_rate} Hz, "
+                               f"the model expects {classifier.model_info.frequency} Hz")
+            if len(samples):
+                stream.buffer = np.concatenate((stream.buffer, samples)) if len(stream.buffer) else samples
+                stream.received += len(samples)
+
+            while stream.next_start + window <= stream.received and not stream.cancelled:
+                offset = stream.next_start - stream.buffer_start
+                self._submit(sid, stream, classifier, stream.buffer[offset:offset + window], stream.next_start)
+                stream.next_start += step
+
+            # Keep the samples of the next window, and at least a full window for the last one
+            drop = min(stream.next_start, stream.received - window) - stream.buffer_start
+            if drop > 0:
+                stream.buffer = stream.buffer[drop:].copy()
+                stream.buffer_start += drop
+        self._ack(sid, stream_id, seq)
+
+    def close(self, sid: str, stream_id: str):
+        """End a client's stream: classify the end of the file, wait for all the windows and send the summary.
+
+        Raises:
+            ValueError: If there is no such stream.
+        """
+        stream = self._get(sid, stream_id)
+        classifier = self._get_classifier()
+        window = int(classifier.model_info.input_features_count)
+
+        with stream.lock:
+            if not stream.received:
+                raise ValueError("No audio data received")
+            # Like classify_from_file, a file shorter than a window is classified as it is. Otherwise the end
+            # of the file not covered by a window yet gets one, aligned to the end.
+            last_end = stream.next_start - max(int(window * self._slide), 1) + window if stream.windows else 0
+            if stream.received > last_end or not stream.windows:
+                start = max(stream.received - window, 0)
+                offset = start - stream.buffer_start
+                self._submit(sid, stream, classifier, stream.buffer[offset:offset + window], start)
+            futures = list(stream.futures)
+
+        wait(futures)
+        with self._lock:
+            if self._streams.get(sid) is stream:
+                del self._streams[sid]
+        if stream.cancelled:
+            return
+
+        channels = stream.decoder.channels or 1
+        rate = stream.decoder.sample_rate or classifier.model_info.frequency
+        response_data = {
+            'stream_id': stream_id,
+            'results': stream.best,
+            'windows': stream.windows,
+            'failed_windows': stream.failed,
+            'duration': stream.received / channels / rate,
+            'processing_time': (time.perf_counter() - stream.started) * 1000,
+        }
+        if stream.best:
+            response_data['classification'] = stream.best
+        else:
+            response_data['error'] = "No objects detected in the audio. Try to lower the confidence threshold."
+        self._ui.send_message('classification_stream_complete', response_data, sid)
+
+    def cancel(self, sid: str):
+        """Cancel the stream of a client, e.g. when it disconnects."""
+        with self._lock:
+            stream = self._streams.pop(sid, None)
+        if stream is not None:
+            stream.cancelled = True
+            for future in stream.futures:
+                future.cancel()
+
+    def _get(self, sid: str, stream_id: str) -> _Stream:
+        with self._lock:
+            stream = self._streams.get(sid)
+        if stream is None or stream.stream_id != stream_id:
+            raise ValueError(f"Unknown audio stream: {stream_id}")
+        return stream
+
+    def _ack(self, sid: str, stream_id: str, seq: int):
+        self._ui.send_message('audio_stream_ack', {'stream_id': stream_id, 'seq': seq}, sid)
+
+    def _submit(self, sid: str, stream: _Stream, classifier, samples: np.ndarray, start: int):
+        # Blocks while max_pending windows of the stream are waiting, so the chunk isn't acknowledged meanwhile
+        stream.pending.acquire()
+        index = stream.windows
+        stream.windows += 1
+        try:
+            future = self._executor.submit(self._classify, sid, stream, classifier, samples, index, start)
+        except RuntimeError:
+            stream.pending.release()  # Shut down
+            raise
+        future.add_done_callback(lambda _: stream.pending.release())
+        stream.futures = [f for f in stream.futures if not f.done()] + [future]
+
+    def _classify(self, sid: str, stream: _Stream, classifier, samples: np.ndarray, index: int, start: int):
+        if stream.cancelled:
+            return
+        started = time.perf_counter()
+        classification = classifier.infer_from_features(samples.tolist())
+        best_match = classifier.get_best_match(classification, stream.confidence) if classification else None
+        result = None
+        if best_match and best_match[0] and best_match[1]:
+            result = {'class_name': best_match[0], 'confidence': best_match[1]}
+
+        with stream.results_lock:
+            if classification is None:
+                stream.failed += 1
+            if result and (stream.best is None or result['confidence'] > stream.best['confidence']):
+                stream.best = result
+        if stream.cancelled:
+            return
+
+        per_second = (stream.decoder.channels or 1) * (stream.decoder.sample_rate or classifier.model_info.frequency)
+        self._ui.send_message('classification_partial', {
+            'stream_id': stream.stream_id,
+            'window': index,
+            'start_time': start / per_second,
+            'end_time': (start + len(samples)) / per_second,
+            'classification': result,
+            'error': "Classification failed" if classification is None else None,
+            'processing_time': (time.perf_counter() - started) * 1000,
+        }, sid)
@@ -2,40 +2,48 @@
 #
 # SPDX-License-Identifier: MPL-2.0
 
+# Imported first, to time the imports of everything else
+from startup_profiler import StartupProfiler
+profiler = StartupProfiler()
+
 from arduino.app_utils import *
 from arduino.app_bricks.web_ui import WebUI
-from arduino.app_bricks.audio_classification import AudioClassification
+from audio_cache import AudioCache
+from audio_stream import AudioStreams
+from handler_metrics import HandlerMetrics
+from lazy_brick import LazyBrick
 import time
-import os
-import io
 import base64
 import json
+import threading
 
 # Global state
 AUDIO_DIR = "/app/assets/audio"
-audio_classifier = None
+STREAM_WORKERS = 2  # Windows of a streamed file classified in parallel
+
+def load_audio_classifier():
+    """Create the audio classifier. The brick module is only imported here, so that it doesn't delay the startup"""
+    from arduino.app_bricks.audio_classification import AudioClassification
+    from arduino.app_peripherals.microphone import Microphone
+    try:
+        return AudioClassification(mic=None)
+    except:
+        class MockMicrophone:
+            def __init__(self):
+                self.sample_rate = 16000
+                self.channels = 1
+            def start_recording(self): pass
+            def stop_recording(self): pass
+            def read(self): return b''
+        mock_mic = MockMicrophone()
+        return AudioClassification(mic=mock_mic)
+
+# The classifier is created in the background once the App runs: the web UI serves without waiting for it
+audio_classifier = LazyBrick(load_audio_classifier, "AudioClassification", profiler=profiler)
 
 def get_audio_classifier():
-    """Lazy initialization of audio classifier"""
-    global audio_classifier
-    if audio_classifier is None:
-        try:
-            from arduino.app_peripherals.microphone import Microphone
-            try:
-                audio_classifier = AudioClassification(mic=None)
-            except:
-                class MockMicrophone:
-                    def __init__(self):
-                        self.sample_rate = 16000
-                        self.channels = 1
-                    def start_recording(self): pass
-                    def stop_recording(self): pass
-                    def read(self): return b''
-                mock_mic = MockMicrophone()
-                audio_classifier = AudioClassification(mic=mock_mic)
-        except Exception as e:
-            raise e
-    return audio_classifier
+    """Return the audio classifier, waiting for it to be created if needed"""
+    return audio_classifier.get()
 
 def parse_data(data):
     """Parse incoming data - handle both string and dict"""
@@ -54,42 +62,84 @@ def on_run_classification(sid, data):
         audio_data = parsed_data.get('audio_data')
         selected_file = parsed_data.get('selected_file')
 
-        input_audio = None
+        start_time = time.perf_counter()
         if audio_data:
-            audio_bytes = base64.b64decode(audio_data)
-            input_audio = io.BytesIO(audio_bytes)
+            with metrics.stage('base64_decode'):
+                audio_bytes = base64.b64decode(audio_data)
+            with metrics.stage('inference'):
+                results, cached = audio_cache.classify_upload(audio_bytes, confidence)
         elif selected_file:
-            file_path = os.path.join(AUDIO_DIR, selected_file)
-            if not os.path.exists(file_path):
+            try:
+                with metrics.stage('inference'):
+                    results, cached = audio_cache.classify_sample(selected_file, confidence)
+            except FileNotFoundError:
                 ui.send_message('classification_error', {'message': f'Sample file not found: {selected_file}'}, sid)
                 return
-            with open(file_path, "rb") as f:
-                input_audio = io.BytesIO(f.read())
-        
-        if input_audio:
-            classifier = get_audio_classifier()
-            start_time = time.time() * 1000
-            results = classifier.classify_from_file(input_audio, confidence)
-            diff = time.time() * 1000 - start_time
-
-            response_data = { 'results': results, 'processing_time': diff }
-            if results:
-                response_data['classification'] = { 'class_name': results["class_name"], 'confidence': results["confidence"] }
-            else:
-                response_data['error'] = "No objects detected in the audio. Try to lower the confidence threshold."
-            
-            ui.send_message('classification_complete', response_data, sid)
         else:
             ui.send_message('classification_error', {'message': "No audio available for classification"}, sid)
+            return
+        diff = (time.perf_counter() - start_time) * 1000
+
+        response_data = { 'results': results, 'processing_time': diff, 'cached': cached }
+        if results:
+            response_data['classification'] = { 'class_name': results["class_name"], 'confidence': results["confidence"] }
+        else:
+            response_data['error'] = "No objects detected in the audio. Try to lower the confidence threshold."
+
+        ui.send_message('classification_complete', response_data, sid)
 
     except Exception as e:
         ui.send_message('classification_error', {'message': str(e)}, sid)
 
-# Initialize WebUI
-ui = WebUI()
+def on_audio_stream(handler):
+    """Wrap a streaming handler, reporting its errors to the client and ending its stream"""
+    def on_message(sid, data):
+        parsed_data = parse_data(data)
+        try:
+            handler(sid, parsed_data)
+        except Exception as e:
+            audio_streams.cancel(sid)
+            ui.send_message('classification_error', {'message': str(e), 'stream_id': parsed_data.get('stream_id')}, sid)
+    return on_message
+
+def on_audio_stream_start(sid, data):
+    """Start streaming an uploaded file"""
+    audio_streams.open(sid, data.get('stream_id'), data.get('confidence', 0.5))
+
+def on_audio_stream_chunk(sid, data):
+    """Classify the next chunk of a streamed file"""
+    audio_streams.feed(sid, data.get('stream_id'), data.get('seq'), data.get('data'))
+
+def on_audio_stream_end(sid, data):
+    """Finish classifying a streamed file"""
+    audio_streams.close(sid, data.get('stream_id'))
+
+def preload_samples():
+    """Decode the bundled samples while the web UI is already serving"""
+    with profiler.step("AudioCache.preload"):
+        audio_cache.preload()
+
+# Decode the bundled samples once, classification results are memoized by audio content
+audio_cache = AudioCache(get_audio_classifier, AUDIO_DIR)
+
+# Initialize WebUI, with its handlers timed and the measures served in the Prometheus format on /metrics
+with profiler.step("WebUI"):
+    ui = WebUI()
+metrics = HandlerMetrics(ui)
+
+# Long uploads are streamed in chunks and classified over a sliding window
+audio_streams = AudioStreams(get_audio_classifier, ui, workers=STREAM_WORKERS)
 
 # Handle socket messages
 ui.on_message('run_classification', on_run_classification)
+ui.on_message('audio_stream_start', on_audio_stream(on_audio_stream_start))
+ui.on_message('audio_stream_chunk', on_audio_stream(on_audio_stream_chunk))
+ui.on_message('audio_stream_end', on_audio_stream(on_audio_stream_end))
+ui.on_disconnect(audio_streams.cancel)
+# Import and initialisation times of the App
+ui.expose_api('GET', '/startup', profiler.stats)
 
 # Start the application
+profiler.finish()
+threading.Thread(target=preload_samples, name="preload_samples", daemon=True).start()
 App.run()
\ No newline at end of file
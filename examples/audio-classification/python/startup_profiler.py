@@ -0,0 +1,117 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+# Only standard library imports here: this module is imported before everything it measures
+import builtins
+from contextlib import contextmanager
+import sys
+import threading
+import time
+
+
+class StartupProfiler:
+    """Measures where the startup time of the App goes: the import of each module and the initialisation of each
+    brick.
+
+    Create it at the very top of main.py, before the other imports: from then on, until `finish`, every module
+    loaded is timed, both including the modules it imports itself and on its own. Initialisation steps are timed
+    with `step`, and the bricks created later, e.g. by a LazyBrick once the App is serving, are reported
+    separately as deferred. `finish` is called right before App.run(): it logs the slowest modules and steps and
+    stops timing imports.
+    """
+
+    def __init__(self, top: int = 10):
+        """Start timing the imports.
+
+        Args:
+            top (int, optional): Number of modules listed by the report. Defaults to 10.
+        """
+        self._top = top
+        self._started = time.perf_counter()
+        self._startup: float | None = None
+        self._modules = len(sys.modules)  # Modules loaded before the profiler, then during startup
+        self._lock = threading.Lock()
+        self._local = threading.local()  # Stack of the times spent in the nested imports of each module
+        self._imports: dict[str, tuple[float, float]] = {}  # module -> (total, self) seconds
+        self._imports_total = 0.0  # Time of the outermost imports only, so nested ones aren't counted twice
+        self._steps: dict[str, float] = {}
+        self._deferred: dict[str, float] = {}
+        self._import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level:
+            return self._import(name, globals, locals, fromlist, level)
+        loaded = len(sys.modules)
+        new = name not in sys.modules
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            if len(sys.modules) > loaded:
+                # Something was loaded: the module itself, or submodules listed by a `from ... import`
+                label = name if new or not fromlist else f"{name}.{','.join(fromlist)}"
+                with self._lock:
+                    total, own = self._imports.get(label, (0.0, 0.0))
+                    self._imports[label] = (total + elapsed, own + elapsed - nested)
+                    if not stack:
+                        self._imports_total += elapsed
+
+    @contextmanager
+    def step(self, name: str):
+        """Time an initialisation step, e.g. `with profiler.step("ObjectDetection"):`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        """Record the duration of an initialisation step measured elsewhere."""
+        with self._lock:
+            steps = self._steps if self._startup is None else self._deferred
+            steps[name] = steps.get(name, 0.0) + seconds
+
+    def finish(self):
+        """Stop timing the imports and log the report. Called right before App.run()."""
+        if builtins.__import__ == self._timed_import:
+            builtins.__import__ = self._import
+        with self._lock:
+            self._startup = time.perf_counter() - self._started
+            self._modules = len(sys.modules) - self._modules
+        from arduino.app_utils import Logger
+        stats = self.stats()
+        logger = Logger("StartupProfiler")
+        logger.info(f"Started in {stats['startup_ms']} ms, {stats['imports_ms']} ms of which importing "
+                    f"{stats['modules_loaded']} modules")
+        for entry in stats["imports"]:
+            logger.info(f"  import {entry['module']}: {entry['total_ms']} ms ({entry['self_ms']} ms on its own)")
+        for name, ms in stats["steps"].items():
+            logger.info(f"  {name}: {ms} ms")
+
+    def stats(self) -> dict:
+        """Return the startup time, the slowest module imports and the initialisation steps, in milliseconds.
+
+        Modules are sorted by the time of their import including the modules they import. Steps done after startup
+        are listed under ``deferred``.
+        """
+        def ms(seconds: float) -> float:
+            return round(seconds * 1000, 1)
+
+        with self._lock:
+            slowest = sorted(self._imports.items(), key=lambda item: item[1][0], reverse=True)[:self._top]
+            return {
+                "startup_ms": ms(self._startup) if self._startup is not None else None,
+                "imports_ms": ms(self._imports_total),
+                "modules_loaded": self._modules if self._startup is not None else len(sys.modules) - self._modules,
+                "imports": [{"module": name, "total_ms": ms(total), "self_ms": ms(own)} for name, (total, own) in slowest],
+                "steps": {name: ms(seconds) for name, seconds in self._steps.items()},
+                "deferred": {name: ms(seconds) for name, seconds in self._deferred.items()},
+            }
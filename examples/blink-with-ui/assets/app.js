@@ -34,6 +34,13 @@ function initSocketIO() {
         updateLedStatus(message);
     });
 
+    socket.on('error', (message) => {
+        if (errorContainer) {
+            errorContainer.textContent = message;
+            errorContainer.style.display = 'block';
+        }
+    });
+
     socket.on('disconnect', () => {
         if (errorContainer) {
             errorContainer.textContent = 'Connection to the board lost. Please check the connection.';
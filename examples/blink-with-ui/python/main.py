@@ -2,11 +2,21 @@
 #
 # SPDX-License-Identifier: MPL-2.0
 
+import threading
 from arduino.app_utils import *
 from arduino.app_bricks.web_ui import WebUI
+from bridge_dispatcher import BridgeDispatcher
+from handler_metrics import HandlerMetrics
 
-# Global state
+# Global state: the LED state the sketch confirmed, and the one it was last asked for. Toggles flip the
+# requested state, so toggling again before the sketch answers isn't lost.
 led_is_on = False
+led_requested = False
+led_pending = 0  # Calls sent to the sketch and not answered yet
+led_lock = threading.Lock()
+
+# Bridge calls are sent from a worker thread, so socket handlers don't wait for the microcontroller
+bridge = BridgeDispatcher()
 
 def get_led_status():
     """Get current LED status for API."""
@@ -17,26 +27,45 @@ def get_led_status():
 
 def toggle_led_state(client, data):
     """Toggle the LED state when receiving socket message."""
-    global led_is_on
-    led_is_on = not led_is_on
+    global led_requested, led_pending
+    with led_lock:
+        led_requested = not led_requested
+        led_pending += 1
+        state = led_requested
 
     # Call a function in the sketch, using the Bridge helper library, to control the state of the LED connected to the microcontroller.
     # This performs a RPC call and allows the Python code and the Sketch code to communicate.
-    Bridge.call("set_led_state", led_is_on)
+    # Once the sketch has answered, the updated status is sent to all connected clients.
+    bridge.submit("set_led_state", state).add_done_callback(lambda call: on_led_state_set(call, state))
 
-    # Send updated status to all connected clients
+def on_led_state_set(call, state: bool):
+    """Record the LED state once the sketch has answered, and send it to all clients, whether it changed or not."""
+    global led_is_on, led_requested, led_pending
+    error = call.exception()
+    with led_lock:
+        if error is None:
+            led_is_on = state
+        led_pending -= 1
+        # Calls are answered in order: once none is left, the next toggle starts from the state the LED is in
+        if led_pending == 0:
+            led_requested = led_is_on
+    if error is not None:
+        ui.send_message('error', f"Failed to set the LED: {error}")
     ui.send_message('led_status_update', get_led_status())
 
 def on_get_initial_state(client, data):
     """Handle client request for initial LED state."""
     ui.send_message('led_status_update', get_led_status(), client)
 
-# Initialize WebUI
+# Initialize WebUI, with its handlers timed and the measures served in the Prometheus format on /metrics
 ui = WebUI()
+metrics = HandlerMetrics(ui)
 
 # Handle socket messages (like in Code Scanner example)
 ui.on_message('toggle_led', toggle_led_state)
 ui.on_message('get_initial_state', on_get_initial_state)
+# RPC latency statistics per method
+ui.expose_api('GET', '/bridge/stats', bridge.stats)
 
 # Start the application
 App.run()
@@ -0,0 +1,218 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+import math
+import threading
+import time
+from typing import Any
+from arduino.app_utils import brick, Bridge, Logger
+
+logger = Logger("BridgeDispatcher")
+
+# Upper bounds in milliseconds of the latency histogram buckets, the last one catches everything slower
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, math.inf)
+
+
+class QueueFullError(Exception):
+    """Too many calls of the method are waiting to be sent."""
+
+
+class LatencyHistogram:
+    """Counts of latencies per bucket of LATENCY_BUCKETS_MS, with percentiles estimated from the buckets."""
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, latency_ms: float):
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        self.count += 1
+        self.total += latency_ms
+        self.max = max(self.max, latency_ms)
+
+    def percentile(self, q: float) -> float | None:
+        """Estimate the q-th quantile (0-1), interpolating linearly inside its bucket. None if nothing was recorded."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = LATENCY_BUCKETS_MS[i - 1] if i else 0.0
+                upper = min(LATENCY_BUCKETS_MS[i], self.max)
+                return lower + (upper - lower) * (rank - seen) / count if upper > lower else upper
+            seen += count
+        return self.max
+
+
+class _Method:
+    """Calls waiting to be sent for an RPC method, and its statistics."""
+
+    def __init__(self):
+        self.queue: deque[tuple[tuple, float | None, Future, float]] = deque()  # (params, timeout, future, enqueued)
+        self.active = False  # A worker is sending the queued calls
+        self.histogram = LatencyHistogram()
+        self.queue_wait = 0.0
+        self.errors = 0
+        self.timeouts = 0
+        self.dropped = 0
+
+
+@brick
+class BridgeDispatcher:
+    """Sends the Bridge calls to the microcontroller from worker threads, so callers don't wait for the MCU.
+
+    Calls are queued per RPC method and sent in order, one at a time per method: two calls of a method never
+    overtake each other, while calls of different methods run in parallel on `workers` threads. `submit` returns a
+    Future of the result, `post` sends the call fire-and-forget and only logs failures. At most `max_pending` calls
+    of a method wait in its queue, further ones fail with QueueFullError.
+
+    The latency of each RPC is recorded in a histogram per method. `stats()` returns the call counts, errors,
+    timeouts, time spent queued and the p50/p95/p99 latencies, and is logged every `log_interval` seconds if set.
+    """
+
+    def __init__(self, call: Callable[..., Any] = None, timeout: int = 10, max_pending: int = 32, workers: int = 4,
+                 log_interval: float | None = None):
+        """Configure the dispatcher.
+
+        Args:
+            call (Callable[..., Any], optional): Sends an RPC, called as call(method, *params, timeout=timeout).
+                Defaults to Bridge.call. Can be replaced by a local stand-in for the router, e.g. in benchmarks.
+            timeout (int, optional): Default timeout of the calls in seconds. Defaults to 10.
+            max_pending (int, optional): Maximum number of calls of a method waiting to be sent. Defaults to 32.
+            workers (int, optional): Number of methods whose calls are sent at the same time. Defaults to 4.
+            log_interval (float, optional): Period in seconds of the statistics log. Defaults to no log.
+
+        Raises:
+            ValueError: If timeout, max_pending or workers is not positive.
+        """
+        if timeout <= 0 or max_pending <= 0 or workers <= 0:
+            raise ValueError("timeout, max_pending and workers must be positive")
+        self._call = call or Bridge.call
+        self._timeout = timeout
+        self._max_pending = max_pending
+        self._log_interval = log_interval
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="BridgeDispatcher")
+        self._methods: dict[str, _Method] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+        with self._lock:
+            pending = [future for method in self._methods.values() for _, _, future, _ in method.queue]
+            for method in self._methods.values():
+                method.queue.clear()
+        for future in pending:
+            future.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def loop(self):
+        if self._stopped.wait(self._log_interval or 1.0) or not self._log_interval:
+            return
+        for method, stats in self.stats().items():
+            if stats["calls"]:
+                logger.info(f"{method}: {stats['calls']} calls, {stats['errors']} errors, {stats['timeouts']} timeouts, "
+                            f"p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms, p99 {stats['p99_ms']} ms")
+
+    def submit(self, method: str, *params, timeout: int | None = None) -> Future:
+        """Queue a call of an RPC method of the microcontroller.
+
+        Args:
+            method (str): Name of the method, as provided by the sketch.
+            *params: Parameters of the method.
+            timeout (int, optional): Timeout of the call in seconds. Defaults to the dispatcher timeout.
+
+        Returns:
+            Future: Resolved with the result of the call, or failed with its error, or QueueFullError.
+        """
+        future = Future()
+        with self._lock:
+            state = self._methods.get(method)
+            if state is None:
+                state = self._methods[method] = _Method()
+            full = len(state.queue) >= self._max_pending
+            if full:
+                state.dropped += 1
+            else:
+                state.queue.append((params, timeout, future, time.monotonic()))
+                start = not state.active
+                state.active = True
+        if full:
+            future.set_exception(QueueFullError(f"Too many pending '{method}' calls"))
+        elif start:
+            self._executor.submit(self._drain, method, state)
+        return future
+
+    def post(self, method: str, *params, timeout: int | None = None):
+        """Queue a call of an RPC method without waiting for its result. Failures are logged."""
+        self.submit(method, *params, timeout=timeout).add_done_callback(lambda future: self._log_failure(method, future))
+
+    def _log_failure(self, method: str, future: Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"Bridge call '{method}' failed: {future.exception()}")
+
+    def _drain(self, method: str, state: _Method):
+        """Send the queued calls of a method, in order, until its queue is empty."""
+        while True:
+            with self._lock:
+                if not state.queue or self._stopped.is_set():
+                    state.active = False
+                    return
+                params, timeout, future, enqueued = state.queue.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.monotonic()
+            try:
+                result = self._call(method, *params, timeout=timeout or self._timeout)
+                error = None
+            except Exception as e:
+                error = e
+            elapsed_ms = (time.monotonic() - started) * 1000
+
+            with self._lock:
+                state.histogram.record(elapsed_ms)
+                state.queue_wait += started - enqueued
+                if isinstance(error, TimeoutError):
+                    state.timeouts += 1
+                elif error is not None:
+                    state.errors += 1
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def stats(self) -> dict:
+        """Return the statistics of each RPC method. Latencies are in milliseconds, and the histogram maps the upper
+        bound of each bucket to its count."""
+        def ms(value: float | None) -> float | None:
+            return round(value, 2) if value is not None else None
+
+        with self._lock:
+            return {
+                method: {
+                    "calls": state.histogram.count,
+                    "errors": state.errors,
+                    "timeouts": state.timeouts,
+                    "dropped": state.dropped,
+                    "pending": len(state.queue),
+                    "queue_wait_avg_ms": ms(state.queue_wait / state.histogram.count * 1000) if state.histogram.count else None,
+                    "avg_ms": ms(state.histogram.total / state.histogram.count) if state.histogram.count else None,
+                    "p50_ms": ms(state.histogram.percentile(0.50)),
+                    "p95_ms": ms(state.histogram.percentile(0.95)),
+                    "p99_ms": ms(state.histogram.percentile(0.99)),
+                    "max_ms": ms(state.histogram.max) if state.histogram.count else None,
+                    "histogram": {
+                        ("+Inf" if math.isinf(bound) else str(bound)): count
+                        for bound, count in zip(LATENCY_BUCKETS_MS, state.histogram.counts)
+                    },
+                }
+                for method, state in self._methods.items()
+            }
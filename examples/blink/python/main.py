@@ -3,14 +3,19 @@
 # SPDX-License-Identifier: MPL-2.0
 
 from arduino.app_utils import *
+from bridge_dispatcher import BridgeDispatcher
 import time
 
 led_state = False
 
+# Bridge calls are sent from a worker thread, so the loop keeps its pace even if the MCU is slow to answer.
+# RPC latency statistics are logged every minute.
+bridge = BridgeDispatcher(log_interval=60)
+
 def loop():
     global led_state
     time.sleep(1)
     led_state = not led_state
-    Bridge.call("set_led_state", led_state)
+    bridge.post("set_led_state", led_state)
 
 App.run(user_loop=loop)
\ No newline at end of file
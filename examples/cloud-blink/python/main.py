@@ -4,18 +4,23 @@
 
 # EXAMPLE_NAME = "Arduino Cloud LED Blink Example"
 from arduino.app_bricks.arduino_cloud import ArduinoCloud
-from arduino.app_utils import App, Bridge
+from arduino.app_utils import App
+from bridge_dispatcher import BridgeDispatcher
 
 # If secrets are not provided in the class initialization, they will be read from environment variables
 iot_cloud = ArduinoCloud()
 
+# Bridge calls are sent from a worker thread, so cloud callbacks don't wait for the microcontroller.
+# RPC latency statistics are logged every minute.
+bridge = BridgeDispatcher(log_interval=60)
+
 
 def led_callback(client: object, value: bool):
     """Callback function to handle LED blink updates from cloud."""
     print(f"LED blink value updated from cloud: {value}")
     # Call a function in the sketch, using the Bridge helper library, to control the state of the LED connected to the microcontroller.
     # This performs a RPC call and allows the Python code and the Sketch code to communicate.
-    Bridge.call("set_led_state", value)
+    bridge.post("set_led_state", value)
 
 iot_cloud.register("led", value=False, on_write=led_callback)
 
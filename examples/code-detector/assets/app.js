@@ -57,7 +57,10 @@ function initSocketIO() {
         updateCameraStatus('show');
         scanInfoElement.innerHTML = ``; // Clear the scan info display
         rescanButtonContainer.style.display = 'none'; // Hide the "Scan another" button while scanning
+        // Frames are binary JPEGs. Acknowledge each one once drawn: the server only sends the next
+        // frame after that, and adapts the preview quality to how fast frames are acknowledged.
         await renderFrameImage(message.image, message.image_type);
+        socket.emit('frame_ack', { seq: message.seq });
     });
 
     socket.on('error', async (message) => {
@@ -272,8 +275,8 @@ async function renderLatestScanImage() {
     }
 
     try {
-        const image = base64ToUint8Array(scans[0].image);
-        const blob = new Blob([image], { type: scans[0].image_type });
+        // The image of a new scan is received as binary data
+        const blob = new Blob([scans[0].image], { type: scans[0].image_type });
 
         // Clean up the previous ImageBitmap to free memory
         if (currentImageBitmap) {
@@ -296,11 +299,10 @@ async function renderLatestScanImage() {
     }
 }
 
-// Function to render a frame image
+// Function to render a frame image, received as binary data
 async function renderFrameImage(image, image_type) {
     try {
-        const imageBytes = base64ToUint8Array(image);
-        const blob = new Blob([imageBytes], { type: image_type });
+        const blob = new Blob([image], { type: image_type });
 
         // Clean up the previous ImageBitmap to free memory
         if (currentImageBitmap) {
@@ -322,15 +324,3 @@ async function renderFrameImage(image, image_type) {
         console.error('Error processing frame_bytes:', error);
     }
 }
-
-// Function to convert base64 string to Uint8Array.
-// This is used to convert the base64 encoded image data received from the server.
-function base64ToUint8Array(base64) {
-    const binaryString = atob(base64);
-    const len = binaryString.length;
-    const bytes = new Uint8Array(len);
-    for (let i = 0; i < len; i++) {
-        bytes[i] = binaryString.charCodeAt(i);
-    }
-    return bytes;
-}
@@ -0,0 +1,198 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from collections.abc import Iterator
+import io
+import threading
+import time
+from PIL.Image import Image
+from arduino.app_utils import Logger
+
+logger = Logger("FrameStream")
+
+# Preview levels, best first: (JPEG quality, downscale factor)
+LEVELS = ((85, 1), (70, 1), (55, 1), (60, 2), (45, 2))
+
+MJPEG_BOUNDARY = "frame"
+
+
+class FrameEncoder:
+    """Holds the latest camera frame and JPEG-encodes it lazily, at most once per level."""
+
+    def __init__(self, levels: tuple[tuple[int, int], ...] = LEVELS):
+        self.levels = levels
+        self.seq = 0
+        self._frame: Image | None = None
+        self._encoded: dict[int, bytes] = {}
+        self._last_size: dict[int, int] = {}
+        self._cond = threading.Condition()
+
+    def update(self, frame: Image) -> int:
+        """Replace the latest frame, dropping its encodings. Returns the new frame sequence number."""
+        with self._cond:
+            self._frame = frame
+            self._encoded = {}
+            self.seq += 1
+            self._cond.notify_all()
+            return self.seq
+
+    def encode(self, level: int) -> tuple[int, bytes | None]:
+        """Return (sequence number, JPEG bytes) of the latest frame at the given level, encoding it if needed."""
+        with self._cond:
+            seq, frame = self.seq, self._frame
+            data = self._encoded.get(level)
+        if frame is None or data is not None:
+            return seq, data
+
+        quality, factor = self.levels[level]
+        image = frame.reduce(factor) if factor > 1 else frame
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality)
+        data = buffer.getvalue()
+
+        with self._cond:
+            self._last_size[level] = len(data)
+            if self.seq == seq:
+                self._encoded[level] = data
+        return seq, data
+
+    def last_size(self, level: int) -> int | None:
+        """Size in bytes of the last frame encoded at the given level, if any."""
+        return self._last_size.get(level)
+
+    def wait(self, after_seq: int, timeout: float) -> bool:
+        """Wait until a frame newer than `after_seq` is available. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.seq > after_seq, timeout=timeout)
+
+
+class _Client:
+    __slots__ = ("level", "in_flight", "sent_at", "sent_size", "throughput")
+
+    def __init__(self):
+        self.level = 0
+        self.in_flight: int | None = None  # Sequence number of the frame waiting to be acknowledged
+        self.sent_at = 0.0
+        self.sent_size = 0
+        self.throughput: float | None = None  # Bytes/s, exponentially weighted
+
+
+class FrameStreamer:
+    """Streams camera preview frames to the WebUI clients, adapting to each client.
+
+    Frames are only encoded when somebody is watching, and at most once per level, however many clients share
+    it. They are sent as binary JPEG messages to each client separately, and a client only gets a new frame after
+    acknowledging the previous one, so a slow client skips frames instead of queuing them. The time taken to
+    acknowledge a frame gives the client throughput: when it can't keep up with the camera frame rate, the client
+    is moved to a lower quality/resolution level, and back up when it has enough headroom.
+
+    The frames can also be streamed as multipart MJPEG over HTTP, see `mjpeg()`.
+    """
+
+    def __init__(self, ui, fps: float, levels: tuple[tuple[int, int], ...] = LEVELS,
+                 message_type: str = "frame_detected", ack_timeout: float = 2.0):
+        """Configure the streamer.
+
+        Args:
+            ui (WebUI): WebUI the frames are sent through.
+            fps (float): Camera frame rate, the rate clients should keep up with.
+            levels (tuple[tuple[int, int], ...], optional): (JPEG quality, downscale factor) levels, best first.
+            message_type (str, optional): Message type of the frames. Defaults to "frame_detected".
+            ack_timeout (float, optional): Time in seconds after which an unacknowledged frame is considered
+                lost, and the client moved to a lower level. Defaults to 2.
+        """
+        self._ui = ui
+        self._fps = fps
+        self._message_type = message_type
+        self._ack_timeout = ack_timeout
+        self.encoder = FrameEncoder(levels)
+        self._clients: dict[str, _Client] = {}
+        self._mjpeg_clients = 0
+        self._lock = threading.Lock()
+        self.bytes_sent = 0
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._clients) or self._mjpeg_clients > 0
+
+    def add_client(self, sid: str):
+        with self._lock:
+            self._clients[sid] = _Client()
+
+    def remove_client(self, sid: str):
+        with self._lock:
+            self._clients.pop(sid, None)
+
+    def push(self, frame: Image, **fields):
+        """Send a new frame to every client ready for it. Extra fields are added to the message."""
+        if not self.has_subscribers:
+            return
+        self.encoder.update(frame)
+
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for sid, client in self._clients.items():
+                if client.in_flight is not None:
+                    if now - client.sent_at < self._ack_timeout:
+                        continue
+                    # Lost, or the client is far too slow
+                    client.level = min(client.level + 1, len(self.encoder.levels) - 1)
+                    client.throughput = None
+                ready.append((sid, client))
+
+        for sid, client in ready:
+            seq, data = self.encoder.encode(client.level)
+            if data is None:
+                continue
+            with self._lock:
+                client.in_flight, client.sent_at, client.sent_size = seq, time.monotonic(), len(data)
+            self.bytes_sent += len(data)
+            self._ui.send_message(self._message_type, {"seq": seq, "image": data, "image_type": "image/jpeg", **fields}, room=sid)
+
+    def ack(self, sid: str, data: dict):
+        """Handle a client acknowledging a frame, and adapt its level to the measured throughput."""
+        seq = (data or {}).get("seq")
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None or client.in_flight is None or seq != client.in_flight:
+                return
+            elapsed = max(time.monotonic() - client.sent_at, 1e-3)
+            client.in_flight = None
+            rate = client.sent_size / elapsed
+            client.throughput = rate if client.throughput is None else 0.7 * client.throughput + 0.3 * rate
+
+            if client.throughput < client.sent_size * self._fps:
+                if client.level < len(self.encoder.levels) - 1:
+                    client.level += 1
+                    logger.debug(f"Client {sid} at {client.throughput:.0f} B/s, lowering preview to level {client.level}")
+            elif client.level > 0:
+                upper_size = self.encoder.last_size(client.level - 1) or client.sent_size * 2
+                if client.throughput > 2 * upper_size * self._fps:
+                    client.level -= 1
+                    logger.debug(f"Client {sid} at {client.throughput:.0f} B/s, raising preview to level {client.level}")
+
+    def mjpeg(self, level: int = 0) -> Iterator[bytes]:
+        """Multipart MJPEG stream of the frames at the given level, to be served as
+        `multipart/x-mixed-replace; boundary=frame`. Frames that are produced while the client is still
+        receiving the previous one are skipped.
+        """
+        level = min(max(level, 0), len(self.encoder.levels) - 1)
+        with self._lock:
+            self._mjpeg_clients += 1
+        try:
+            seq = self.encoder.seq
+            while True:
+                if not self.encoder.wait(seq, timeout=1.0):
+                    continue
+                seq, data = self.encoder.encode(level)
+                if data is None:
+                    continue
+                self.bytes_sent += len(data)
+                yield (f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(data)}\r\n\r\n").encode() + data + b"\r\n"
+        finally:
+            with self._lock:
+                self._mjpeg_clients -= 1
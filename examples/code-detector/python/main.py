@@ -3,14 +3,19 @@
 # SPDX-License-Identifier: MPL-2.0
 
 from datetime import datetime, UTC
-import io
-import base64
 from PIL.Image import Image
 from arduino.app_utils import *
 from arduino.app_peripherals.usb_camera import USBCamera
 from arduino.app_bricks.web_ui import WebUI
 from arduino.app_bricks.camera_code_detection import CameraCodeDetection, Detection, draw_bounding_box
 from arduino.app_bricks.dbstorage_sqlstore import SQLStore
+from fastapi.responses import Response, StreamingResponse
+from frame_stream import FrameStreamer, MJPEG_BOUNDARY
+from scan_log import ScanLog
+from handler_metrics import HandlerMetrics
+
+CAMERA_FPS = 5
+SCAN_IMAGE_QUALITY = 90
 
 detected = False
 
@@ -21,20 +26,22 @@ def on_code_detected(frame: Image, detection: Detection):
         # If a code has already been detected, ignore further detections
         return
 
-    frame = draw_bounding_box(frame, detection)
+    with metrics.stage('render'):
+        frame = draw_bounding_box(frame, detection)
+    timestamp = datetime.now(UTC).isoformat()
 
-    buffer = io.BytesIO()
-    frame.save(buffer, format="JPEG", quality=100)
-    b64_frame = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    # The frame is encoded once, stored with a thumbnail and sent as binary to the UI
+    with metrics.stage('encode_store'):
+        scan_id, image = scan_log.add(detection.content, detection.type, timestamp, frame)
 
     entry = {
+        "id": scan_id,
         "content": detection.content,
         "type": detection.type,
-        "timestamp": datetime.now(UTC).isoformat(),
-        "image": b64_frame,
+        "timestamp": timestamp,
+        "image": image,
         "image_type": "image/jpeg",
     }
-    store.store("scan_log", entry)
     ui.send_message('code_detected', entry)
     detected = True
 
@@ -45,22 +52,31 @@ def on_frame(frame: Image):
         # If a code has already been detected, ignore further detections
         return
 
-    buffer = io.BytesIO()
-    frame.save(buffer, format="JPEG", quality=100)
-    b64_frame = base64.b64encode(buffer.getvalue()).decode("utf-8")
-
-    entry = {
-        "timestamp": datetime.now(UTC).isoformat(),
-        "image": b64_frame,
-        "image_type": "image/jpeg",
-    }
+    # Encoded only if somebody is watching, once per quality level, and sent to each client
+    # as soon as it acknowledged the previous frame
+    streamer.push(frame, timestamp=datetime.now(UTC).isoformat())
 
-    ui.send_message('frame_detected', entry)
+def on_stream():
+    """Callback function that streams the camera preview as MJPEG, e.g. for an <img> tag."""
+    return StreamingResponse(streamer.mjpeg(), media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}")
 
 def on_list_scans():
-    """Callback function that lists the latest 5 scanned codes."""
-    scans = store.read("scan_log", order_by="timestamp DESC", limit=5)
-    return {"scans": scans if scans else []}
+    """Callback function that lists the latest 5 scanned codes, without their images."""
+    return {"scans": scan_log.latest(limit=5)}
+
+def on_scan_thumbnail(scan_id: int):
+    """Callback function that returns the thumbnail of a scan."""
+    thumbnail = scan_log.thumbnail(scan_id)
+    if thumbnail is None:
+        return Response(status_code=404)
+    return Response(content=thumbnail, media_type="image/jpeg")
+
+def on_scan_image(scan_id: int):
+    """Callback function that returns the full image of a scan, if still kept."""
+    image = scan_log.image(scan_id)
+    if image is None:
+        return Response(status_code=404)
+    return Response(content=image[0], media_type=image[1])
 
 def reset_detection(_, __):
     """Callback function to reset the detection state."""
@@ -72,15 +88,27 @@ def on_error(e: Exception):
     ui.send_message('error', str(e))
 
 store = SQLStore("code-scanner.db")
+# Full images are only kept for the latest 100 scans, thumbnails and metadata for the latest 10000
+scan_log = ScanLog(store, max_scans=10000, max_images=100, image_quality=SCAN_IMAGE_QUALITY)
 
-camera = USBCamera(resolution=(640, 480), fps=5)
+camera = USBCamera(resolution=(640, 480), fps=CAMERA_FPS)
 detector = CameraCodeDetection(camera)
-detector.on_detect(on_code_detected)
-detector.on_frame(on_frame)
+# Handlers are timed, and the measures served in the Prometheus format on /metrics
+metrics = HandlerMetrics()
+detector.on_detect(metrics.timed("camera", "detect", on_code_detected))
+detector.on_frame(metrics.timed("camera", "frame", on_frame))
 detector.on_error(on_error)
 
 ui = WebUI()
+metrics.instrument(ui)
+streamer = FrameStreamer(ui, fps=CAMERA_FPS)
+ui.on_connect(streamer.add_client)
+ui.on_disconnect(streamer.remove_client)
 ui.expose_api('GET', '/list_scans', on_list_scans)
+ui.expose_api('GET', '/stream.mjpg', on_stream)
+ui.expose_api('GET', '/scans/{scan_id}/thumbnail', on_scan_thumbnail)
+ui.expose_api('GET', '/scans/{scan_id}/image', on_scan_image)
 ui.on_message('reset_detection', reset_detection)
+ui.on_message('frame_ack', streamer.ack)
 
 App.run()
@@ -0,0 +1,174 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+import base64
+import io
+import sqlite3
+from PIL import Image as PILImage
+from PIL.Image import Image
+from arduino.app_bricks.dbstorage_sqlstore import SQLStore
+from arduino.app_utils import Logger
+
+logger = Logger("ScanLog")
+
+LEGACY_TABLE = "scan_log"
+
+
+def encode_jpeg(image: Image, quality: int, max_size: tuple[int, int] | None = None) -> bytes:
+    """Encode an image as JPEG, downscaled to fit max_size if given."""
+    if max_size is not None:
+        image = image.copy()
+        image.thumbnail(max_size)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class ScanLog:
+    """History of the scanned codes in a SQLStore.
+
+    Scan metadata is kept in the `scans` table, indexed by timestamp, so listing the latest scans never touches
+    image data. Every scan also gets a small JPEG thumbnail and the full JPEG image, stored as binary in the
+    separate `scan_thumbnails` and `scan_images` tables and loaded by scan id only when requested.
+
+    Storage is bounded: only the full images of the latest `max_images` scans are kept (older scans keep their
+    thumbnail), and only the latest `max_scans` scans are kept at all. The database uses incremental auto-vacuum,
+    so the space freed by retention is returned to the file system.
+
+    Scans stored by previous versions of the App in the `scan_log` table, with inline base64 images, are migrated
+    on startup.
+    """
+
+    def __init__(self, store: SQLStore, max_scans: int = 10000, max_images: int = 100, thumbnail_size: tuple[int, int] = (160, 120),
+                 image_quality: int = 90, thumbnail_quality: int = 70):
+        """Create the tables if needed and migrate the legacy scan log.
+
+        Args:
+            store (SQLStore): Store the scans are kept in.
+            max_scans (int, optional): Number of scans kept. Defaults to 10000.
+            max_images (int, optional): Number of scans whose full image is kept. Defaults to 100.
+            thumbnail_size (tuple[int, int], optional): Maximum thumbnail size. Defaults to (160, 120).
+            image_quality (int, optional): JPEG quality of the full images. Defaults to 90.
+            thumbnail_quality (int, optional): JPEG quality of the thumbnails. Defaults to 70.
+        """
+        self._store = store
+        self._max_scans = max_scans
+        self._max_images = max_images
+        self._thumbnail_size = thumbnail_size
+        self._image_quality = image_quality
+        self._thumbnail_quality = thumbnail_quality
+        self._setup()
+
+    def _setup(self):
+        # Auto-vacuum can only be enabled before the first table is created, or by a full VACUUM
+        auto_vacuum = self._store.execute_sql("PRAGMA auto_vacuum")[0]["auto_vacuum"]
+        if auto_vacuum != 2:
+            self._store.execute_sql("PRAGMA auto_vacuum = INCREMENTAL")
+
+        self._store.execute_sql(
+            "CREATE TABLE IF NOT EXISTS scans (id INTEGER PRIMARY KEY AUTOINCREMENT, content TEXT, type TEXT, timestamp TEXT)"
+        )
+        self._store.execute_sql("CREATE INDEX IF NOT EXISTS scans_timestamp ON scans (timestamp)")
+        self._store.execute_sql("CREATE TABLE IF NOT EXISTS scan_thumbnails (scan_id INTEGER PRIMARY KEY, thumbnail BLOB)")
+        self._store.execute_sql("CREATE TABLE IF NOT EXISTS scan_images (scan_id INTEGER PRIMARY KEY, image BLOB, image_type TEXT)")
+
+        migrated = self._migrate_legacy()
+        if migrated or auto_vacuum != 2:
+            logger.info("Compacting the scan database")
+            self._store.execute_sql("VACUUM")
+
+    def _migrate_legacy(self) -> bool:
+        exists = self._store.execute_sql("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (LEGACY_TABLE,))
+        if not exists:
+            return False
+
+        total = self._store.execute_sql(f"SELECT COUNT(*) AS n FROM {LEGACY_TABLE}")[0]["n"]
+        logger.info(f"Migrating {total} scans from the '{LEGACY_TABLE}' table")
+        # Oldest first, so that ids follow the scan order. Only the latest max_scans scans would be kept anyway.
+        for offset in range(max(total - self._max_scans, 0), total, 100):
+            rows = self._store.execute_sql(
+                f"SELECT content, type, timestamp, image, image_type FROM {LEGACY_TABLE} ORDER BY timestamp LIMIT 100 OFFSET ?",
+                (offset,),
+            ) or []
+            for n, row in enumerate(rows, start=offset):
+                try:
+                    image_bytes = base64.b64decode(row["image"]) if row.get("image") else None
+                    thumbnail = encode_jpeg(PILImage.open(io.BytesIO(image_bytes)), self._thumbnail_quality, self._thumbnail_size) if image_bytes else None
+                except Exception as e:
+                    logger.warning(f"Skipping the unreadable image of the scan at {row['timestamp']}: {e}")
+                    image_bytes = thumbnail = None
+                keep_image = n >= total - self._max_images
+                self._insert(row["content"], row["type"], row["timestamp"], thumbnail,
+                             image_bytes if keep_image else None, row.get("image_type") or "image/jpeg")
+        self._store.execute_sql(f"DROP TABLE {LEGACY_TABLE}")
+        return True
+
+    def _insert(self, content: str, code_type: str, timestamp: str, thumbnail: bytes | None, image: bytes | None, image_type: str) -> int:
+        scan_id = self._store.execute_sql(
+            "INSERT INTO scans (content, type, timestamp) VALUES (?, ?, ?) RETURNING id", (content, code_type, timestamp)
+        )[0]["id"]
+        if thumbnail is not None:
+            self._store.execute_sql("INSERT INTO scan_thumbnails (scan_id, thumbnail) VALUES (?, ?)", (scan_id, thumbnail))
+        if image is not None:
+            self._store.execute_sql("INSERT INTO scan_images (scan_id, image, image_type) VALUES (?, ?, ?)", (scan_id, image, image_type))
+        return scan_id
+
+    def add(self, content: str, code_type: str, timestamp: str, image: Image) -> tuple[int, bytes]:
+        """Store a scan with its image, then apply the retention limits.
+
+        Args:
+            content (str): Content of the code.
+            code_type (str): Type of the code.
+            timestamp (str): ISO 8601 time of the scan.
+            image (Image): Frame the code was detected in.
+
+        Returns:
+            tuple[int, bytes]: Id of the scan and its full JPEG image.
+        """
+        image_bytes = encode_jpeg(image, self._image_quality)
+        thumbnail = encode_jpeg(image, self._thumbnail_quality, self._thumbnail_size)
+        scan_id = self._insert(content, code_type, timestamp, thumbnail, image_bytes, "image/jpeg")
+        self.compact(scan_id)
+        return scan_id, image_bytes
+
+    def latest(self, limit: int = 5) -> list[dict]:
+        """Return the metadata of the latest scans, newest first."""
+        return self._store.execute_sql(
+            "SELECT id, content, type, timestamp FROM scans ORDER BY timestamp DESC LIMIT ?", (limit,)
+        ) or []
+
+    def thumbnail(self, scan_id: int) -> bytes | None:
+        """Return the JPEG thumbnail of a scan, or None if not available."""
+        rows = self._store.execute_sql("SELECT thumbnail FROM scan_thumbnails WHERE scan_id = ?", (scan_id,))
+        return rows[0]["thumbnail"] if rows else None
+
+    def image(self, scan_id: int) -> tuple[bytes, str] | None:
+        """Return (image, MIME type) of a scan, or None if not available anymore."""
+        rows = self._store.execute_sql("SELECT image, image_type FROM scan_images WHERE scan_id = ?", (scan_id,))
+        return (rows[0]["image"], rows[0]["image_type"]) if rows else None
+
+    def compact(self, last_id: int | None = None):
+        """Drop the scans and images beyond the retention limits, and release the freed pages."""
+        if last_id is None:
+            rows = self._store.execute_sql("SELECT MAX(id) AS id FROM scans")
+            last_id = rows[0]["id"] if rows and rows[0]["id"] is not None else 0
+        # Only the rows that just went beyond the limits are left to delete: the older ones already are
+        self._store.execute_sql("DELETE FROM scans WHERE id <= ?", (last_id - self._max_scans,))
+        self._store.execute_sql("DELETE FROM scan_thumbnails WHERE scan_id <= ?", (last_id - self._max_scans,))
+        self._store.execute_sql("DELETE FROM scan_images WHERE scan_id <= ?", (last_id - self._max_images,))
+        self._release_free_pages()
+
+    def _release_free_pages(self):
+        # Each step of PRAGMA incremental_vacuum frees a single page, and execute_sql (like any cursor, as the
+        # statement has no result columns) only steps it once: a script is stepped until the statement is done
+        with self._store.conn_lock:
+            conn = self._store.conn
+            if conn is None:
+                return
+            try:
+                conn.executescript("PRAGMA incremental_vacuum")
+            except sqlite3.Error as e:
+                logger.warning(f"Error releasing the free pages of the scan database: {e}")
@@ -0,0 +1,136 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from arduino.app_bricks.dbstorage_tsstore import TimeSeriesStore
+from arduino.app_utils import Logger
+from sample_writer import write_batch
+
+logger = Logger("DerivedMetrics")
+
+# Registered derived metrics: name -> function(temperature °C, relative humidity %) -> values.
+# Every function works on NumPy arrays and returns NaN where the metric is undefined.
+DERIVED_METRICS: dict[str, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {}
+
+
+def derived_metric(name: str):
+    """Register a function as a derived metric, stored in the time-series DB under `name`."""
+    def decorator(func):
+        DERIVED_METRICS[name] = func
+        return func
+    return decorator
+
+
+@derived_metric("dew_point")
+def dew_point(T: np.ndarray, RH: np.ndarray) -> np.ndarray:
+    """Dew point (Magnus formula), undefined when RH <= 0."""
+    a = 17.27
+    b = 237.7
+    # clamp RH into (0,100] and avoid exact zero
+    rh_frac = np.clip(RH, 1e-6, 100.0)
+    gamma = (a * T) / (b + T) + np.log(rh_frac / 100.0)
+    return np.where(RH > 0.0, (b * gamma) / (a - gamma), np.nan)
+
+
+@derived_metric("heat_index")
+def heat_index(T: np.ndarray, RH: np.ndarray) -> np.ndarray:
+    """Heat Index (Rothfusz regression), computed in Fahrenheit and converted back to Celsius."""
+    T_f = T * 9.0 / 5.0 + 32.0
+    R = np.clip(RH, 0.0, 100.0)
+    HI_f = (-42.379 + 2.04901523 * T_f + 10.14333127 * R - 0.22475541 * T_f * R
+            - 0.00683783 * T_f * T_f - 0.05481717 * R * R
+            + 0.00122874 * T_f * T_f * R + 0.00085282 * T_f * R * R
+            - 0.00000199 * T_f * T_f * R * R)
+    return (HI_f - 32.0) * 5.0 / 9.0
+
+
+@derived_metric("absolute_humidity")
+def absolute_humidity(T: np.ndarray, RH: np.ndarray) -> np.ndarray:
+    """Absolute humidity (g/m^3), undefined when RH < 0."""
+    R = np.clip(RH, 0.0, 100.0)
+    es = 6.112 * np.exp((17.67 * T) / (T + 243.5))
+    return np.where(RH >= 0.0, es * (R / 100.0) * 2.1674 / (273.15 + T), np.nan)
+
+
+def compute(T: np.ndarray, RH: np.ndarray, metrics: list[str] | None = None) -> dict[str, np.ndarray]:
+    """Compute derived metrics over arrays of temperature (°C) and relative humidity (%).
+
+    Args:
+        T (np.ndarray): Temperatures.
+        RH (np.ndarray): Relative humidities, same shape as T.
+        metrics (list[str], optional): Names of the metrics to compute. Defaults to all registered metrics.
+
+    Returns:
+        dict[str, np.ndarray]: Metric name to values, NaN where a metric is undefined.
+
+    Raises:
+        KeyError: If a requested metric is not registered.
+    """
+    T = np.asarray(T, dtype=np.float64)
+    RH = np.asarray(RH, dtype=np.float64)
+    names = metrics if metrics is not None else list(DERIVED_METRICS)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {name: DERIVED_METRICS[name](T, RH) for name in names}
+
+
+def compute_sample(celsius: float, humidity: float) -> dict[str, float | None]:
+    """Compute every derived metric for a single sample. Undefined metrics are None."""
+    values = compute(np.array([celsius]), np.array([humidity]))
+    return {name: (None if np.isnan(v[0]) else float(v[0])) for name, v in values.items()}
+
+
+def _to_ms(samples: list) -> tuple[np.ndarray, np.ndarray]:
+    ts = np.fromiter((int(datetime.fromisoformat(s[1]).timestamp() * 1000) for s in samples), dtype=np.int64, count=len(samples))
+    values = np.fromiter((float(s[2]) for s in samples), dtype=np.float64, count=len(samples))
+    return ts, values
+
+
+def _rfc3339(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def backfill(db: TimeSeriesStore, start: datetime, end: datetime | None = None, metrics: list[str] | None = None,
+             chunk: timedelta = timedelta(days=1), batch_size: int = 5000) -> int:
+    """Recompute derived metrics from the temperature and humidity stored between start and end.
+
+    The stored range is processed one chunk at a time. Temperature and humidity samples are matched by timestamp,
+    the metrics are computed over the whole chunk at once and written back in batches, overwriting previously
+    stored values for the same timestamps.
+
+    Args:
+        db (TimeSeriesStore): Store to read the raw samples from and write the derived ones to.
+        start (datetime): Beginning of the range.
+        end (datetime, optional): End of the range. Defaults to now.
+        metrics (list[str], optional): Names of the metrics to recompute. Defaults to all registered metrics.
+        chunk (timedelta, optional): Time span read from the store at once. Defaults to one day.
+        batch_size (int, optional): Maximum number of samples written per request. Defaults to 5000.
+
+    Returns:
+        int: The number of samples recomputed.
+    """
+    # The store only accepts timestamps with a resolution of one second
+    start = start.replace(microsecond=0)
+    end = (end or datetime.now(timezone.utc)).replace(microsecond=0)
+    total = 0
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + chunk, end)
+        span = {"start_from": _rfc3339(chunk_start), "end_to": _rfc3339(chunk_end), "limit": 10_000_000}
+        t_ts, T = _to_ms(db.read_samples(measure="temperature", **span))
+        h_ts, RH = _to_ms(db.read_samples(measure="humidity", **span))
+        ts, t_idx, h_idx = np.intersect1d(t_ts, h_ts, assume_unique=True, return_indices=True)
+        if len(ts):
+            values = compute(T[t_idx], RH[h_idx], metrics)
+            names = list(values)
+            columns = np.column_stack([values[n] for n in names])
+            for i in range(0, len(ts), batch_size):
+                batch = [(int(t), {n: (None if np.isnan(v) else float(v)) for n, v in zip(names, row)})
+                         for t, row in zip(ts[i:i + batch_size], columns[i:i + batch_size])]
+                write_batch(db, batch)
+            total += len(ts)
+            logger.info(f"Backfilled {len(ts)} samples from {_rfc3339(chunk_start)} to {_rfc3339(chunk_end)}")
+        chunk_start = chunk_end
+    return total
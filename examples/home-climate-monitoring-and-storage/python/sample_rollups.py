@@ -0,0 +1,263 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from collections import deque
+from collections.abc import Callable
+from datetime import datetime, timezone
+import re
+import threading
+import time
+from arduino.app_bricks.dbstorage_tsstore import TimeSeriesStore
+from arduino.app_utils import Logger
+from sample_writer import write_batch
+
+logger = Logger("SampleRollups")
+
+_WINDOW_MS = {"1m": 60_000, "5m": 300_000, "10m": 600_000, "1h": 3_600_000, "1d": 86_400_000}
+_UNIT_MS = {"s": 1000, "m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _to_iso(ts: int) -> str:
+    return datetime.fromtimestamp(ts / 1000, timezone.utc).isoformat()
+
+
+def _to_ms(iso: str) -> int:
+    return int(datetime.fromisoformat(iso).timestamp() * 1000)
+
+
+def _rfc3339(ts: int) -> str:
+    return datetime.fromtimestamp(ts // 1000, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _resolve_start(start: str, now: int) -> int | None:
+    """Convert a relative period ("-1h") or RFC3339 timestamp to milliseconds since epoch."""
+    match = re.fullmatch(r"-(\d+)([smhdw])", start)
+    if match:
+        return now - int(match.group(1)) * _UNIT_MS[match.group(2)]
+    try:
+        return int(datetime.strptime(start, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp() * 1000)
+    except ValueError:
+        return None
+
+
+class _Series:
+    """Rollup points of one measure and window: the open bucket plus the most recent closed ones."""
+
+    def __init__(self, size: int, maxlen: int):
+        self.size = size
+        self.points: deque[tuple[int, float]] = deque(maxlen=maxlen)  # (window end ms, mean)
+        self.covered_from: int | None = None  # Points ending after this time are all in memory, once seeded
+        self.bucket_start: int | None = None
+        self.bucket_sum = 0.0
+        self.bucket_count = 0
+        self.generation = 0  # Incremented every time a bucket closes
+
+    def append(self, ts: int, value: float):
+        if self.points and ts <= self.points[-1][0]:
+            return
+        if len(self.points) == self.points.maxlen and self.covered_from is not None:
+            self.covered_from = max(self.covered_from, self.points[0][0])
+        self.points.append((ts, value))
+
+
+class SampleRollups:
+    """Incrementally maintained mean rollups of the stored samples, with a read-through cache.
+
+    Every recorded sample updates the open bucket of each rollup window. When a bucket is over, its mean is stored
+    in the time-series DB as the `<measure>_mean_<window>` measure, labeled with the end of the window like
+    `aggregateWindow` does, and kept in memory. Reads for a rollup window are answered from memory without querying
+    the DB, falling back to the stored rollup series (cached until the next bucket closes) for ranges older than
+    what is kept in memory.
+
+    A series is seeded from the DB on its first read. If no rollup was stored yet, it is computed once from the raw
+    samples and stored. The bucket that is open when the App restarts only includes the samples received after
+    the restart. When stored samples are rewritten, e.g. by a backfill, `invalidate` recomputes their rollups.
+    """
+
+    def __init__(self, db: TimeSeriesStore, write: Callable[[int, dict], object], windows: tuple[str, ...] = ("1m", "5m", "10m", "1h", "1d"), limit: int = 100):
+        """Configure the rollups.
+
+        Args:
+            db (TimeSeriesStore): Store the samples and rollups are read from.
+            write (Callable[[int, dict], object]): Function storing a multi-measure sample, called with
+                (timestamp in ms, {measure: value}).
+            windows (tuple[str, ...], optional): Rollup windows, among "1m", "5m", "10m", "1h" and "1d".
+                Defaults to all of them.
+            limit (int, optional): Maximum number of points returned by a read, and kept in memory per series.
+                Defaults to 100.
+
+        Raises:
+            ValueError: If a window is not supported.
+        """
+        unsupported = [w for w in windows if w not in _WINDOW_MS]
+        if unsupported:
+            raise ValueError(f"Unsupported rollup windows: {unsupported}. Must be among {', '.join(_WINDOW_MS)}.")
+        self._db = db
+        self._write = write
+        self._windows = {w: _WINDOW_MS[w] for w in windows}
+        self._limit = limit
+        self._series: dict[tuple[str, str], _Series] = {}
+        self._cache: dict[tuple[str, str, str], tuple[int, list]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def rollup_measure(measure: str, window: str) -> str:
+        """Name of the measure the rollup of `measure` over `window` is stored as."""
+        return f"{measure}_mean_{window}"
+
+    def record(self, ts: int, values: dict[str, float | None]):
+        """Add a multi-measure sample to the rollups. None values are skipped.
+
+        Args:
+            ts (int): Timestamp in milliseconds since epoch.
+            values (dict[str, float | None]): Measure name to value.
+        """
+        closed: dict[int, dict[str, float]] = {}
+        with self._lock:
+            for measure, value in values.items():
+                if value is None:
+                    continue
+                for window, size in self._windows.items():
+                    series = self._series.get((measure, window))
+                    if series is None:
+                        series = self._series[(measure, window)] = _Series(size, self._limit)
+                    bucket_start = ts - ts % size
+                    if series.bucket_start is not None and series.bucket_start != bucket_start:
+                        end = series.bucket_start + size
+                        mean = series.bucket_sum / series.bucket_count
+                        series.append(end, mean)
+                        series.generation += 1
+                        closed.setdefault(end, {})[self.rollup_measure(measure, window)] = mean
+                        series.bucket_start = None
+                    if series.bucket_start is None:
+                        series.bucket_start, series.bucket_sum, series.bucket_count = bucket_start, 0.0, 0
+                    series.bucket_sum += value
+                    series.bucket_count += 1
+
+        for end, rollup_values in closed.items():
+            self._write(end, rollup_values)
+
+    def read(self, measure: str, start: str, aggr_window: str) -> list[dict]:
+        """Return the mean of `measure` over `aggr_window` windows since `start`, like
+        `TimeSeriesStore.read_samples(..., aggr_func="mean")`, as a list of {"ts", "value"} dicts.
+
+        Windows that are not rolled up are read from the DB.
+        """
+        if aggr_window not in self._windows:
+            return self._read_db(measure, start, aggr_window)
+        now = _now_ms()
+        range_start = _resolve_start(start, now)
+        if range_start is None:
+            return self._read_db(measure, start, aggr_window)
+
+        key = (measure, aggr_window)
+        with self._lock:
+            series = self._series.get(key)
+            seeded = series is not None and series.covered_from is not None
+        if not seeded:
+            self._seed(measure, aggr_window, now)
+
+        with self._lock:
+            series = self._series[key]
+            if range_start >= series.covered_from:
+                result = [{"ts": _to_iso(ts), "value": v} for ts, v in series.points if ts > range_start]
+                if series.bucket_count:
+                    # The open window is labeled with the current time
+                    result.append({"ts": _to_iso(now), "value": series.bucket_sum / series.bucket_count})
+                return result[:self._limit]
+
+            # Older than what is kept in memory: read the stored rollup, cached until the next bucket closes
+            cached = self._cache.get((measure, start, aggr_window))
+            if cached is not None and cached[0] == series.generation:
+                return cached[1]
+            generation = series.generation
+
+        result = self._read_db(self.rollup_measure(measure, aggr_window), start, None)
+        with self._lock:
+            self._cache[(measure, start, aggr_window)] = (generation, result)
+        return result
+
+    def invalidate(self, measures: list[str], since: int, batch_size: int = 5000) -> int:
+        """Recompute the rollups of measures whose stored samples were rewritten, e.g. by a backfill.
+
+        The rollups of every window closed since `since` are computed again from the stored samples and written,
+        and the series are dropped from memory and from the cache, to be seeded again from the new rollups on their
+        next read. The open buckets are kept: they hold the samples received live since they opened.
+
+        Args:
+            measures (list[str]): Names of the rewritten measures.
+            since (int): Timestamp in milliseconds since epoch of the first rewritten sample.
+            batch_size (int, optional): Maximum number of rollups written per request. Defaults to 5000.
+
+        Returns:
+            int: The number of rollups written.
+        """
+        now = _now_ms()
+        total = 0
+        for window, size in self._windows.items():
+            first, last = since - since % size, now - now % size  # Start of the first and end of the last closed window
+            if last <= first:
+                continue
+            for measure in measures:
+                rollup_measure = self.rollup_measure(measure, window)
+                samples = self._db.read_samples(measure=measure, start_from=_rfc3339(first), end_to=_rfc3339(last),
+                                                aggr_window=window, aggr_func="mean", limit=(last - first) // size + 1)
+                points = [(ts, {rollup_measure: v}) for ts, v in ((_to_ms(s[1]), s[2]) for s in samples)
+                          if v is not None and ts % size == 0 and first < ts <= last]
+                # Written right away rather than queued by `write`, whose queue may be too small for them
+                for i in range(0, len(points), batch_size):
+                    write_batch(self._db, points[i:i + batch_size])
+                total += len(points)
+            logger.info(f"Recomputed the '{window}' rollups of {', '.join(measures)} since {_rfc3339(since)}")
+
+        with self._lock:
+            for measure in measures:
+                for window in self._windows:
+                    series = self._series.get((measure, window))
+                    if series is not None:
+                        series.points.clear()
+                        series.covered_from = None
+                        series.generation += 1
+            self._cache = {key: value for key, value in self._cache.items() if key[0] not in measures}
+        return total
+
+    def _read_db(self, measure: str, start: str, aggr_window: str | None) -> list[dict]:
+        aggr_func = "mean" if aggr_window else None
+        samples = self._db.read_samples(measure=measure, start_from=start, aggr_window=aggr_window, aggr_func=aggr_func, limit=self._limit)
+        return [{"ts": s[1], "value": s[2]} for s in samples]
+
+    def _seed(self, measure: str, window: str, now: int):
+        """Load the last `limit` windows of a series from the DB, computing and storing them if missing."""
+        size = self._windows[window]
+        seed_from = now - now % size - self._limit * size
+        rollup_measure = self.rollup_measure(measure, window)
+        samples = self._db.read_samples(measure=rollup_measure, start_from=_rfc3339(seed_from), limit=self._limit + 1)
+        points = [(_to_ms(s[1]), s[2]) for s in samples]
+        if not points:
+            samples = self._db.read_samples(measure=measure, start_from=_rfc3339(seed_from), aggr_window=window, aggr_func="mean", limit=self._limit + 1)
+            # Skip the open window, which is labeled with the current time instead of its end
+            points = [(ts, v) for ts, v in ((_to_ms(s[1]), s[2]) for s in samples) if ts % size == 0 and ts <= now - now % size]
+            if points:
+                logger.info(f"Storing {len(points)} '{rollup_measure}' rollups computed from the raw samples")
+                for ts, v in points:
+                    self._write(ts, {rollup_measure: v})
+
+        with self._lock:
+            series = self._series.get((measure, window))
+            if series is None:
+                series = self._series[(measure, window)] = _Series(size, self._limit)
+            if series.covered_from is not None:
+                return
+            # Merge with the buckets closed while seeding
+            live = list(series.points)
+            series.points.clear()
+            for ts, v in points + live:
+                series.append(ts, v)
+            series.covered_from = seed_from
+            if len(series.points) == series.points.maxlen:
+                series.covered_from = max(seed_from, series.points[0][0] - size)
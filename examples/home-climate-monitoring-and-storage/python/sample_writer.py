@@ -0,0 +1,126 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+import queue
+import threading
+import time
+from influxdb_client import Point, WritePrecision
+from arduino.app_bricks.dbstorage_tsstore import TimeSeriesStore
+from arduino.app_utils import brick, Logger
+
+logger = Logger("SampleWriter")
+
+
+def write_batch(db: TimeSeriesStore, batch: list[tuple[int, dict]], measurement_name: str = "arduino"):
+    """Write many multi-measure samples to the store in a single request.
+
+    Args:
+        db (TimeSeriesStore): Store the samples are written to.
+        batch (list[tuple[int, dict]]): (timestamp in ms, {measure: value}) pairs. None values are skipped.
+        measurement_name (str, optional): Measurement container name. Defaults to "arduino".
+    """
+    points = []
+    for ts, values in batch:
+        fields = {measure: value for measure, value in values.items() if value is not None}
+        if fields:
+            points.append(Point.from_dict({"measurement": measurement_name, "fields": fields, "time": ts}, WritePrecision.MS))
+    if points:
+        db.write_api.write(bucket=db.bucket, record=points)
+
+
+@brick
+class SampleWriter:
+    """Write-behind buffer in front of a TimeSeriesStore.
+
+    Samples are queued by the producer (e.g. a Bridge callback) without touching the database. A background loop
+    drains the queue and writes every pending timestamp as a single multi-measure point, in one batched request,
+    whenever `max_batch` samples are pending or `flush_interval` seconds have passed. Pending samples are flushed
+    on shutdown.
+
+    The queue is bounded: if the store cannot keep up, `write` returns False and the sample is dropped instead of
+    blocking the producer.
+    """
+
+    def __init__(self, db: TimeSeriesStore, max_batch: int = 50, flush_interval: float = 1.0, max_queue: int = 1000, measurement_name: str = "arduino"):
+        """Configure the write-behind buffer.
+
+        Args:
+            db (TimeSeriesStore): Store the samples are written to.
+            max_batch (int, optional): Maximum number of samples written per request. Defaults to 50.
+            flush_interval (float, optional): Maximum time in seconds a sample waits before being written. Defaults to 1.0.
+            max_queue (int, optional): Maximum number of samples waiting to be written. Defaults to 1000.
+            measurement_name (str, optional): Measurement container name. Defaults to "arduino".
+
+        Raises:
+            ValueError: If any size or interval is not positive.
+        """
+        if max_batch <= 0 or max_queue <= 0 or flush_interval <= 0:
+            raise ValueError("max_batch, max_queue and flush_interval must be positive")
+        self._db = db
+        self._max_batch = max_batch
+        self._flush_interval = flush_interval
+        self._measurement_name = measurement_name
+        self._queue: queue.Queue[tuple[int, dict]] = queue.Queue(maxsize=max_queue)
+        self._flush_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+
+    def write(self, ts: int, values: dict[str, float]) -> bool:
+        """Queue the measures sampled at the same timestamp, without blocking.
+
+        Args:
+            ts (int): Timestamp in milliseconds since epoch.
+            values (dict[str, float]): Measure name to value. None values are skipped.
+
+        Returns:
+            bool: True if the sample was queued, False if it was dropped because the queue is full.
+        """
+        try:
+            self._queue.put_nowait((ts, values))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Write queue full, dropping sample at {ts} ({self.dropped} dropped so far)")
+            return False
+
+    def flush(self, timeout: float = 0.0) -> int:
+        """Write up to `max_batch` pending samples in a single request.
+
+        Args:
+            timeout (float, optional): Time in seconds to wait for a full batch before writing a partial one.
+                Defaults to 0 (write what is pending right away).
+
+        Returns:
+            int: The number of samples written.
+        """
+        with self._flush_lock:
+            batch = []
+            deadline = time.monotonic() + timeout
+            while len(batch) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return 0
+
+            try:
+                write_batch(self._db, batch, self._measurement_name)
+                self.written += len(batch)
+            except Exception as e:
+                logger.exception(f"Error writing {len(batch)} samples to the time series store: {e}")
+            return len(batch)
+
+    def stop(self):
+        """Flush every pending sample."""
+        while self.flush():
+            pass
+
+    def loop(self):
+        # Wait up to flush_interval for a full batch, then write whatever has been collected
+        self.flush(timeout=self._flush_interval)
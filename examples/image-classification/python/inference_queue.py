@@ -0,0 +1,211 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from collections import deque
+from collections.abc import Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from typing import Any
+from arduino.app_utils import brick, Logger
+
+logger = Logger("InferenceQueue")
+
+# Called with (result, error, timings) when a request is done. error is None on success and result is None
+# on failure. timings has "queue_wait_ms", "inference_ms" and "batch_size".
+DoneCallback = Callable[[Any, Exception | None, dict], None]
+
+
+class QueueFullError(Exception):
+    """The request was shed to make room for a newer one."""
+
+
+class _Request:
+    __slots__ = ("payload", "on_done", "enqueued")
+
+    def __init__(self, payload: Any, on_done: DoneCallback):
+        self.payload = payload
+        self.on_done = on_done
+        self.enqueued = time.monotonic()
+
+
+@brick
+class InferenceQueue:
+    """Bounded queue of inference requests, served in arrival order by a pool of workers.
+
+    Socket handlers `submit` requests and return right away. A dispatcher loop waits for a free worker, takes the
+    oldest request and, when micro-batching is enabled, up to `max_batch - 1` more requests arriving within
+    `batch_window` seconds, and hands them to the worker as a single batch. A batch is run with `infer_batch`
+    when given, otherwise with one `infer` call per distinct `batch_key`, so identical requests (e.g. several
+    clients running the same sample image) share a single inference.
+
+    When the queue is full, new requests are rejected, or the oldest pending one is shed if `shed_oldest` is set.
+    """
+
+    def __init__(self, infer: Callable[[Any], Any], workers: int = 1, max_queue: int = 8, max_batch: int = 1,
+                 batch_window: float = 0.0, infer_batch: Callable[[list], list] = None,
+                 batch_key: Callable[[Any], Hashable] = None, shed_oldest: bool = False):
+        """Configure the queue.
+
+        Args:
+            infer (Callable[[Any], Any]): Runs the inference of a single request payload and returns its result.
+            workers (int, optional): Number of requests, or batches, run at the same time. Defaults to 1.
+            max_queue (int, optional): Maximum number of requests waiting for a worker. Defaults to 8.
+            max_batch (int, optional): Maximum number of requests per batch. Defaults to 1 (no micro-batching).
+            batch_window (float, optional): Time in seconds to wait for more requests to join a batch. Defaults to 0.
+            infer_batch (Callable[[list], list], optional): Runs the inference of a list of payloads at once and
+                returns the results in the same order. Defaults to calling `infer` for each payload.
+            batch_key (Callable[[Any], Hashable], optional): Returns a key identifying a payload. Payloads with the
+                same key in a batch run `infer` once and share the result. Defaults to no deduplication.
+            shed_oldest (bool, optional): When the queue is full, drop the oldest pending request instead of
+                rejecting the new one. Defaults to False.
+
+        Raises:
+            ValueError: If workers, max_queue or max_batch is not positive, or batch_window is negative.
+        """
+        if workers <= 0 or max_queue <= 0 or max_batch <= 0 or batch_window < 0:
+            raise ValueError("workers, max_queue and max_batch must be positive and batch_window can't be negative")
+        self._infer = infer
+        self._infer_batch = infer_batch
+        self._batch_key = batch_key
+        self._workers = workers
+        self._max_queue = max_queue
+        self._max_batch = max_batch
+        self._batch_window = batch_window
+        self._shed_oldest = shed_oldest
+        self._pending: deque[_Request] = deque()
+        self._cond = threading.Condition()
+        self._idle = threading.Semaphore(workers)
+        self._executor: ThreadPoolExecutor | None = None
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.shed = 0
+
+    def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="inference")
+
+    def stop(self):
+        with self._cond:
+            pending = list(self._pending)
+            self._pending.clear()
+        for request in pending:
+            self._done(request, None, RuntimeError("Inference queue stopped"), {"queue_wait_ms": 0.0, "inference_ms": 0.0, "batch_size": 0})
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    @property
+    def pending(self) -> int:
+        """Number of requests waiting for a worker."""
+        return len(self._pending)
+
+    def submit(self, payload: Any, on_done: DoneCallback) -> bool:
+        """Queue an inference request, without blocking.
+
+        Args:
+            payload (Any): Request passed to `infer`.
+            on_done (DoneCallback): Called from a worker thread with (result, error, timings) when the request is
+                done, or with a QueueFullError if it is shed.
+
+        Returns:
+            bool: True if the request was queued, False if it was rejected because the queue is full.
+        """
+        request = _Request(payload, on_done)
+        shed = None
+        with self._cond:
+            if len(self._pending) >= self._max_queue:
+                if not self._shed_oldest:
+                    self.rejected += 1
+                    logger.warning(f"Inference queue full, rejecting request ({self.rejected} rejected so far)")
+                    return False
+                shed = self._pending.popleft()
+                self.shed += 1
+            self._pending.append(request)
+            self.submitted += 1
+            self._cond.notify()
+
+        if shed is not None:
+            logger.warning(f"Inference queue full, shedding the oldest request ({self.shed} shed so far)")
+            wait_ms = (time.monotonic() - shed.enqueued) * 1000
+            self._done(shed, None, QueueFullError("Inference queue full"), {"queue_wait_ms": wait_ms, "inference_ms": 0.0, "batch_size": 0})
+        return True
+
+    def loop(self):
+        # Only take requests out of the queue when a worker is free, so that the queue bound holds
+        if not self._idle.acquire(timeout=0.5):
+            return
+        batch = self._take_batch()
+        if not batch:
+            self._idle.release()
+            return
+        try:
+            self._executor.submit(self._run, batch)
+        except RuntimeError:
+            # The executor was shut down while the batch was being collected
+            self._idle.release()
+            for request in batch:
+                self._done(request, None, RuntimeError("Inference queue stopped"), {"queue_wait_ms": 0.0, "inference_ms": 0.0, "batch_size": 0})
+
+    def _take_batch(self) -> list[_Request]:
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(timeout=0.5)
+                if not self._pending:
+                    return []
+            batch = [self._pending.popleft()]
+            deadline = time.monotonic() + self._batch_window
+            while len(batch) < self._max_batch:
+                while not self._pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return batch
+                    self._cond.wait(timeout=remaining)
+                batch.append(self._pending.popleft())
+            return batch
+
+    def _run(self, batch: list[_Request]):
+        try:
+            if self._infer_batch is not None and len(batch) > 1:
+                self._run_batch(batch)
+            else:
+                self._run_each(batch)
+        finally:
+            self._idle.release()
+
+    def _run_batch(self, batch: list[_Request]):
+        started = time.monotonic()
+        try:
+            results, error = self._infer_batch([r.payload for r in batch]), None
+        except Exception as e:
+            results, error = [None] * len(batch), e
+        inference_ms = (time.monotonic() - started) * 1000
+        for request, result in zip(batch, results):
+            timings = {"queue_wait_ms": (started - request.enqueued) * 1000, "inference_ms": inference_ms, "batch_size": len(batch)}
+            self._done(request, result, error, timings)
+
+    def _run_each(self, batch: list[_Request]):
+        shared: dict[Hashable, tuple[Any, Exception | None, float]] = {}
+        for request in batch:
+            started = time.monotonic()
+            key = self._batch_key(request.payload) if self._batch_key is not None else None
+            if key is not None and key in shared:
+                result, error, inference_ms = shared[key]
+            else:
+                try:
+                    result, error = self._infer(request.payload), None
+                except Exception as e:
+                    result, error = None, e
+                inference_ms = (time.monotonic() - started) * 1000
+                if key is not None:
+                    shared[key] = (result, error, inference_ms)
+            timings = {"queue_wait_ms": (started - request.enqueued) * 1000, "inference_ms": inference_ms, "batch_size": len(batch)}
+            self._done(request, result, error, timings)
+
+    def _done(self, request: _Request, result: Any, error: Exception | None, timings: dict):
+        if error is None:
+            self.completed += 1
+        try:
+            request.on_done(result, error, timings)
+        except Exception as e:
+            logger.exception(f"Error in inference callback: {e}")
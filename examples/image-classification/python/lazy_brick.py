@@ -0,0 +1,72 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from collections.abc import Callable
+import threading
+import time
+from typing import Any
+from arduino.app_utils import brick, Logger
+
+logger = Logger("LazyBrick")
+
+
+@brick
+class LazyBrick:
+    """Creates a brick on first use instead of at import, so that the App starts serving without waiting for it.
+
+    `factory` imports the brick module and creates the brick. With `background`, it runs in a thread as soon as
+    the App starts, while the web UI is already up; otherwise on the first use. Attributes of the LazyBrick are
+    those of the brick, e.g. `model.detect(image)`: a call arriving while the brick is still being created waits
+    for it. The App doesn't start the bricks created once it runs: only suitable for bricks used through their
+    methods, like the model bricks, which just send requests to the inference container.
+    """
+
+    def __init__(self, factory: Callable[[], Any], name: str, background: bool = True, profiler=None):
+        """Configure the brick creation.
+
+        Args:
+            factory (Callable[[], Any]): Imports the brick module and returns the brick.
+            name (str): Name of the brick, for the logs and the startup profile.
+            background (bool, optional): Create the brick in a thread as soon as the App starts. Defaults to True.
+            profiler (StartupProfiler, optional): Records the time taken to create the brick.
+        """
+        self._factory = factory
+        self._name = name
+        self._background = background
+        self._profiler = profiler
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._background and self._instance is None:
+            threading.Thread(target=self._load_in_background, name=f"LazyBrick-{self._name}", daemon=True).start()
+
+    def _load_in_background(self):
+        try:
+            self.get()
+        except Exception as e:
+            # Retried on first use, where the error reaches the caller
+            logger.warning(f"Failed to create {self._name} in the background: {e}")
+
+    def get(self) -> Any:
+        """Return the brick, creating it if not done yet."""
+        instance = self._instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            if self._instance is None:
+                start = time.perf_counter()
+                self._instance = self._factory()
+                elapsed = time.perf_counter() - start
+                logger.info(f"{self._name} ready in {elapsed * 1000:.0f} ms")
+                if self._profiler is not None:
+                    self._profiler.record(self._name, elapsed)
+            return self._instance
+
+    def __getattr__(self, name: str):
+        # Only called for the attributes LazyBrick doesn't have itself. Private ones are never forwarded, so that
+        # probing them, or reading them before __init__ set them, doesn't create the brick.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
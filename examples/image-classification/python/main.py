@@ -2,52 +2,119 @@
 #
 # SPDX-License-Identifier: MPL-2.0
 
+# Imported first, to time the imports of everything else
+from startup_profiler import StartupProfiler
+profiler = StartupProfiler()
+
 from arduino.app_utils import App
 from arduino.app_bricks.web_ui import WebUI
-from arduino.app_bricks.image_classification import ImageClassification
-from PIL import Image
-import io
-import base64
 import time
+from inference_queue import InferenceQueue
+from handler_metrics import HandlerMetrics
+from lazy_brick import LazyBrick
+from result_cache import ResultCache, content_hash
+from image_decoder import ImageDecoder
+
+def load_image_classification():
+    from arduino.app_bricks.image_classification import ImageClassification
+    classification = ImageClassification()
+    # Decode the uploads just large enough for the input of the model, once the runner tells it
+    model_info = classification.get_model_info()
+    input_size = (getattr(model_info, 'image_input_width', -1), getattr(model_info, 'image_input_height', -1))
+    if min(input_size) > 0:
+        decoder.min_size = input_size
+    return classification
+
+# The model brick is created in the background once the App runs: the web UI serves without waiting for it
+image_classification = LazyBrick(load_image_classification, "ImageClassification", profiler=profiler)
+# Handlers and the steps of the requests are timed, and the measures served in the Prometheus format on /metrics
+metrics = HandlerMetrics()
+# Results of the latest 256 images, by content: an upload already seen is answered without being decoded.
+# They are never served by similarity: images with different subjects can have the same perceptual hash.
+result_cache = ResultCache(max_entries=256)
+# JPEG uploads are decoded at a fraction of their size still covering the model input
+decoder = ImageDecoder()
+
+def classify(request: dict) -> tuple[dict | None, bool]:
+    """Run image classification on a request, in an inference worker.
+
+    Returns (results, whether they come from the cache), always False here: the cache is looked up by the
+    handler, before queueing the request.
+    """
+    with metrics.stage('base64_decode', 'classify_image'):
+        image_data = decoder.b64decode(request['image'])
+    with metrics.stage('image_decode', 'classify_image'):
+        pil_image, image_size = decoder.decode(image_data)
+    confidence = request.get('confidence', 0.25)
+    with metrics.stage('preprocess', 'classify_image'):
+        model_input, image_type = decoder.model_input(pil_image, image_data, image_size)
+    with metrics.stage('inference', 'classify_image'):
+        results = image_classification.classify(model_input, image_type=image_type, confidence=confidence)
+    if results is not None:
+        result_cache.put(request['digest'], None, confidence, results)
+    return results, False
+
+# Requests from every client are served in arrival order by a single worker: the model runs one
+# image at a time. At most 8 requests wait for it, newer ones are rejected. Requests arriving
+# within 20 ms of each other are batched, so identical ones are only classified once.
+inference = InferenceQueue(classify, workers=1, max_queue=8, max_batch=4, batch_window=0.02,
+                           batch_key=lambda request: (request['digest'], request.get('confidence', 0.25)))
 
-image_classification = ImageClassification()
+def send_classification_result(client_id, classification, error, timings):
+    """Send the result of a classification request to the client that asked for it."""
+    if error is not None:
+        ui.send_message('classification_error', {'error': str(error)}, room=client_id)
+        return
+
+    metrics.observe('queue', timings['queue_wait_ms'] / 1000)
+    results, cached = classification
+    if results is None:
+        ui.send_message('classification_error', {'error': 'No results returned'}, room=client_id)
+        return
+
+    response = {
+        'success': True,
+        'results': results,
+        'processing_time': f"{timings['inference_ms']:.2f} ms",
+        'queue_time': f"{timings['queue_wait_ms']:.2f} ms",
+        'batch_size': timings['batch_size'],
+        'cached': cached
+    }
+    ui.send_message('classification_result', response, room=client_id)
+
+# The response is sent by the inference worker: its steps are timed as part of the request
+send_result = metrics.timed('inference', 'classify_image', send_classification_result)
 
 def on_classify_image(client_id, data):
     """Callback function to handle image classification requests."""
-    try:
-        image_data = data.get('image')
-        image_type_raw = data.get('image_type')
-        if image_type_raw:
-            image_type = image_type_raw.split('/')[-1]
-        else:
-            image_type = 'jpeg'
-        confidence = data.get('confidence', 0.25)
-        if not image_data:
-            ui.send_message('classification_error', {'error': 'No image data'})
-            return
-
-        image_bytes = base64.b64decode(image_data)
-        pil_image = Image.open(io.BytesIO(image_bytes))
-
-        start_time = time.time() * 1000
-        results = image_classification.classify(pil_image, image_type=image_type, confidence=confidence)
-        diff = time.time() * 1000 - start_time
-
-        if results is None:
-            ui.send_message('classification_error', {'error': 'No results returned'})
-            return
-
-        response = {
-            'success': True,
-            'results': results,
-            'processing_time': f"{diff:.2f} ms"
-        }
-        ui.send_message('classification_result', response)
-
-    except Exception as e:
-        ui.send_message('classification_error', {'error': str(e)})
-
-ui = WebUI()
+    if not data.get('image'):
+        ui.send_message('classification_error', {'error': 'No image data'}, room=client_id)
+        return
+
+    start = time.perf_counter()
+    request = {**data, 'digest': content_hash(data['image'])}
+    # An upload already seen is answered right away, without waiting for the inference worker
+    results = result_cache.get(request['digest'], request.get('confidence', 0.25), similar=False)
+    if results is not None:
+        timings = {'queue_wait_ms': 0.0, 'inference_ms': (time.perf_counter() - start) * 1000, 'batch_size': 0}
+        send_result(client_id, (results, True), None, timings)
+        return
+
+    queued = inference.submit(
+        request,
+        lambda classification, error, timings: send_result(client_id, classification, error, timings)
+    )
+    if not queued:
+        ui.send_message('classification_error', {'error': 'Too many requests, please try again later'}, room=client_id)
+
+with profiler.step("WebUI"):
+    ui = WebUI()
+metrics.instrument(ui)
 ui.on_message('classify_image', on_classify_image)
+# Hits and misses of the result cache
+ui.expose_api('GET', '/cache', result_cache.stats)
+# Import and initialisation times of the App
+ui.expose_api('GET', '/startup', profiler.stats)
 
+profiler.finish()
 App.run()
\ No newline at end of file
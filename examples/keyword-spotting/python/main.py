@@ -4,10 +4,16 @@
 
 from arduino.app_utils import *
 from arduino.app_bricks.keyword_spotting import KeywordSpotting
+from bridge_dispatcher import BridgeDispatcher
+
+# The animation takes a second on the microcontroller: the call is sent from a worker thread so that
+# detection goes on meanwhile. At most 2 animations wait for their turn, and RPC latency statistics
+# are logged every minute.
+bridge = BridgeDispatcher(max_pending=2, log_interval=60)
 
 def on_keyword_detected():
     """Callback function that handles a detected keyword."""
-    Bridge.call("keyword_detected")
+    bridge.post("keyword_detected")
 
 spotter = KeywordSpotting()
 spotter.on_detect("hey_arduino", on_keyword_detected)
@@ -4,6 +4,7 @@
 
 let socket;
 let currentImage = null;
+let currentImageUrl = null;
 let resultImage = null;
 let errorContainer;
 
@@ -89,6 +90,7 @@ function initializeElements() {
 // Upload new image function
 function uploadNewImage() {
     currentImage = null;
+    currentImageUrl = null;
     resultImage = null;
 
     // Reset image display
@@ -276,6 +278,7 @@ function handleImageFile(file) {
     const reader = new FileReader();
     reader.onload = (e) => {
         currentImage = e.target.result.split(',')[1];
+        currentImageUrl = e.target.result;
 
         const imagePreview = document.getElementById('imagePreview');
         imagePreview.innerHTML = `<img src="${e.target.result}" alt="Uploaded image" class="preview-image">`;
@@ -303,9 +306,11 @@ function sendDetectionRequest() {
 
     const confidence = parseFloat(document.getElementById('confidenceSlider').value);
 
+    // Only the boxes are sent back, and drawn over the uploaded image by drawDetections()
     socket.emit('detect_objects', {
         image: currentImage,
-        confidence: confidence
+        confidence: confidence,
+        response_mode: 'geometry'
     });
 }
 
@@ -346,26 +351,101 @@ function handleDetectionResult(data) {
         return;
     }
 
-    if (data.result_image) {
-        // Store the result image
-        resultImage = data.result_image;
-
-        // Display the result image in the image container
-        displayImage(`data:image/png;base64,${data.result_image}`, '.image-container');
-
-        // Show result title and download button
-        showResultTitle();
-
-        showStatus('Detection completed successfully!', 'success');
+    if (data.detections) {
+        drawDetections(currentImageUrl, data.detections)
+            .then(showResult)
+            .catch(error => {
+                console.error('❌ Error drawing detections:', error);
+                showError('Failed to draw detection results');
+                setButtonState('ready');
+            });
+    } else if (data.result_image) {
+        // Image drawn by the server (response_mode 'image')
+        showResult(`data:${data.image_type || 'image/png'};base64,${data.result_image}`);
     } else {
-        showError('No result image received from detection');
+        showError('No result received from detection');
         setButtonState('ready');
-        return;
     }
+}
+
+function showResult(imageUrl) {
+    // Store the result image
+    resultImage = imageUrl;
+
+    // Display the result image in the image container
+    displayImage(imageUrl, '.image-container');
 
+    // Show result title and download button
+    showResultTitle();
+
+    showStatus('Detection completed successfully!', 'success');
     setButtonState('completed');
 }
 
+const CONFIDENCE_COLORS = [
+    [20, '#FF0976'],
+    [40, '#FF8131'],
+    [60, '#FFFC00'],
+    [80, '#00DED7'],
+    [100, '#1EFF00']
+];
+
+function getBoxColor(confidence) {
+    const entry = CONFIDENCE_COLORS.find(([max]) => confidence <= max);
+    return entry ? entry[1] : CONFIDENCE_COLORS[CONFIDENCE_COLORS.length - 1][1];
+}
+
+// Draws the detected boxes over the image like the server-side draw_bounding_boxes does,
+// and resolves with the resulting PNG data URL.
+function drawDetections(imageUrl, detections) {
+    return new Promise((resolve, reject) => {
+        const img = new Image();
+        img.onload = () => {
+            const canvas = document.createElement('canvas');
+            canvas.width = img.naturalWidth;
+            canvas.height = img.naturalHeight;
+            const ctx = canvas.getContext('2d');
+            ctx.drawImage(img, 0, 0);
+
+            // Scale font size and box thickness based on image size and number of detections
+            const refDim = Math.max(canvas.width, canvas.height);
+            const fontSize = Math.max(8, Math.floor(refDim / (28 + Math.max(1, detections.length) * 3)));
+            const boxThickness = Math.max(1, Math.floor(refDim / 250));
+            const labelVPad = Math.max(2, Math.floor(fontSize * 0.4));
+            const labelHPad = Math.max(4, Math.floor(fontSize * 0.8));
+            const labelGap = Math.max(1, Math.floor(fontSize * 0.15));
+            ctx.font = `${fontSize}px sans-serif`;
+            ctx.textBaseline = 'top';
+
+            detections.forEach(({ class_name, confidence, bounding_box_xyxy }) => {
+                const [x1, y1, x2, y2] = bounding_box_xyxy.map(Math.floor);
+                const color = getBoxColor(confidence);
+                const text = `${class_name.charAt(0).toUpperCase()}${class_name.slice(1).toLowerCase()} ${confidence.toFixed(1)}%`;
+
+                ctx.strokeStyle = color;
+                ctx.lineWidth = boxThickness;
+                ctx.strokeRect(x1 + boxThickness / 2, y1 + boxThickness / 2, x2 - x1 - boxThickness, y2 - y1 - boxThickness);
+
+                // Label above the box, or below its top edge if it would go out of the image
+                const textWidth = ctx.measureText(text).width;
+                const labelHeight = fontSize + labelVPad * 2;
+                let labelY = y1 - labelHeight - labelGap;
+                if (labelY < 0) {
+                    labelY = y1 + labelGap;
+                }
+                ctx.fillStyle = 'rgba(0, 0, 0, 0.5)';
+                ctx.fillRect(x1, labelY, textWidth + labelHPad * 2, labelHeight);
+                ctx.fillStyle = color;
+                ctx.fillText(text, x1 + labelHPad, labelY + labelVPad);
+            });
+
+            resolve(canvas.toDataURL('image/png'));
+        };
+        img.onerror = reject;
+        img.src = imageUrl;
+    });
+}
+
 function setButtonState(state) {
     const detectButton = document.getElementById('detectButton');
     const uploadNewButton = document.getElementById('uploadNewButton');
@@ -424,8 +504,8 @@ function downloadResult() {
 
     // Create download link
     const link = document.createElement('a');
-    link.href = `data:image/png;base64,${resultImage}`;
-    link.download = 'object-detection-result.png';
+    link.href = resultImage;
+    link.download = `object-detection-result.${resultImage.slice(11, resultImage.indexOf(';')).replace('jpeg', 'jpg')}`;
 
     // Trigger download
     document.body.appendChild(link);
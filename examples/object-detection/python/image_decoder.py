@@ -0,0 +1,115 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+import binascii
+import io
+import threading
+from PIL import Image
+
+# Base64 characters decoded at a time: a multiple of 4, so that each chunk decodes to whole bytes
+BASE64_CHUNK = 64 * 1024
+
+
+class _BufferReader(io.RawIOBase):
+    """Read-only file over a buffer, which unlike io.BytesIO doesn't copy it first."""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        size = max(0, min(len(buffer), len(self._view) - self._position))
+        buffer[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+
+class ImageDecoder:
+    """Decodes the uploaded images no larger than the model needs.
+
+    The model only sees its input size, e.g. 320 x 320 pixels, but a phone photo is 12 megapixels: decoding it
+    whole takes most of the time of a request and 36 MB of memory. JPEG images are decoded at the smallest of
+    1/2, 1/4 or 1/8 of their size still covering `min_size` (PIL's draft mode), which skips most of the work.
+
+    The base64 upload is decoded in chunks into a buffer kept by each thread for the next request, instead of a
+    new bytes object each time, and the image is read from that buffer without copying it.
+    """
+
+    def __init__(self, min_size: tuple[int, int] = (640, 640)):
+        """Configure the decoder.
+
+        Args:
+            min_size (tuple[int, int], optional): Size (width, height) the decoded images must cover, usually the
+                input size of the model. Defaults to (640, 640), enough for most models.
+        """
+        self.min_size = min_size
+        self._local = threading.local()  # Buffer of each thread
+
+    def b64decode(self, data: str) -> memoryview:
+        """Decode base64 data into the buffer of this thread.
+
+        Returns:
+            memoryview: The decoded bytes, valid until the next call from the same thread.
+
+        Raises:
+            binascii.Error: If the data is not valid base64.
+        """
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or len(buffer) < len(data) * 3 // 4:
+            buffer = self._local.buffer = bytearray(len(data) * 3 // 4)
+        view = memoryview(buffer)
+        size = 0
+        try:
+            for start in range(0, len(data), BASE64_CHUNK):
+                chunk = binascii.a2b_base64(data[start:start + BASE64_CHUNK])
+                view[size:size + len(chunk)] = chunk
+                size += len(chunk)
+        except binascii.Error:
+            # Characters to skip, like line breaks, can split the groups of 4 across chunks: decode at once
+            chunk = binascii.a2b_base64(data)
+            view[:len(chunk)] = chunk
+            size = len(chunk)
+        return view[:size]
+
+    def decode(self, data: bytes | memoryview) -> tuple[Image.Image, tuple[int, int]]:
+        """Decode an image, reduced if it is a JPEG image larger than needed.
+
+        Returns:
+            tuple[Image.Image, tuple[int, int]]: The decoded image, and the size of the original image.
+        """
+        image = Image.open(_BufferReader(memoryview(data)))
+        original_size = image.size
+        if image.format == "JPEG":
+            image.draft("RGB", self.min_size)
+        image.load()
+        return image, original_size
+
+    def model_input(self, image: Image.Image, data: bytes | memoryview,
+                    original_size: tuple[int, int]) -> tuple[bytes | Image.Image, str]:
+        """Return what to send to the model brick for a decoded image, with its image type.
+
+        The bricks send the model runner encoded images, and encode a PIL image as PNG first: a JPEG or PNG image
+        decoded at its original size is sent as uploaded, and a reduced image as a JPEG image of its own size.
+        """
+        if image.size != original_size:
+            encoded = io.BytesIO()
+            image.save(encoded, format="JPEG", quality=90)
+            return encoded.getvalue(), "jpeg"
+        if image.format in ("JPEG", "PNG"):
+            return bytes(data), image.format.lower()
+        return image, "png"
@@ -2,62 +2,195 @@
 #
 # SPDX-License-Identifier: MPL-2.0
 
+# Imported first, to time the imports of everything else
+from startup_profiler import StartupProfiler
+profiler = StartupProfiler()
+
 from arduino.app_utils import *
 from arduino.app_bricks.web_ui import WebUI
-from arduino.app_bricks.object_detection import ObjectDetection
 from PIL import Image
 import io
 import base64
 import time
+from inference_queue import InferenceQueue
+from handler_metrics import HandlerMetrics
+from lazy_brick import LazyBrick
+from result_cache import ResultCache, content_hash, perceptual_hash
+from image_decoder import ImageDecoder
 
-object_detection = ObjectDetection()
+def load_object_detection():
+    from arduino.app_bricks.object_detection import ObjectDetection
+    detection = ObjectDetection()
+    # Decode the uploads just large enough for the input of the model, once the runner tells it
+    model_info = detection.get_model_info()
+    input_size = (getattr(model_info, 'image_input_width', -1), getattr(model_info, 'image_input_height', -1))
+    if min(input_size) > 0:
+        decoder.min_size = input_size
+    return detection
 
-def on_detect_objects(client_id, data):
-    """Callback function to handle object detection requests."""
-    try:
-        image_data = data.get('image')
-        confidence = data.get('confidence', 0.5)
-        if not image_data:
-            ui.send_message('detection_error', {'error': 'No image data'})
-            return
+# The model brick is created in the background once the App runs: the web UI serves without waiting for it
+object_detection = LazyBrick(load_object_detection, "ObjectDetection", profiler=profiler)
+# Handlers and the steps of the requests are timed, and the measures served in the Prometheus format on /metrics
+metrics = HandlerMetrics()
+# Results of the latest 256 images. An upload already seen is answered without being decoded, and an image of
+# the same size whose perceptual hash differs by at most 6 of its 256 bits, e.g. re-encoded, without inference.
+result_cache = ResultCache(max_entries=256, max_distance=6)
+# JPEG uploads are decoded at a fraction of their size still covering the model input
+decoder = ImageDecoder()
 
-        image_bytes = base64.b64decode(image_data)
-        pil_image = Image.open(io.BytesIO(image_bytes))
+# "geometry" only returns the detected boxes, drawn by the browser over the image it already has.
+# "image" returns the image with the boxes drawn by the server, encoded as IMAGE_FORMATS[image_format].
+DEFAULT_RESPONSE_MODE = "geometry"
+IMAGE_FORMATS = {"jpeg": "JPEG", "webp": "WEBP", "png": "PNG"}
+DEFAULT_IMAGE_FORMAT = "jpeg"
+DEFAULT_IMAGE_QUALITY = 85
 
-        start_time = time.time() * 1000
-        results = object_detection.detect(pil_image, confidence=confidence)
-        diff = time.time() * 1000 - start_time
+def encode_image(image: Image.Image, image_format: str, quality: int) -> tuple[str, str]:
+    """Encode an image as base64 in the given format. Returns (base64 data, MIME type)."""
+    pil_format = IMAGE_FORMATS.get(image_format)
+    if pil_format is None:
+        raise ValueError(f"Unsupported image format '{image_format}'. Must be one of {', '.join(IMAGE_FORMATS)}.")
+    if pil_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    img_buffer = io.BytesIO()
+    image.save(img_buffer, format=pil_format, quality=int(quality))
+    return base64.b64encode(img_buffer.getvalue()).decode("utf-8"), f"image/{image_format}"
 
-        if results is None:
-            ui.send_message('detection_error', {'error': 'No results returned'})
-            return
+def scale_detections(results: dict, from_size: tuple[int, int], to_size: tuple[int, int]) -> dict:
+    """Return detection results with the boxes scaled from an image size to another."""
+    if from_size == to_size:
+        return results
+    sx, sy = to_size[0] / from_size[0], to_size[1] / from_size[1]
 
-        img_with_boxes = object_detection.draw_bounding_boxes(pil_image, results)
+    def scale(box):
+        x1, y1, x2, y2 = box
+        return [x1 * sx, y1 * sy, x2 * sx, y2 * sy]
 
-        if img_with_boxes is not None:
-            img_buffer = io.BytesIO()
-            img_with_boxes.save(img_buffer, format="PNG")
-            img_buffer.seek(0)
-            b64_result = base64.b64encode(img_buffer.getvalue()).decode("utf-8")
-        else:
-            # If drawing fails, send back the original image
-            img_buffer = io.BytesIO()
-            pil_image.save(img_buffer, format="PNG")
-            img_buffer.seek(0)
-            b64_result = base64.b64encode(img_buffer.getvalue()).decode("utf-8")
+    return {**results, 'detection': [
+        {**d, 'bounding_box_xyxy': scale(d['bounding_box_xyxy'])} for d in results.get('detection', [])
+    ]}
+
+def detect(request: dict) -> tuple[Image.Image, tuple[int, int], dict | None, bool]:
+    """Run object detection on a request, in an inference worker.
+
+    Returns (decoded image, original image size, results, whether the results come from the cache). The image
+    may be decoded smaller than the original one, but the boxes of the results are in pixels of the original.
+    """
+    with metrics.stage('base64_decode', 'detect_objects'):
+        image_data = decoder.b64decode(request['image'])
+    with metrics.stage('image_decode', 'detect_objects'):
+        pil_image, image_size = decoder.decode(image_data)
+    confidence = request.get('confidence', 0.5)
+    with metrics.stage('hash', 'detect_objects'):
+        phash = perceptual_hash(pil_image)
+    # The boxes are in pixels: only images of the same size share their results
+    cached = result_cache.get_similar(phash, confidence, size=image_size)
+    if cached is not None:
+        return pil_image, image_size, cached[0], True
+    with metrics.stage('preprocess', 'detect_objects'):
+        model_input, image_type = decoder.model_input(pil_image, image_data, image_size)
+    with metrics.stage('inference', 'detect_objects'):
+        results = object_detection.detect(model_input, image_type=image_type, confidence=confidence)
+    if results is not None:
+        results = scale_detections(results, pil_image.size, image_size)
+        result_cache.put(request['digest'], phash, confidence, (results, image_size), size=image_size)
+    return pil_image, image_size, results, False
+
+# Requests from every client are served in arrival order by a single worker: the detection model
+# runs one image at a time. At most 8 requests wait for it, newer ones are rejected. Requests
+# arriving within 20 ms of each other are batched, so identical ones are only detected once.
+inference = InferenceQueue(detect, workers=1, max_queue=8, max_batch=4, batch_window=0.02,
+                           batch_key=lambda request: (request['digest'], request.get('confidence', 0.5)))
+
+def send_detection_result(client_id, data, detection, error, timings):
+    """Build the response of a detection request and send it to the client that asked for it."""
+    try:
+        if error is not None:
+            ui.send_message('detection_error', {'error': str(error)}, room=client_id)
+            return
 
+        metrics.observe('queue', timings['queue_wait_ms'] / 1000)
+        pil_image, image_size, results, cached = detection
+        if results is None:
+            ui.send_message('detection_error', {'error': 'No results returned'}, room=client_id)
+            return
+
+        detections = results.get("detection", [])
         response = {
             'success': True,
-            'result_image': b64_result,
-            'detection_count': len(results.get("detection", [])) if results else 0,
-            'processing_time': f"{diff:.2f} ms"
+            'detection_count': len(detections),
+            'processing_time': f"{timings['inference_ms']:.2f} ms",
+            'queue_time': f"{timings['queue_wait_ms']:.2f} ms",
+            'batch_size': timings['batch_size'],
+            'cached': cached
         }
-        ui.send_message('detection_result', response)
+
+        if data.get('response_mode', DEFAULT_RESPONSE_MODE) == "geometry":
+            # The client already has the image: only send what is needed to draw the boxes
+            response['image_size'] = list(image_size)
+            response['detections'] = [
+                {
+                    'class_name': d.get('class_name'),
+                    'confidence': float(d.get('confidence', 0)),
+                    'bounding_box_xyxy': [float(v) for v in d.get('bounding_box_xyxy', [])],
+                }
+                for d in detections
+            ]
+        else:
+            with metrics.stage('render'):
+                # Draw on a copy: the same image may be shared by identical requests in a batch
+                img_with_boxes = object_detection.draw_bounding_boxes(
+                    pil_image.copy(), scale_detections(results, image_size, pil_image.size))
+                if img_with_boxes is None:
+                    # If drawing fails, send back the original image
+                    img_with_boxes = pil_image
+            with metrics.stage('encode'):
+                response['result_image'], response['image_type'] = encode_image(
+                    img_with_boxes,
+                    data.get('image_format', DEFAULT_IMAGE_FORMAT),
+                    data.get('image_quality', DEFAULT_IMAGE_QUALITY),
+                )
+
+        ui.send_message('detection_result', response, room=client_id)
 
     except Exception as e:
-        ui.send_message('detection_error', {'error': str(e)})
+        ui.send_message('detection_error', {'error': str(e)}, room=client_id)
+
+# The response is built and sent by the inference worker: its steps are timed as part of the request
+send_result = metrics.timed('inference', 'detect_objects', send_detection_result)
+
+def on_detect_objects(client_id, data):
+    """Callback function to handle object detection requests."""
+    if not data.get('image'):
+        ui.send_message('detection_error', {'error': 'No image data'}, room=client_id)
+        return
+
+    start = time.perf_counter()
+    request = {**data, 'digest': content_hash(data['image'])}
+    if request.get('response_mode', DEFAULT_RESPONSE_MODE) == "geometry":
+        # Without an image to draw on, an upload already seen doesn't even need to be decoded
+        cached = result_cache.get(request['digest'], request.get('confidence', 0.5))
+        if cached is not None:
+            results, image_size = cached
+            timings = {'queue_wait_ms': 0.0, 'inference_ms': (time.perf_counter() - start) * 1000, 'batch_size': 0}
+            send_result(client_id, data, (None, image_size, results, True), None, timings)
+            return
+
+    queued = inference.submit(
+        request,
+        lambda detection, error, timings: send_result(client_id, data, detection, error, timings)
+    )
+    if not queued:
+        ui.send_message('detection_error', {'error': 'Too many requests, please try again later'}, room=client_id)
 
-ui = WebUI()
+with profiler.step("WebUI"):
+    ui = WebUI()
+metrics.instrument(ui)
 ui.on_message('detect_objects', on_detect_objects)
+# Hits and misses of the result cache
+ui.expose_api('GET', '/cache', result_cache.stats)
+# Import and initialisation times of the App
+ui.expose_api('GET', '/startup', profiler.stats)
 
-App.run()
\ No newline at end of file
+profiler.finish()
+App.run()
@@ -0,0 +1,154 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from collections import OrderedDict
+from collections.abc import Hashable
+import hashlib
+import threading
+from typing import Any
+from PIL import Image
+
+
+def content_hash(data: str | bytes) -> str:
+    """Return the hex digest identifying an uploaded image by its content, e.g. its base64 data."""
+    if isinstance(data, str):
+        data = data.encode("ascii")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def perceptual_hash(image: Image.Image, hash_size: int = 16) -> int:
+    """Return the difference hash of an image, as an integer of hash_size * hash_size bits.
+
+    The image is scaled down to (hash_size + 1) x hash_size gray pixels, and each bit tells whether a pixel is
+    darker than its right neighbour. Re-encoding, resizing or slightly changing the image only flips a few bits,
+    so nearly identical images have hashes at a short Hamming distance.
+    """
+    if image.mode not in ("L", "RGB"):
+        image = image.convert("RGB")
+    # reducing_gap lets PIL shrink large images by integer factors first, which is much faster
+    small = image.resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR, reducing_gap=2.0).convert("L")
+    pixels = small.tobytes()
+    bits = 0
+    for y in range(hash_size):
+        row = y * (hash_size + 1)
+        for x in range(row, row + hash_size):
+            bits = (bits << 1) | (pixels[x] < pixels[x + 1])
+    return bits
+
+
+class _Entry:
+    __slots__ = ("phash", "size", "params", "result")
+
+    def __init__(self, phash: int | None, size: tuple[int, int] | None, params: Hashable, result: Any):
+        self.phash = phash
+        self.size = size
+        self.params = params
+        self.result = result
+
+
+class ResultCache:
+    """Inference results of the latest images, keyed by the content of the images and the request parameters.
+
+    A result is found in two steps. `get` looks up the content hash of the upload, before it is even decoded:
+    resubmitting the same image is answered right away. On a miss, the image is decoded and `get_similar` looks
+    for an image with the same parameters (e.g. the confidence threshold), size, and a perceptual hash at most
+    `max_distance` bits away, like the same photo re-encoded by the browser. Only the `max_entries` most
+    recently used results are kept. Results stored without a perceptual hash are only found by content.
+
+    The results depend on the model, which doesn't change while the App runs: the cache is in memory only, and
+    emptied when the App restarts, e.g. to use a new model.
+    """
+
+    def __init__(self, max_entries: int = 256, max_distance: int = 0):
+        """Configure the cache.
+
+        Args:
+            max_entries (int, optional): Number of results kept. Defaults to 256.
+            max_distance (int, optional): Maximum number of differing bits between the perceptual hashes of two
+                images considered the same. Defaults to 0, the same hash.
+
+        Raises:
+            ValueError: If max_entries is not positive or max_distance is negative.
+        """
+        if max_entries <= 0 or max_distance < 0:
+            raise ValueError("max_entries must be positive and max_distance can't be negative")
+        self._max_entries = max_entries
+        self._max_distance = max_distance
+        self._entries: OrderedDict[tuple[str, Hashable], _Entry] = OrderedDict()  # (content hash, params), LRU
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def get(self, digest: str, params: Hashable, similar: bool = True) -> Any | None:
+        """Return the result of an image with the same content hash and parameters, or None.
+
+        Args:
+            digest (str): Content hash of the image, see `content_hash`.
+            params (Hashable): Parameters of the request the result depends on.
+            similar (bool, optional): Whether `get_similar` follows on a miss, and counts it. Otherwise the miss is
+                counted here. Defaults to True.
+        """
+        key = (digest, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if not similar:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry.result
+
+    def get_similar(self, phash: int, params: Hashable, size: tuple[int, int] | None = None) -> Any | None:
+        """Return the result of the most similar image with the same parameters, or None.
+
+        Args:
+            phash (int): Perceptual hash of the image, see `perceptual_hash`.
+            params (Hashable): Parameters of the request the result depends on.
+            size (tuple[int, int], optional): Size of the image, if the result depends on it, e.g. bounding boxes
+                in pixels. Defaults to matching images of any size.
+        """
+        with self._lock:
+            best_key, best_distance = None, self._max_distance + 1
+            for key, entry in self._entries.items():
+                if entry.phash is None or entry.params != params or (size is not None and entry.size != size):
+                    continue
+                distance = (entry.phash ^ phash).bit_count()
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+                    if distance == 0:
+                        break
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.similar_hits += 1
+            return self._entries[best_key].result
+
+    def put(self, digest: str, phash: int | None, params: Hashable, result: Any, size: tuple[int, int] | None = None):
+        """Store the result of an image, evicting the least recently used one if the cache is full.
+
+        Without a perceptual hash, the result is only found by `get`.
+        """
+        key = (digest, params)
+        with self._lock:
+            self._entries[key] = _Entry(phash, size, params, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Return the number of entries, of hits by content and by similarity, of misses, and the hit rate."""
+        with self._lock:
+            lookups = self.exact_hits + self.similar_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "max_distance": self._max_distance,
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.exact_hits + self.similar_hits) / lookups, 3) if lookups else None,
+            }
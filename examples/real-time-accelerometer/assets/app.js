@@ -12,6 +12,7 @@ const ctx = canvas.getContext('2d');
 const width = canvas.width, height = canvas.height;
 const maxSamples = 200;
 const samples = [];
+let lastSeq = null; // Sequence number of the newest sample received
 let errorContainer;
 
 function drawPlot() {
@@ -62,12 +63,45 @@ function drawPlot() {
   drawSeries('z','#FF2B2B');
 }
 
-function pushSample(s){
+function pushSample(s, redraw = true){
   samples.push(s);
   if (samples.length>maxSamples) samples.shift();
+  if (redraw) drawPlot();
+}
+
+// Samples are streamed in batches, either as parallel arrays or as binary buffers
+function toArray(column, ArrayType){
+  return column instanceof ArrayBuffer ? new ArrayType(column) : column;
+}
+
+function pushSamples(batch){
+  const t = toArray(batch.t, Float64Array);
+  const x = toArray(batch.x, Float32Array);
+  const y = toArray(batch.y, Float32Array);
+  const z = toArray(batch.z, Float32Array);
+  // Sequence numbers going backwards mean the App restarted: start over from this batch
+  if (lastSeq !== null && batch.seq < lastSeq){
+    samples.length = 0;
+    lastSeq = null;
+  }
+  // Skip the samples already received, e.g. both streamed and fetched while catching up
+  const first = lastSeq === null ? 0 : Math.max(0, t.length - (batch.seq - lastSeq));
+  for (let i=first; i<t.length; i++){
+    pushSample({t: t[i], x: x[i], y: y[i], z: z[i]}, false);
+  }
+  lastSeq = Math.max(lastSeq ?? 0, batch.seq);
   drawPlot();
 }
 
+// Fetch the samples newer than the last one received, or the latest ones the first time
+function fetchSamples(){
+  const query = lastSeq === null ? '' : `&since=${lastSeq}`;
+  return fetch(`/samples?encoding=columnar&limit=${maxSamples}${query}`)
+    .then(r=>r.json())
+    .then(pushSamples)
+    .catch(e=>console.debug('Failed to load /samples',e));
+}
+
 function renderClasses(d){
   const orderedKeys = ['snake', 'wave', 'updown', 'idle'];
   
@@ -134,11 +168,7 @@ fetch('/detection').then(r => r.json()).then(d => {
 });
 
 // Fetch recent samples on load
-fetch('/samples').then(r=>r.json()).then(list=>{
-  if (Array.isArray(list)){
-    list.forEach(s => pushSample(s));
-  }
-}).catch(e=>console.debug('Failed to load /samples',e));
+fetchSamples();
 
 // Connect explicitly using the full origin and the /socket.io path
 const serverOrigin = window.location.origin;
@@ -154,11 +184,13 @@ socket.on('movement', (data) => {
   setValues(data);
 });
 
-socket.on('sample', (s) => {
-  pushSample(s);
+socket.on('samples', (batch) => {
+  pushSamples(batch);
 });
 
 socket.on('connect', () => {
+  // Catch up with the samples streamed while disconnected
+  if (lastSeq !== null) fetchSamples();
   if (errorContainer) {
     errorContainer.style.display = 'none';
     errorContainer.textContent = '';
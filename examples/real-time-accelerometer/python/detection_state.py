@@ -0,0 +1,56 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+import json
+import threading
+
+
+class DetectionState:
+    """Latest movement classification probabilities, stored in fixed slots with a monotonically increasing version.
+
+    Every update replaces the snapshot dict instead of mutating it, so a snapshot handed out to a reader is never
+    modified afterwards. The JSON payload is serialized lazily and cached until the next update.
+    """
+
+    def __init__(self, labels: tuple[str, ...]):
+        """Initialize every label to a probability of 0.0.
+
+        Args:
+            labels (tuple[str, ...]): Movement classes tracked by this state.
+        """
+        self.labels = tuple(labels)
+        self._values = dict.fromkeys(self.labels, 0.0)
+        self._version = 0
+        self._payload: bytes | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        """Version of the current snapshot, incremented on every update."""
+        return self._version
+
+    def update(self, classification: dict) -> int:
+        """Store new probabilities. Labels missing from the classification are set to 0.0.
+
+        Returns:
+            int: The new version.
+        """
+        values = {label: float(classification.get(label, 0.0)) for label in self.labels}
+        with self._lock:
+            self._values = values
+            self._version += 1
+            self._payload = None
+            return self._version
+
+    def snapshot(self) -> tuple[int, dict]:
+        """Return (version, probabilities) for the current state. The dict must not be modified."""
+        with self._lock:
+            return self._version, self._values
+
+    def payload(self) -> tuple[int, bytes]:
+        """Return (version, JSON-encoded probabilities), serializing at most once per version."""
+        with self._lock:
+            if self._payload is None:
+                self._payload = json.dumps(self._values).encode("utf-8")
+            return self._version, self._payload
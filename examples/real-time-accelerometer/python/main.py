@@ -2,38 +2,47 @@
 #
 # SPDX-License-Identifier: MPL-2.0
 
+# Imported first, to time the imports of everything else
+from startup_profiler import StartupProfiler
+profiler = StartupProfiler()
+
 from arduino.app_utils import *
 from arduino.app_bricks.web_ui import WebUI
 from arduino.app_bricks.motion_detection import MotionDetection
-import pandas as pd
-from collections import deque
+from fastapi.responses import JSONResponse, Response
+from detection_state import DetectionState
+from sample_stream import SampleRingBuffer, SampleStreamer, encode_columnar, encode_records
+from handler_metrics import HandlerMetrics
 import time
 
 
 # Instantiate the MotionDetection brick with a confidence threshold
 CONFIDENCE = 0.4
-motion_detection = MotionDetection(confidence=CONFIDENCE)
+with profiler.step("MotionDetection"):
+    motion_detection = MotionDetection(confidence=CONFIDENCE)
 
 # Create a logger for this app
 logger = Logger("real-time-accelerometer")
 logger.debug(f"MotionDetection instantiated with confidence={CONFIDENCE}")
 
-# Dataframe holding the last classification probabilities
-detection_df = pd.DataFrame(
-    {
-        'idle': [0.0],
-        'snake': [0.0],
-        'updown': [0.0],
-        'wave' : [0.0]
-    }
-)
-
-# Instantiate WebUI brick
-web_ui = WebUI()
-
-# Expose a simple HTTP API to fetch the latest detection
-def _get_detection():
-    return detection_df.to_dict(orient='records')[0]
+# Versioned state holding the last classification probabilities
+MOVEMENTS = ('idle', 'snake', 'updown', 'wave')
+detection_state = DetectionState(MOVEMENTS)
+
+# Instantiate WebUI brick, with its handlers timed and the measures served in the Prometheus format on /metrics
+with profiler.step("WebUI"):
+    web_ui = WebUI()
+metrics = HandlerMetrics(web_ui)
+
+# Expose a simple HTTP API to fetch the latest detection.
+# The JSON body is serialized once per version; clients passing ?since=<version> get an empty
+# 204 response when nothing newer is available. The version is returned in the X-Detection-Version header.
+def _get_detection(since: int = -1):
+    version, payload = detection_state.payload()
+    headers = {"X-Detection-Version": str(version)}
+    if version <= since:
+        return Response(status_code=204, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
 
 web_ui.expose_api("GET", "/detection", _get_detection)
 
@@ -41,7 +50,7 @@ web_ui.expose_api("GET", "/detection", _get_detection)
 web_ui.on_connect(
     lambda sid: (
         logger.debug(f"Client connected: {sid} - sending current detection"),
-        web_ui.send_message('movement', detection_df.to_dict(orient='records')[0])
+        web_ui.send_message('movement', detection_state.snapshot()[1])
     )
 )
 logger.debug("Registered on_connect handler for WebUI")
@@ -55,48 +64,67 @@ def on_movement_detected(classification: dict):
         return
 
     try:
-        global detection_df
-        detection_df = pd.DataFrame(
-            {
-                'idle': [classification.get('idle', 0.0)],
-                'snake': [classification.get('snake', 0.0)],
-                'updown': [classification.get('updown', 0.0)],
-                'wave' : [classification.get('wave', 0.0)]
-            }
-        )
-
-        logger.debug(f"Updated detection_df: {detection_df.to_dict(orient='records')[0]}")
+        detection_state.update(classification)
+        version, detection = detection_state.snapshot()
+        logger.debug(f"Updated detection_state (version {version}): {detection}")
 
         # Broadcast update to connected websocket client
         try:
-            web_ui.send_message('movement', detection_df.to_dict(orient='records')[0])
+            web_ui.send_message('movement', detection)
             logger.debug("Broadcasted 'movement' message to WebUI client")
         except Exception as e:
             logger.warning(f"Failed to broadcast 'movement' message: {e}")
 
     except Exception as e:
-        logger.exception(f"dataframe: Error: {e}")
+        logger.exception(f"detection_state: Error: {e}")
 
 # Register movement callbacks
-motion_detection.on_movement_detection('idle', on_movement_detected)
-motion_detection.on_movement_detection('snake', on_movement_detected)
-motion_detection.on_movement_detection('updown', on_movement_detected)
-motion_detection.on_movement_detection('wave', on_movement_detected)
-logger.debug("Registered movement detection callbacks for idle,snake,updown,wave")
+for movement in MOVEMENTS:
+    motion_detection.on_movement_detection(movement, metrics.timed("motion", movement, on_movement_detected))
+logger.debug(f"Registered movement detection callbacks for {','.join(MOVEMENTS)}")
 
 # Bridge handler: called from the sketch via Bridge.notify("record_sensor_movement", x, y, z)
-# buffer of samples for the simple time-series chart
+# buffer of samples for the simple time-series chart, which shows the latest SAMPLES_MAX. SAMPLES_HISTORY samples
+# are kept for clients catching up or showing a longer history: about 8 minutes at 62.5 Hz, in 600 KB
 SAMPLES_MAX = 200
-samples = deque(maxlen=SAMPLES_MAX)
-
-# Provide a simple API to fetch recent samples for the frontend chart
-def _get_samples():
-    # return a list copy so the deque isn't exposed directly
-    return list(samples)
+SAMPLES_HISTORY = 30000
+samples = SampleRingBuffer(SAMPLES_HISTORY)
+
+# Samples are not sent one by one: they are flushed to the WebUI clients in batches
+# SAMPLES_FLUSH_HZ times per second, encoded as "columnar" (JSON arrays) or "binary" (float32 buffers)
+SAMPLES_FLUSH_HZ = 15
+SAMPLES_ENCODING = "columnar"
+SampleStreamer(web_ui, samples, rate_hz=SAMPLES_FLUSH_HZ, encoding=SAMPLES_ENCODING)
+logger.debug(f"Streaming samples at {SAMPLES_FLUSH_HZ} Hz using '{SAMPLES_ENCODING}' encoding")
+
+# Provide an API to fetch recent samples for the frontend chart.
+# Clients pass the cursor of the newest sample they have, either its sequence number (?since=<seq>) or its
+# timestamp (?since_t=<seconds>), to only get newer samples: at most `limit` of them, the newest. The sequence
+# number of the newest sample is returned in the X-Samples-Seq header. With ?encoding=columnar the samples are
+# parallel t/x/y/z arrays, like the streamed batches, instead of a list of {t, x, y, z} objects.
+SAMPLES_ENCODINGS = ("records", "columnar")
+
+def _get_samples(since: int | None = None, since_t: float | None = None, limit: int = SAMPLES_MAX,
+                 encoding: str = "records"):
+    if encoding not in SAMPLES_ENCODINGS:
+        return JSONResponse(status_code=400, content={"error": f"Unknown encoding '{encoding}'. Must be one of {', '.join(SAMPLES_ENCODINGS)}."})
+    if limit <= 0:
+        return JSONResponse(status_code=400, content={"error": "limit must be positive"})
+    if since is None:
+        since = samples.seq_at(since_t) if since_t is not None else 0
+    seq, t, x, y, z = samples.since(since, limit)
+    headers = {"X-Samples-Seq": str(seq)}
+    if encoding == "columnar":
+        return JSONResponse(content={"seq": seq, **encode_columnar(t, x, y, z)}, headers=headers)
+    # return a list of dicts so the ring buffer isn't exposed directly
+    return JSONResponse(content=encode_records(t, x, y, z), headers=headers)
 
 web_ui.expose_api("GET", "/samples", _get_samples)
 logger.info("Exposed GET /samples API")
 
+# Import and initialisation times of the App
+web_ui.expose_api("GET", "/startup", profiler.stats)
+
 def record_sensor_movement(x: float, y: float, z: float):
     logger.debug(f"record_sensor_movement called with raw g-values: x={x}, y={y}, z={z}")
     try:
@@ -109,21 +137,8 @@ def record_sensor_movement(x: float, y: float, z: float):
         motion_detection.accumulate_samples((x_ms2, y_ms2, z_ms2))
         logger.debug("Forwarded sensor sample to motion_detection.accumulate_samples")
 
-        # Use raw x,y,z for the lightweight chart
-        sample = {
-            "t": time.time(),
-            "x": float(x),
-            "y": float(y),
-            "z": float(z)
-        }
-
-        # push into local buffer and broadcast to connected UIs
-        samples.append(sample)
-        try:
-            web_ui.send_message('sample', sample)
-        except Exception:
-            # do not break on websocket failures
-            logger.debug('Failed to emit sample websocket message')
+        # Use raw x,y,z for the lightweight chart, the SampleStreamer broadcasts them to connected UIs
+        samples.append(time.time(), float(x), float(y), float(z))
 
     except Exception as e:
         logger.exception(f"record_sensor_movement: Error: {e}")
@@ -132,11 +147,12 @@ def record_sensor_movement(x: float, y: float, z: float):
 # Register the Bridge RPC provider so the sketch can call into Python
 try:
     logger.debug("Registering 'record_sensor_movement' Bridge provider")
-    Bridge.provide("record_sensor_movement", record_sensor_movement)
+    metrics.provide("record_sensor_movement", record_sensor_movement)
     logger.debug("'record_sensor_movement' registered successfully")
 except RuntimeError:
     logger.debug("'record_sensor_movement' already registered")
 
 # Let the App runtime manage bricks and run the web server
 logger.info("Starting App...")
+profiler.finish()
 App.run()
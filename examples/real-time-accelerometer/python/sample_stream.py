@@ -0,0 +1,178 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from array import array
+import threading
+import time
+from arduino.app_utils import brick, Logger
+
+logger = Logger("real-time-accelerometer.stream")
+
+
+class SampleRingBuffer:
+    """Fixed-size ring buffer holding the most recent accelerometer samples.
+
+    Samples are stored in preallocated columns (timestamps as float64, x/y/z as float32) instead of one dict
+    per sample. Every appended sample gets a monotonically increasing sequence number, so readers can fetch
+    only the samples they have not seen yet.
+    """
+
+    def __init__(self, capacity: int):
+        """Preallocate the buffer columns.
+
+        Args:
+            capacity (int): Maximum number of samples retained. Older samples are overwritten.
+
+        Raises:
+            ValueError: If capacity is not a positive integer.
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = int(capacity)
+        self._t = array("d", bytes(8 * self.capacity))
+        self._x = array("f", bytes(4 * self.capacity))
+        self._y = array("f", bytes(4 * self.capacity))
+        self._z = array("f", bytes(4 * self.capacity))
+        self._seq = 0  # Total number of samples ever appended
+        self._lock = threading.Lock()
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest sample (0 when the buffer is empty)."""
+        return self._seq
+
+    def __len__(self) -> int:
+        return min(self._seq, self.capacity)
+
+    def append(self, t: float, x: float, y: float, z: float):
+        """Store a sample, overwriting the oldest one when the buffer is full."""
+        with self._lock:
+            i = self._seq % self.capacity
+            self._t[i] = t
+            self._x[i] = x
+            self._y[i] = y
+            self._z[i] = z
+            self._seq += 1
+
+    def since(self, seq: int = 0, limit: int | None = None) -> tuple[int, array, array, array, array]:
+        """Return the samples appended after sequence number `seq`.
+
+        If the requested samples have already been overwritten, only the retained ones are returned. A cursor
+        newer than the newest sample, e.g. kept by a client across a restart of the App, is stale: the samples are
+        returned as for a cursor of 0.
+
+        Args:
+            seq (int, optional): Sequence number of the last sample already seen. Defaults to 0 (all samples).
+            limit (int, optional): Maximum number of samples returned, the newest ones. Defaults to no limit.
+
+        Returns:
+            tuple: (last_seq, t, x, y, z) where the columns are copies in chronological order.
+        """
+        with self._lock:
+            last = self._seq
+            if seq > last:
+                seq = 0
+            first = min(max(seq, last - self.capacity, last - limit if limit is not None else 0, 0), last)
+            return (last, *(self._slice(col, first, last) for col in (self._t, self._x, self._y, self._z)))
+
+    def seq_at(self, t: float) -> int:
+        """Return the sequence number of the last sample with a timestamp up to `t`.
+
+        Use it as a cursor for `since` to fetch the samples newer than a timestamp. Timestamps are expected to
+        increase with the sequence numbers. If `t` is older than all the retained samples, the cursor is before
+        the oldest one.
+        """
+        with self._lock:
+            low, high = max(self._seq - self.capacity, 0), self._seq
+            # Binary search of the first sample newer than t
+            while low < high:
+                middle = (low + high) // 2
+                if self._t[middle % self.capacity] <= t:
+                    low = middle + 1
+                else:
+                    high = middle
+            return low
+
+    def to_records(self, seq: int = 0, limit: int | None = None) -> list[dict]:
+        """Return the samples of `since` as a list of {t, x, y, z} dicts, oldest first."""
+        _, t, x, y, z = self.since(seq, limit)
+        return encode_records(t, x, y, z)
+
+    def _slice(self, col: array, first: int, last: int) -> array:
+        start = first % self.capacity
+        count = last - first
+        if start + count <= self.capacity:
+            return col[start:start + count]
+        return col[start:] + col[:start + count - self.capacity]
+
+
+def encode_records(t: array, x: array, y: array, z: array) -> list[dict]:
+    """Encode a batch of samples as a list of {t, x, y, z} dicts."""
+    return [{"t": t[i], "x": x[i], "y": y[i], "z": z[i]} for i in range(len(t))]
+
+
+def encode_columnar(t: array, x: array, y: array, z: array) -> dict:
+    """Encode a batch of samples as parallel JSON arrays."""
+    return {"t": t.tolist(), "x": x.tolist(), "y": y.tolist(), "z": z.tolist()}
+
+
+def encode_binary(t: array, x: array, y: array, z: array) -> dict:
+    """Encode a batch of samples as raw little-endian buffers (float64 timestamps, float32 axes).
+
+    Socket.IO sends bytes as binary attachments, which the browser receives as ArrayBuffers.
+    """
+    return {"n": len(t), "t": t.tobytes(), "x": x.tobytes(), "y": y.tobytes(), "z": z.tobytes()}
+
+
+ENCODERS = {
+    "columnar": encode_columnar,
+    "binary": encode_binary,
+}
+
+
+@brick
+class SampleStreamer:
+    """Periodically flushes new samples from a SampleRingBuffer to WebUI clients as one batched message."""
+
+    def __init__(self, web_ui, buffer: SampleRingBuffer, rate_hz: float = 15.0, encoding: str = "columnar", message_type: str = "samples"):
+        """Configure the streamer.
+
+        Args:
+            web_ui (WebUI): WebUI brick used to broadcast the batches.
+            buffer (SampleRingBuffer): Buffer the samples are read from.
+            rate_hz (float, optional): Number of batches sent per second. Defaults to 15.
+            encoding (str, optional): Batch encoding, "columnar" or "binary". Defaults to "columnar".
+            message_type (str, optional): WebSocket message name. Defaults to "samples".
+
+        Raises:
+            ValueError: If rate_hz is not positive or the encoding is unknown.
+        """
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+        if encoding not in ENCODERS:
+            raise ValueError(f"Unknown encoding '{encoding}'. Must be one of {', '.join(ENCODERS)}.")
+        self._web_ui = web_ui
+        self._buffer = buffer
+        self._interval = 1.0 / rate_hz
+        self._encode = ENCODERS[encoding]
+        self._message_type = message_type
+        self._last_seq = buffer.last_seq
+
+    def flush(self) -> int:
+        """Send all samples appended since the previous flush. Returns the number of samples sent."""
+        seq, t, x, y, z = self._buffer.since(self._last_seq)
+        self._last_seq = seq
+        if not t:
+            return 0
+        try:
+            # With the sequence number of its last sample, clients can fetch what they missed while disconnected
+            self._web_ui.send_message(self._message_type, {"seq": seq, **self._encode(t, x, y, z)})
+        except Exception as e:
+            # do not break on websocket failures
+            logger.debug(f"Failed to emit '{self._message_type}' websocket message: {e}")
+        return len(t)
+
+    def loop(self):
+        time.sleep(self._interval)
+        self.flush()
@@ -2,47 +2,52 @@
 #
 # SPDX-License-Identifier: MPL-2.0
 
-import datetime
-import psutil
-import time
 from arduino.app_bricks.dbstorage_tsstore import TimeSeriesStore
 from arduino.app_bricks.web_ui import WebUI
 from arduino.app_utils import App
+from resource_sampler import ResourceSampler
+from sample_rollups import SampleRollups
+from handler_metrics import HandlerMetrics
+
+# Time between two samples of the system resources, in seconds
+SAMPLE_INTERVAL = 5.0
 
 db = TimeSeriesStore()
 
 def on_get_samples(resource: str, start: str, aggr_window: str):
-    samples = db.read_samples(measure=resource, start_from=start, aggr_window=aggr_window, aggr_func="mean", limit=100)
-    res = []
-    for sample in samples:
-        point = {
-            "ts": sample[1],
-            "value": sample[2],
-        }
-        res.append(point)
-    return res
+    # Mean over aggr_window windows: 1m, 5m, 10m, 1h and 1d are served from the rollups
+    # kept up to date as samples are written, other windows are aggregated by the DB
+    return rollups.read(resource, start, aggr_window)
 
 ui = WebUI()
+# Handlers are timed, and the measures served in the Prometheus format on /metrics
+metrics = HandlerMetrics(ui)
 ui.expose_api("GET", "/get_samples/{resource}/{start}/{aggr_window}", on_get_samples)
 
-def get_events():
-    ts = int(datetime.datetime.now().timestamp() * 1000)
-    
+def on_sample(ts: int, values: dict):
+    rollups.record(ts, values)
+
     # CPU usage
-    cpu_percent = psutil.cpu_percent(interval=1)
-    db.write_sample('cpu', cpu_percent, ts)
     ui.send_message('cpu_usage', {
-        "value": cpu_percent,
+        "value": values["cpu"],
         "ts": ts
     })
     # Memory usage
-    mem_percent = psutil.virtual_memory().percent
-    db.write_sample('mem', mem_percent, ts)
     ui.send_message('memory_usage', {
-        "value": mem_percent,
+        "value": values["mem"],
+        "ts": ts
+    })
+    # All the other measures (per-core CPU, disk, network, load average)
+    ui.send_message('resources', {
+        "values": values,
         "ts": ts
     })
-    
-    time.sleep(5)
-            
-App.run(user_loop=get_events)
+
+# The sampler runs in its own thread, collecting all the measures without blocking
+# and storing them in the time-series DB every SAMPLE_INTERVAL seconds
+sampler = ResourceSampler(db, interval=SAMPLE_INTERVAL, on_sample=metrics.timed("sampler", "on_sample", on_sample))
+
+# The means over the most common windows are updated at every sample and stored in the DB
+rollups = SampleRollups(db, write=sampler.write, windows=("1m", "5m", "10m", "1h", "1d"), limit=100)
+
+App.run()
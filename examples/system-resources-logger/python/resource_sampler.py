@@ -0,0 +1,126 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from collections.abc import Callable
+import datetime
+import time
+import psutil
+from influxdb_client import Point, WritePrecision
+from arduino.app_bricks.dbstorage_tsstore import TimeSeriesStore
+from arduino.app_utils import brick, Logger
+
+logger = Logger("ResourceSampler")
+
+
+@brick
+class ResourceSampler:
+    """Background sampler of the board resources.
+
+    Every `interval` seconds it collects, in a single pass and without blocking:
+    - `cpu` and `cpu_<n>`: total and per-core CPU usage (%), from the deltas since the previous sample
+    - `mem`: memory usage (%)
+    - `disk_read`, `disk_write`: disk I/O (bytes/s)
+    - `net_recv`, `net_sent`: network I/O (bytes/s)
+    - `load_1`, `load_5`, `load_15`: load average
+    - `logger_cpu`, `logger_mem`: CPU (%) and resident memory (bytes) used by the logger itself
+
+    All measures are written to the TimeSeriesStore as one multi-measure point.
+    """
+
+    def __init__(self, db: TimeSeriesStore, interval: float = 5.0, on_sample: Callable[[int, dict], None] = None, measurement_name: str = "arduino"):
+        """Configure the sampler.
+
+        Args:
+            db (TimeSeriesStore): Store the samples are written to.
+            interval (float, optional): Time between samples in seconds. Defaults to 5.
+            on_sample (Callable[[int, dict], None], optional): Called with (timestamp in ms, measures) after every sample.
+            measurement_name (str, optional): Measurement container name. Defaults to "arduino".
+
+        Raises:
+            ValueError: If interval is not positive.
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self._db = db
+        self._interval = interval
+        self._on_sample = on_sample
+        self._measurement_name = measurement_name
+        self._process = psutil.Process()
+        self._last_time = None
+        self._last_disk = None
+        self._last_net = None
+        self._next_sample = None
+
+    def start(self):
+        # Prime the counters: the first non-blocking cpu_percent() call always returns 0
+        psutil.cpu_percent(interval=None, percpu=True)
+        self._process.cpu_percent(interval=None)
+        self._last_time = time.monotonic()
+        self._last_disk = psutil.disk_io_counters()
+        self._last_net = psutil.net_io_counters()
+        self._next_sample = self._last_time + self._interval
+
+    def sample(self) -> dict[str, float]:
+        """Collect all measures since the previous sample."""
+        now = time.monotonic()
+        elapsed = max(now - self._last_time, 1e-6)
+        self._last_time = now
+
+        per_core = psutil.cpu_percent(interval=None, percpu=True)
+        values = {"cpu": sum(per_core) / len(per_core)}
+        for n, percent in enumerate(per_core):
+            values[f"cpu_{n}"] = percent
+        values["mem"] = psutil.virtual_memory().percent
+
+        disk = psutil.disk_io_counters()
+        if disk is not None and self._last_disk is not None:
+            values["disk_read"] = (disk.read_bytes - self._last_disk.read_bytes) / elapsed
+            values["disk_write"] = (disk.write_bytes - self._last_disk.write_bytes) / elapsed
+        self._last_disk = disk
+
+        net = psutil.net_io_counters()
+        if net is not None and self._last_net is not None:
+            values["net_recv"] = (net.bytes_recv - self._last_net.bytes_recv) / elapsed
+            values["net_sent"] = (net.bytes_sent - self._last_net.bytes_sent) / elapsed
+        self._last_net = net
+
+        values["load_1"], values["load_5"], values["load_15"] = psutil.getloadavg()
+
+        with self._process.oneshot():
+            values["logger_cpu"] = self._process.cpu_percent(interval=None)
+            values["logger_mem"] = self._process.memory_info().rss
+
+        return values
+
+    def write(self, ts: int, values: dict[str, float]):
+        """Write many measures sampled at the same time as a single point.
+
+        Args:
+            ts (int): Timestamp in milliseconds since epoch.
+            values (dict[str, float]): Measure name to value.
+        """
+        try:
+            point = Point.from_dict({"measurement": self._measurement_name, "fields": values, "time": ts}, WritePrecision.MS)
+            self._db.write_api.write(bucket=self._db.bucket, record=point)
+        except Exception as e:
+            logger.exception(f"Error writing system resources to the time series store: {e}")
+
+    def loop(self):
+        # Sleep until the next tick, so sampling doesn't drift by the time spent sampling and writing
+        time.sleep(max(self._next_sample - time.monotonic(), 0))
+        self._next_sample = max(self._next_sample + self._interval, time.monotonic())
+
+        ts = int(datetime.datetime.now().timestamp() * 1000)
+        try:
+            values = self.sample()
+        except Exception as e:
+            logger.exception(f"Error sampling system resources: {e}")
+            return
+
+        self.write(ts, values)
+        if self._on_sample:
+            try:
+                self._on_sample(ts, values)
+            except Exception as e:
+                logger.exception(f"Error handling the system resources sample: {e}")
@@ -95,6 +95,11 @@ function setChecked(name, value) {
   if (el) el.checked = value ? true : false;
 }
 
+// Set many pins at once, e.g. setPins({ D13: "on", LED3_R: "off" }): the backend writes them in a single call
+function setPins(states) {
+  socket.emit("pins_set", { states });
+}
+
 // --------------- Wire everything -------------------------------------
 document.addEventListener("DOMContentLoaded", () => {
   // create switches
@@ -121,10 +126,9 @@ document.addEventListener("DOMContentLoaded", () => {
     })
     .catch(() => {});
 
-  // keep in sync
-  socket.on("pin_state_update", (msg) => {
-    if (!msg?.name) return;
-    setChecked(msg.name, msg.state === true || msg.state === 1 || msg.state === "on" || msg.state === "1");
+  // keep in sync: one message per bulk write, with the final state of every pin written
+  socket.on("pin_states_update", (msg) => {
+    Object.entries(msg?.states || {}).forEach(([name, v]) => setChecked(name, v === true || v === 1 || v === "on" || v === "1"));
   });
 
   socket.on("error", (m) => console.error("Server error:", m));
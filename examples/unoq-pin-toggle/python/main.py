@@ -6,6 +6,10 @@ import json, ast
 from datetime import datetime, UTC
 from arduino.app_utils import *
 from arduino.app_bricks.web_ui import WebUI
+from fastapi.responses import JSONResponse
+from pin_batcher import PinBatcher
+from bridge_dispatcher import BridgeDispatcher
+from handler_metrics import HandlerMetrics
 
 # ---------- Pin config: add pins here ----------
 # - "active_low": True if the hardware turns ON when the pin is LOW
@@ -44,11 +48,22 @@ PIN_CONFIG = {
 
 }
 PIN_NAMES = tuple(PIN_CONFIG.keys())
+# Index of each pin in the bulk updates: bit i of a mask is PIN_NAMES[i], in the same order as kPins in the sketch
+PIN_INDEX = {name: i for i, name in enumerate(PIN_NAMES)}
+ALL_PINS_MASK = (1 << len(PIN_NAMES)) - 1
+# Pins whose hardware level is inverted, as a mask
+ACTIVE_LOW_MASK = sum(1 << i for i, name in enumerate(PIN_NAMES) if PIN_CONFIG[name].get("active_low"))
+
+# Updates arriving within this window (seconds) are written to the MCU in one call, and rapid toggles
+# of the same pin within it only write the final state
+BATCH_WINDOW = 0.02
 
 # Store *logical* states (True = ON as seen by the UI)
 pin_states = {name: False for name in PIN_NAMES}
 
 ui = WebUI()
+# Handlers are timed, and the measures served in the Prometheus format on /metrics
+metrics = HandlerMetrics(ui)
 
 def _iso_now() -> str:
     return datetime.now(UTC).isoformat()
@@ -63,6 +78,9 @@ def _normalize_state(value) -> bool:
     raise ValueError(f"Invalid state value: {value!r}")
 
 def _ensure_dict(payload):
+    # Fast path: Socket.IO and FastAPI already decoded the JSON message
+    if type(payload) is dict:
+        return payload
     if isinstance(payload, (list, tuple)) and len(payload) == 1:
         payload = payload[0]
     if isinstance(payload, dict):
@@ -72,7 +90,11 @@ def _ensure_dict(payload):
     if isinstance(payload, str):
         s = payload.strip()
         try:
-            return json.loads(s)
+            val = json.loads(s)
+            if isinstance(val, list) and len(val) == 1 and isinstance(val[0], dict):
+                return val[0]
+            if isinstance(val, dict):
+                return val
         except Exception:
             try:
                 val = ast.literal_eval(s)
@@ -85,10 +107,59 @@ def _ensure_dict(payload):
         raise ValueError(f"Unsupported string payload: {s[:80]}...")
     raise ValueError(f"Unsupported payload type: {type(payload).__name__}")
 
-def _state_for_hw(name: str, logical_state: bool) -> bool:
-    """Return the boolean to send to the MCU, applying active-low if set."""
-    cfg = PIN_CONFIG.get(name, {})
-    return (not logical_state) if cfg.get("active_low") else logical_state
+def _hw_values(mask: int, logical_values: int) -> int:
+    """Return the bitmask of levels to send to the MCU, applying active-low where set."""
+    return (logical_values ^ ACTIVE_LOW_MASK) & mask
+
+def _parse_bulk(data: dict) -> tuple[int, int]:
+    """Parse a bulk update into (mask, logical values).
+
+    Accepts either {"mask": <int>, "values": <int>}, with bit i standing for PIN_NAMES[i], or
+    {"states": {"<pin name>": <state>, ...}}.
+    """
+    if "mask" in data:
+        mask, values = int(data["mask"]), int(data.get("values", 0))
+        if mask & ~ALL_PINS_MASK:
+            raise ValueError(f"Mask {mask:#x} has bits beyond the {len(PIN_NAMES)} pins")
+        return mask, values & mask
+    states = data.get("states")
+    if not isinstance(states, dict):
+        raise ValueError("Expected 'mask' and 'values', or 'states'")
+    mask = values = 0
+    for name, state in states.items():
+        index = PIN_INDEX.get(name)
+        if index is None:
+            raise ValueError(f"Unknown Pin '{name}'")
+        mask |= 1 << index
+        if _normalize_state(state):
+            values |= 1 << index
+    return mask, values
+
+def _set_pins(mask: int, values: int):
+    """Update the logical states and queue the pins for the next bulk write to the MCU."""
+    for i, name in enumerate(PIN_NAMES):
+        if mask >> i & 1:
+            pin_states[name] = bool(values >> i & 1)
+    return batcher.set(mask, values)
+
+# Bridge calls go through the dispatcher, which records their latency
+bridge = BridgeDispatcher()
+
+def _write_pins(mask: int, values: int):
+    bridge.submit("set_pins", mask, _hw_values(mask, values)).result()
+
+def _on_pins_written(mask: int, values: int):
+    states = {name: bool(values >> i & 1) for i, name in enumerate(PIN_NAMES) if mask >> i & 1}
+    print(f"[{_iso_now()}] wrote {len(states)} pin(s): mask={mask:#09x} hw={_hw_values(mask, values):#09x}")
+    ui.send_message("pin_states_update", {
+        "states": states,           # broadcast logical states to clients
+        "timestamp": _iso_now()
+    })
+
+def _on_write_error(e: Exception):
+    ui.send_message("error", f"Pin write error: {e}")
+
+batcher = PinBatcher(metrics.timed("batcher", "write_pins", _write_pins), window=BATCH_WINDOW, on_written=_on_pins_written, on_error=_on_write_error)
 
 def on_pin_toggle(sid, message):
     try:
@@ -99,28 +170,37 @@ def on_pin_toggle(sid, message):
 
         # Logical state from UI ("on"/"off", 1/0, true/false -> bool)
         logical = _normalize_state(data.get("state"))
-        pin_states[name] = logical
-
-        # Apply active-low for the MCU call
-        state_for_hw = _state_for_hw(name, logical)
+        bit = 1 << PIN_INDEX[name]
+        _set_pins(bit, bit if logical else 0)
 
-        Bridge.call("set_pin_by_name", name, state_for_hw)
+    except Exception as e:
+        ui.send_message("error", f"Pin toggle error: {e}")
 
-        print(f"[{_iso_now()}] [{sid}] {name} -> logical={'ON' if logical else 'OFF'} hw={state_for_hw}")
-        ui.send_message("pin_state_update", {
-            "name": name,
-            "state": logical,           # broadcast logical state to clients
-            "timestamp": _iso_now()
-        })
+def on_pins_set(sid, message):
+    try:
+        _set_pins(*_parse_bulk(_ensure_dict(message)))
+    except Exception as e:
+        ui.send_message("error", f"Pin update error: {e}")
 
+def on_post_pins(body: dict):
+    # Waits for the bulk write, so the response tells whether the MCU was updated
+    try:
+        _set_pins(*_parse_bulk(_ensure_dict(body))).result(timeout=10)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
     except Exception as e:
-        ui.send_message("error", f"Pin toggle error: {e}")
+        return JSONResponse(status_code=502, content={"error": f"Pin write error: {e}"})
+    return on_get_states()
 
 def on_get_states():
     # Return logical states to the UI
-    return {"timestamp": _iso_now(), "states": pin_states}
+    return {"timestamp": _iso_now(), "states": pin_states, "pins": PIN_NAMES}
 
 ui.on_message("pin_toggle", on_pin_toggle)
+ui.on_message("pins_set", on_pins_set)
 ui.expose_api("GET", "/states", on_get_states)
+ui.expose_api("POST", "/pins", on_post_pins)
+ui.expose_api("GET", "/pins/stats", batcher.stats)
+ui.expose_api("GET", "/bridge/stats", bridge.stats)
 
 App.run()
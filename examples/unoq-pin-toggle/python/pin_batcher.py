@@ -0,0 +1,101 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from collections.abc import Callable
+from concurrent.futures import Future
+import threading
+import time
+from arduino.app_utils import brick, Logger
+
+logger = Logger("PinBatcher")
+
+
+@brick
+class PinBatcher:
+    """Coalesces pin updates into bulk writes to the MCU.
+
+    Pins are identified by their index, and a set of updates is encoded as two bitmasks: `mask` has bit i set if
+    pin i is updated, `values` has bit i set if pin i is turned on. `set` only records the updates and returns
+    right away. The brick loop then waits `window` seconds for more updates, and writes all of them with a single
+    `write(mask, values)` call. A pin updated several times meanwhile, e.g. by rapid toggles, is only written
+    once, with its final state.
+    """
+
+    def __init__(self, write: Callable[[int, int], None], window: float = 0.02,
+                 on_written: Callable[[int, int], None] = None, on_error: Callable[[Exception], None] = None):
+        """Configure the batcher.
+
+        Args:
+            write (Callable[[int, int], None]): Writes the pins of `mask` to the states of `values`, e.g. with a
+                Bridge call. Raises on failure.
+            window (float, optional): Time in seconds updates are collected for before being written.
+                Defaults to 0.02.
+            on_written (Callable[[int, int], None], optional): Called with (mask, values) after each write.
+            on_error (Callable[[Exception], None], optional): Called when a write fails.
+
+        Raises:
+            ValueError: If window is negative.
+        """
+        if window < 0:
+            raise ValueError("window can't be negative")
+        self._write = write
+        self._window = window
+        self._on_written = on_written
+        self._on_error = on_error
+        self._cond = threading.Condition()
+        self._mask = 0
+        self._values = 0
+        self._done: Future | None = None  # Resolved when the pending updates are written
+        self.updates = 0
+        self.coalesced = 0
+        self.writes = 0
+
+    def set(self, mask: int, values: int) -> Future:
+        """Record updates of the pins of `mask` to the states of `values`, overriding pending updates of the same pins.
+
+        Returns:
+            Future: Resolved when the updates are written, or failed with the error of the write.
+        """
+        if not mask:
+            done = Future()
+            done.set_result(None)
+            return done
+        with self._cond:
+            self.updates += mask.bit_count()
+            self.coalesced += (self._mask & mask).bit_count()
+            self._values = (self._values & ~mask) | (values & mask)
+            self._mask |= mask
+            if self._done is None:
+                self._done = Future()
+                self._cond.notify()
+            return self._done
+
+    def loop(self):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._done is not None, timeout=1.0):
+                return
+        if self._window:
+            time.sleep(self._window)  # Let further updates join this write
+        with self._cond:
+            mask, values, done = self._mask, self._values, self._done
+            self._mask, self._values, self._done = 0, 0, None
+
+        try:
+            self._write(mask, values)
+        except Exception as e:
+            logger.warning(f"Failed to write pins {mask:#x}: {e}")
+            done.set_exception(e)
+            if self._on_error:
+                self._on_error(e)
+            return
+        with self._cond:
+            self.writes += 1
+        done.set_result(None)
+        if self._on_written:
+            self._on_written(mask, values)
+
+    def stats(self) -> dict:
+        """Return the number of pin updates recorded, coalesced with a later one, and of writes."""
+        with self._cond:
+            return {"updates": self.updates, "coalesced": self.coalesced, "writes": self.writes}
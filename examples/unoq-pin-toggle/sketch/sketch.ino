@@ -17,8 +17,11 @@ static const PinEntry kPins[] = {
   {"LED4_R", LED_BUILTIN + 3}, {"LED4_G", LED_BUILTIN + 4}, {"LED4_B", LED_BUILTIN + 5},
 };
 
+static const size_t kPinCount = sizeof(kPins)/sizeof(kPins[0]);
+static_assert(kPinCount <= 32, "set_pins masks are 32 bits");
+
 static inline int findIndex(const char* n) {
-  for (size_t i = 0; i < sizeof(kPins)/sizeof(kPins[0]); ++i) {
+  for (size_t i = 0; i < kPinCount; ++i) {
     if (strcmp(kPins[i].name, n) == 0) return (int)i;
   }
   return -1;
@@ -31,6 +34,13 @@ void set_pin_by_name(String name, bool s) {
   digitalWrite(kPins[idx].pin, s ? HIGH : LOW);   // Python already applied active_low
 }
 
+// Bulk setter: bit i of mask selects kPins[i], bit i of values is its level.
+// One call updates any number of pins, without looking names up.
+void set_pins(uint32_t mask, uint32_t values) {
+  for (size_t i = 0; i < kPinCount; ++i) {
+    if (mask & (1UL << i)) digitalWrite(kPins[i].pin, (values & (1UL << i)) ? HIGH : LOW);
+  }
+}
 
 void setup()
 {
@@ -45,6 +55,7 @@ void setup()
     Bridge.begin();
     
     Bridge.provide("set_pin_by_name", set_pin_by_name);
+    Bridge.provide("set_pins", set_pins);
 }
 
 void loop() {}
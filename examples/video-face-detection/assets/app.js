@@ -6,6 +6,7 @@ const recentDetectionsElement = document.getElementById('recentDetections');
 const feedbackContentElement = document.getElementById('feedback-content');
 const MAX_RECENT_SCANS = 5;
 let scans = [];
+let currentDetections = {}; // label -> confidence, of what is currently in view
 const socket = io(`http://${window.location.host}`); // Initialize socket.io connection
 let errorContainer = document.getElementById('error-container');
 let handVisible = false;
@@ -65,10 +66,27 @@ function initSocketIO() {
         }
     });
 
+    // Each message has the detections that changed since the previous one
     socket.on('detection', async (message) => {
+        applyDetectionUpdate(message);
+        if (message.updated.length > 0) {
+            message.updated.forEach((detection) => printDetection({ ...detection, timestamp: message.timestamp }));
+            renderDetections();
+        }
+        if (Object.keys(currentDetections).length === 0) {
+            // Revert after 3 seconds of no detections
+            detectionTimeout = detectionTimeout || setTimeout(() => {
+                feedbackContentElement.innerHTML = `
+                    <img src="img/stars.svg" alt="Stars">
+                    <p class="feedback-text">System response will appear here</p>
+                `;
+                handVisible = false;
+                detectionTimeout = null;
+            }, 3000);
+            return;
+        }
         clearTimeout(detectionTimeout);
-        printDetection(message);
-        renderDetections();
+        detectionTimeout = null;
 
         if (!handVisible) {
             const greetings = ["Hello!", "Hi there!", "Hey!", "Nice to see you!", "Great to have you here!", "I see you", "Looking good!", "There you are!", "Howdy!", "Happy to see a face!", "Hi, friend!", "Face detected!", "Hello, human!"];
@@ -79,18 +97,16 @@ function initSocketIO() {
             `;
             handVisible = true;
         }
-
-        detectionTimeout = setTimeout(() => {
-            feedbackContentElement.innerHTML = `
-                <img src="img/stars.svg" alt="Stars">
-                <p class="feedback-text">System response will appear here</p>
-            `;
-            handVisible = false;
-        }, 3000); // Revert after 3 seconds of no detections
     });
 
 }
 
+// Applies a detection message to the detections currently in view
+function applyDetectionUpdate(message) {
+    message.updated.forEach((detection) => { currentDetections[detection.content] = detection.confidence; });
+    message.removed.forEach((label) => { delete currentDetections[label]; });
+}
+
 function printDetection(newDetection) {
     scans.unshift(newDetection);
     if (scans.length > MAX_RECENT_SCANS) { scans.pop(); }
@@ -0,0 +1,150 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from datetime import datetime, UTC
+import threading
+import time
+from arduino.app_utils import brick, Logger
+
+logger = Logger("DetectionEvents")
+
+
+class _Client:
+    __slots__ = ("sent", "next_send")
+
+    def __init__(self):
+        self.sent: dict[str, float] = {}  # label -> confidence, as last sent to the client
+        self.next_send = 0.0
+
+
+@brick
+class DetectionEvents:
+    """Aggregates the detections of a video stream into batched, delta-only, rate-limited WebUI messages.
+
+    `publish` is called with the detections of each frame and only records them. Messages are sent from the brick
+    loop, to each connected client separately: at most `max_rate` messages per second, each carrying what changed
+    since the previous message to that client. A message looks like:
+
+        {"timestamp": "2025-01-01T00:00:00+00:00",
+         "updated": [{"content": "cat", "confidence": 0.82}],
+         "removed": ["dog"]}
+
+    A label is in `updated` when it appeared, or when its confidence moved by at least `min_delta` since it was
+    last sent. It is in `removed` when the latest frame doesn't have it anymore, or when no frame at all was
+    published for `expire_after` seconds. No message is sent while nothing changes. A newly connected client
+    first gets all the current detections.
+    """
+
+    def __init__(self, ui, message_type: str, max_rate: float = 5.0, min_delta: float = 0.05, expire_after: float = 1.0):
+        """Configure the events.
+
+        Args:
+            ui (WebUI): WebUI the messages are sent to.
+            message_type (str): Type of the messages.
+            max_rate (float, optional): Maximum number of messages per second to each client. Defaults to 5.
+            min_delta (float, optional): Minimum change of confidence reported. Defaults to 0.05.
+            expire_after (float, optional): Time in seconds without frames after which the detections are
+                removed. Defaults to 1.
+
+        Raises:
+            ValueError: If max_rate or expire_after is not positive.
+        """
+        if max_rate <= 0 or expire_after <= 0:
+            raise ValueError("max_rate and expire_after must be positive")
+        self._ui = ui
+        self._message_type = message_type
+        self._interval = 1.0 / max_rate
+        self._min_delta = min_delta
+        self._expire_after = expire_after
+        self._current: dict[str, float] = {}  # label -> confidence, in the latest frame
+        self._published_at = 0.0
+        self._clients: dict[str, _Client] = {}
+        self._cond = threading.Condition()
+        self._changed = False
+        self.frames = 0
+        self.messages = 0
+
+    def add_client(self, sid: str):
+        """Start sending messages to a client, beginning with the current detections."""
+        with self._cond:
+            self._clients[sid] = _Client()
+            self._changed = True
+            self._cond.notify()
+
+    def remove_client(self, sid: str):
+        with self._cond:
+            self._clients.pop(sid, None)
+
+    def publish(self, detections: dict[str, float]):
+        """Record the detections of a frame.
+
+        Args:
+            detections (dict[str, float]): Confidence of each label detected in the frame.
+        """
+        with self._cond:
+            self.frames += 1
+            self._current = dict(detections)
+            self._published_at = time.monotonic()
+            self._changed = True
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._clients.clear()
+            self._cond.notify()
+
+    def loop(self):
+        with self._cond:
+            if not self._changed:
+                self._cond.wait(timeout=self._expire_after)
+            now = time.monotonic()
+            if self._current and now - self._published_at >= self._expire_after:
+                self._current = {}
+                self._changed = True
+            if not self._changed:
+                return
+
+            messages, wait = [], None
+            for sid, client in self._clients.items():
+                delta = self._delta(client)
+                if delta is None:
+                    continue
+                if now < client.next_send:
+                    # Rate limited: sent with whatever changes by then
+                    wait = min(wait or self._interval, client.next_send - now)
+                    continue
+                updated, removed = delta
+                client.sent.update(updated)
+                for label in removed:
+                    del client.sent[label]
+                client.next_send = now + self._interval
+                messages.append((sid, updated, removed))
+            self._changed = wait is not None
+            self.messages += len(messages)
+
+        if messages:
+            timestamp = datetime.now(UTC).isoformat()
+            for sid, updated, removed in messages:
+                message = {
+                    "timestamp": timestamp,
+                    "updated": [{"content": label, "confidence": confidence} for label, confidence in updated.items()],
+                    "removed": removed,
+                }
+                self._ui.send_message(self._message_type, message, room=sid)
+        if wait is not None:
+            time.sleep(wait)
+
+    def _delta(self, client: _Client) -> tuple[dict[str, float], list[str]] | None:
+        """Changes since the last message sent to a client, or None if none."""
+        updated = {
+            label: confidence for label, confidence in self._current.items()
+            if label not in client.sent or abs(confidence - client.sent[label]) >= self._min_delta
+        }
+        removed = [label for label in client.sent if label not in self._current]
+        return (updated, removed) if updated or removed else None
+
+    def stats(self) -> dict:
+        """Return the number of frames published, messages sent and connected clients."""
+        with self._cond:
+            return {"frames": self.frames, "messages": self.messages, "clients": len(self._clients)}
@@ -6,6 +6,7 @@ const recentDetectionsElement = document.getElementById('recentDetections');
 const feedbackContentElement = document.getElementById('feedback-content');
 const MAX_RECENT_SCANS = 5;
 let scans = [];
+let currentDetections = {}; // label -> confidence, of what is currently in view
 const socket = io(`http://${window.location.host}`); // Initialize socket.io connection
 let errorContainer = document.getElementById('error-container');
 
@@ -58,14 +59,26 @@ function initSocketIO() {
         }
     });
 
+    // Each message has the detections that changed since the previous one
     socket.on('detection', async (message) => {
-        printDetection(message);
+        applyDetectionUpdate(message);
+        if (message.updated.length === 0) return;
+
+        message.updated.forEach((detection) => printDetection({ ...detection, timestamp: message.timestamp }));
         renderDetections();
-        updateFeedback(message);
+        // Feedback for the most confident object in view
+        const best = Object.entries(currentDetections).sort((a, b) => b[1] - a[1])[0];
+        updateFeedback({ content: best[0], confidence: best[1] });
     });
 
 }
 
+// Applies a detection message to the detections currently in view
+function applyDetectionUpdate(message) {
+    message.updated.forEach((detection) => { currentDetections[detection.content] = detection.confidence; });
+    message.removed.forEach((label) => { delete currentDetections[label]; });
+}
+
 function updateFeedback(detection) {
     const objectInfo = {
         "cat": { text: "Meow!", gif: "cat.webp" },
@@ -0,0 +1,197 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from collections import deque
+from collections.abc import Callable
+import math
+import threading
+import time
+from arduino.app_utils import brick, Logger
+
+logger = Logger("DetectionScheduler")
+
+# Period in seconds of the rate adaptation and of the statistics
+ADAPT_INTERVAL = 1.0
+
+
+def motion(previous: dict, current: dict) -> float:
+    """Cheap scene-change score between the detections of two frames.
+
+    Args:
+        previous (dict): Detections of the earlier frame, as passed by VideoObjectDetection.on_detect_all.
+        current (dict): Detections of the later frame.
+
+    Returns:
+        float: 1 if a label appeared or disappeared, otherwise the largest movement of a bounding box: the shift
+            of its center plus the change of its size, relative to its diagonal.
+    """
+    if previous.keys() != current.keys():
+        return 1.0
+    score = 0.0
+    for label, detection in current.items():
+        x1, y1, x2, y2 = detection.get("bounding_box_xyxy") or (0, 0, 0, 0)
+        px1, py1, px2, py2 = previous[label].get("bounding_box_xyxy") or (0, 0, 0, 0)
+        diagonal = math.hypot(px2 - px1, py2 - py1)
+        if diagonal <= 0:
+            continue
+        shift = math.hypot((x1 + x2 - px1 - px2) / 2, (y1 + y2 - py1 - py2) / 2)
+        resize = abs(math.hypot(x2 - x1, y2 - y1) - diagonal)
+        score = max(score, (shift + resize) / diagonal)
+    return score
+
+
+@brick
+class DetectionScheduler:
+    """Decides which detection results of a video stream get processed, to save work on static scenes.
+
+    Detections are offered by the VideoObjectDetection brick, see `offer`, and dispatched from the brick loop to
+    the handlers registered with `on_detect` and `on_detect_all`, like the ones of VideoObjectDetection.
+
+    - Motion gate: a result is compared with the last dispatched one (see `motion`). While the scene is static,
+      results are only dispatched at `idle_fps`.
+    - Bursts: when the motion score reaches `motion_threshold`, every result is dispatched for `burst_sec`.
+    - Load shedding: results arriving while the previous one is being handled replace each other, so handlers
+      never lag behind. Every second the maximum dispatch rate is halved if the dispatch latency exceeds
+      `latency_budget`, and raised back progressively otherwise. The board load isn't taken into account: the
+      model runs in its own container whatever the handlers do, so lowering the rate wouldn't save its work.
+
+    Effective FPS, skipped results and end-to-end latency, from the arrival of a result to the end of its
+    handlers, are available from `stats()`.
+    """
+
+    def __init__(self, idle_fps: float = 2.0, max_fps: float = 30.0, min_fps: float = 0.5, motion_threshold: float = 0.1,
+                 burst_sec: float = 2.0, latency_budget: float = 0.2):
+        """Configure the scheduler.
+
+        Args:
+            idle_fps (float, optional): Dispatch rate while the scene is static. Defaults to 2.
+            max_fps (float, optional): Maximum dispatch rate. Defaults to 30.
+            min_fps (float, optional): Minimum dispatch rate when the handlers are slow. Defaults to 0.5.
+            motion_threshold (float, optional): Motion score starting a burst. Defaults to 0.1.
+            burst_sec (float, optional): Duration of a full-rate burst in seconds. Defaults to 2.
+            latency_budget (float, optional): Dispatch latency in seconds above which the rate is lowered.
+                Defaults to 0.2.
+
+        Raises:
+            ValueError: If the rates are not positive or not ordered min_fps <= idle_fps <= max_fps.
+        """
+        if not 0 < min_fps <= idle_fps <= max_fps:
+            raise ValueError("Rates must be positive, with min_fps <= idle_fps <= max_fps")
+        self._idle_fps = idle_fps
+        self._max_fps = max_fps
+        self._min_fps = min_fps
+        self._motion_threshold = motion_threshold
+        self._burst_sec = burst_sec
+        self._latency_budget = latency_budget
+
+        self._handlers: dict[str, Callable] = {}
+        self._all_handler: Callable | None = None
+        self._cond = threading.Condition()
+        self._pending: tuple[dict, float] | None = None  # (detections, arrival time)
+        self._last: dict = {}  # Last dispatched detections
+        self._last_dispatch = 0.0
+        self._burst_until = 0.0
+        self._rate = max_fps  # Current maximum dispatch rate
+        self._next_adapt = time.monotonic() + ADAPT_INTERVAL
+
+        self.received = 0
+        self.dispatched = 0
+        self.skipped = 0
+        self._latencies: deque[float] = deque(maxlen=100)
+        self._period_latency = 0.0  # Maximum latency since the last adaptation
+        self._window = (time.monotonic(), 0, 0)  # (start, received, dispatched) of the last statistics period
+        self._fps = (0.0, 0.0)  # (input, effective) FPS over the last statistics period
+
+    def on_detect(self, label: str, callback: Callable[[], None]):
+        """Register a callback invoked when a dispatched result contains the given label."""
+        self._handlers[label] = callback
+
+    def on_detect_all(self, callback: Callable[[dict], None]):
+        """Register a callback invoked with every dispatched result."""
+        self._all_handler = callback
+
+    def offer(self, detections: dict):
+        """Offer the detections of a frame, from a function registered with VideoObjectDetection.on_detect_all.
+
+        The brick only accepts plain functions, not bound methods like this one.
+        """
+        now = time.monotonic()
+        with self._cond:
+            self.received += 1
+            score = motion(self._last, detections)
+            if score >= self._motion_threshold:
+                self._burst_until = now + self._burst_sec
+            rate = self._rate if now < self._burst_until else min(self._idle_fps, self._rate)
+            if now - self._last_dispatch < 1.0 / rate:
+                self.skipped += 1
+                return
+            if self._pending is not None:
+                self.skipped += 1  # Replaced before it could be handled
+            self._pending = (detections, now)
+            self._last_dispatch = now
+            self._cond.notify()
+
+    def loop(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending is not None, timeout=ADAPT_INTERVAL)
+            pending, self._pending = self._pending, None
+            if pending is not None:
+                self._last = pending[0]
+        if pending is not None:
+            self._dispatch(*pending)
+        if time.monotonic() >= self._next_adapt:
+            self._adapt()
+
+    def _dispatch(self, detections: dict, arrived: float):
+        for label in detections:
+            handler = self._handlers.get(label)
+            if handler:
+                try:
+                    handler()
+                except Exception as e:
+                    logger.exception(f"Failed to handle '{label}': {e}")
+        if self._all_handler:
+            try:
+                self._all_handler(detections)
+            except Exception as e:
+                logger.exception(f"Failed to handle detections: {e}")
+        with self._cond:
+            self.dispatched += 1
+            latency = time.monotonic() - arrived
+            self._latencies.append(latency)
+            self._period_latency = max(self._period_latency, latency)
+
+    def _adapt(self):
+        now = time.monotonic()
+        self._next_adapt = now + ADAPT_INTERVAL
+        with self._cond:
+            latency, self._period_latency = self._period_latency, 0.0
+            start, received, dispatched = self._window
+            elapsed = now - start
+            self._fps = ((self.received - received) / elapsed, (self.dispatched - dispatched) / elapsed)
+            self._window = (now, self.received, self.dispatched)
+            if latency > self._latency_budget:
+                rate = max(self._rate / 2, self._min_fps)
+            else:
+                rate = min(self._rate * 1.25 + 0.5, self._max_fps)
+            if rate != self._rate:
+                logger.debug(f"Dispatch rate {self._rate:.1f} -> {rate:.1f} FPS (latency {latency * 1000:.0f} ms)")
+                self._rate = rate
+
+    def stats(self) -> dict:
+        """Return the scheduler statistics. FPS are over the last second, latencies over the last 100 results, in
+        milliseconds."""
+        with self._cond:
+            latencies = sorted(self._latencies)
+            return {
+                "input_fps": round(self._fps[0], 1),
+                "effective_fps": round(self._fps[1], 1),
+                "max_fps": round(self._rate, 1),
+                "burst": time.monotonic() < self._burst_until,
+                "received": self.received,
+                "dispatched": self.dispatched,
+                "skipped": self.skipped,
+                "latency_avg_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+                "latency_max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+            }
@@ -5,23 +5,36 @@
 from arduino.app_utils import App
 from arduino.app_bricks.web_ui import WebUI
 from arduino.app_bricks.video_objectdetection import VideoObjectDetection
-from datetime import datetime, UTC
+from detection_events import DetectionEvents
+from detection_scheduler import DetectionScheduler
+from handler_metrics import HandlerMetrics
 
 ui = WebUI()
+# Handlers are timed, and the measures served in the Prometheus format on /metrics
+metrics = HandlerMetrics(ui)
 detection_stream = VideoObjectDetection(confidence=0.5, debounce_sec=0.0)
+# Only a few results per second are handled while the scene is static, all of them when it moves
+scheduler = DetectionScheduler(idle_fps=2.0)
+
+# The brick only accepts plain functions as callbacks, not bound methods like scheduler.offer
+def on_detections(detections: dict):
+  scheduler.offer(detections)
+
+detection_stream.on_detect_all(metrics.timed("detection", "detect_all", on_detections))
+# One batched message per frame, only with what changed, at most 5 per second to each client.
+# Detections are kept for longer than the slowest scheduler rate (0.5 FPS) between results.
+detection_events = DetectionEvents(ui, "detection", max_rate=5.0, expire_after=3.0)
+
+ui.on_connect(detection_events.add_client)
+ui.on_disconnect(detection_events.remove_client)
 
 ui.on_message("override_th", lambda sid, threshold: detection_stream.override_threshold(threshold))
+ui.expose_api("GET", "/scheduler", scheduler.stats)
 
 # Register a callback for when all objects are detected
 def send_detections_to_ui(detections: dict):
-  for key, value in detections.items():
-    entry = {
-      "content": key,
-      "confidence": value.get("confidence"),
-      "timestamp": datetime.now(UTC).isoformat()
-    }
-    ui.send_message("detection", message=entry)
-
-detection_stream.on_detect_all(send_detections_to_ui)
+  detection_events.publish({key: value.get("confidence") for key, value in detections.items()})
+
+scheduler.on_detect_all(send_detections_to_ui)
 
 App.run()
@@ -6,6 +6,7 @@ const recentDetectionsElement = document.getElementById('recentClassifications')
 const feedbackContentElement = document.getElementById('feedback-content');
 const MAX_RECENT_SCANS = 5;
 let scans = [];
+let currentClassifications = {}; // label -> confidence, of what is currently in view
 const socket = io(`http://${window.location.host}`); // Initialize socket.io connection
 let errorContainer = document.getElementById('error-container');
 
@@ -58,7 +59,10 @@ function initSocketIO() {
         }
     });
 
+    // Each message has the classifications that changed since the previous one
     socket.on('classifications', async (message) => {
+        message.updated.forEach((detection) => { currentClassifications[detection.content] = detection.confidence; });
+        message.removed.forEach((label) => { delete currentClassifications[label]; });
         printClassifications(message);
         renderClasses();
     });
@@ -85,30 +89,20 @@ let lastChangeTimestamp = 0;
 let currentState = 'non-person';
 const UPDATE_INTERVAL = 2000; // 2 seconds
 
-function printClassifications(newDetection) {
-    scans.unshift(newDetection);
-    if (scans.length > MAX_RECENT_SCANS) { scans.pop(); }
-
-    // Parsing and handling the result for display
-    try {
-        const detections = JSON.parse(newDetection);
-        const personDetection = detections.find(d => d.content && d.content.toLowerCase() === 'person');
-        const newState = personDetection ? 'person' : 'non-person';
-        const now = Date.now();
-
-        if (newState !== currentState && (now - lastChangeTimestamp > UPDATE_INTERVAL)) {
-            showDetection(newState);
-            currentState = newState;
-            lastChangeTimestamp = now;
-        }
-    } catch (e) {
-        // In case of parsing error, show neutral state
-        const now = Date.now();
-        if ('non-person' !== currentState && (now - lastChangeTimestamp > UPDATE_INTERVAL)) {
-            showDetection('non-person');
-            currentState = 'non-person';
-            lastChangeTimestamp = now;
-        }
+function printClassifications(message) {
+    if (message.updated.length > 0) {
+        scans.unshift(message.updated.map((detection) => ({ ...detection, timestamp: message.timestamp })));
+        if (scans.length > MAX_RECENT_SCANS) { scans.pop(); }
+    }
+
+    const personDetection = Object.keys(currentClassifications).some(label => label.toLowerCase() === 'person');
+    const newState = personDetection ? 'person' : 'non-person';
+    const now = Date.now();
+
+    if (newState !== currentState && (now - lastChangeTimestamp > UPDATE_INTERVAL)) {
+        showDetection(newState);
+        currentState = newState;
+        lastChangeTimestamp = now;
     }
 }
 
@@ -126,14 +120,8 @@ function renderClasses() {
         return;
     }
 
-    scans.forEach((iscan) => {
+    scans.forEach((iiscan) => {
         try {
-            const iiscan = JSON.parse(iscan);
-
-            if (iiscan.length === 0) {
-                return; // Skip empty detection arrays
-            }
-
             iiscan.forEach((scan) => {
                 const row = document.createElement('div');
                 row.className = 'scan-container';
@@ -162,7 +150,7 @@ function renderClasses() {
                 recentDetectionsElement.appendChild(row);
             });
         } catch (e) {
-            console.error("Failed to parse scan data:", iscan, e);
+            console.error("Failed to render scan data:", iiscan, e);
             // Display an error in the list itself
             if(recentDetectionsElement.getElementsByClassName('scan-error').length === 0) {
                 const errorRow = document.createElement('div');
@@ -0,0 +1,196 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from bisect import bisect_left
+from collections.abc import Callable
+from contextlib import contextmanager
+import functools
+import math
+import threading
+import time
+from fastapi.responses import PlainTextResponse
+from arduino.app_utils import Bridge
+
+# Upper bounds in seconds of the duration histogram buckets, the last one catches everything slower
+DURATION_BUCKETS_S = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, math.inf)
+
+
+class Histogram:
+    """Counts of durations per bucket of DURATION_BUCKETS_S, with their sum."""
+
+    def __init__(self):
+        self.counts = [0] * len(DURATION_BUCKETS_S)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(DURATION_BUCKETS_S, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+
+def _labels(**labels) -> str:
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped))
+
+
+class HandlerMetrics:
+    """Times every handler of an App and publishes the measures in the Prometheus text format on `/metrics`.
+
+    Once a WebUI is instrumented, each callback registered with `ui.on_message` and `ui.expose_api` is wrapped:
+    its calls, errors and durations are recorded per handler, and each `ui.send_message` is counted and timed per
+    message type. Bridge handlers are instrumented the same way when registered with `provide` instead of
+    `Bridge.provide`, and any other callback, e.g. of a camera or detection brick, can be wrapped with `timed`.
+
+    Inside a handler, `stage` times a step of the processing, like decoding the upload or running the model, so
+    that the time of a request can be broken down. Steps running in another thread, e.g. an inference worker,
+    name the handler they belong to. All durations are measured with time.perf_counter.
+    """
+
+    def __init__(self, ui=None, path: str = "/metrics", prefix: str = "app"):
+        """Configure the metrics, and instrument the WebUI if given.
+
+        Args:
+            ui (WebUI, optional): WebUI whose handlers are timed and that serves the metrics. See `instrument`.
+            path (str, optional): Path of the metrics endpoint. Defaults to "/metrics".
+            prefix (str, optional): Prefix of the metric names. Defaults to "app".
+        """
+        self._path = path
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._local = threading.local()  # Handler running in the current thread
+        self._handlers: dict[tuple[str, str], list] = {}  # (kind, handler) -> [calls, errors, Histogram]
+        self._stages: dict[tuple[str, str], Histogram] = {}  # (handler, stage) -> Histogram
+        self._sends: dict[str, Histogram] = {}  # message type -> Histogram
+        if ui is not None:
+            self.instrument(ui)
+
+    def instrument(self, ui):
+        """Time the handlers registered on a WebUI from now on, and its messages, and serve the metrics on it.
+
+        Args:
+            ui (WebUI): Must be instrumented before its handlers are registered.
+        """
+        on_message, expose_api, send_message = ui.on_message, ui.expose_api, ui.send_message
+
+        def instrumented_on_message(message_type: str, callback: Callable):
+            on_message(message_type, self.timed("ws", message_type, callback))
+
+        def instrumented_expose_api(method: str, path: str, function: Callable):
+            expose_api(method, path, self.timed("http", f"{method} {path}", function))
+
+        def instrumented_send_message(message_type: str, message, room: str = None):
+            start = time.perf_counter()
+            try:
+                send_message(message_type, message, room=room)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    histogram = self._sends.get(message_type)
+                    if histogram is None:
+                        histogram = self._sends[message_type] = Histogram()
+                    histogram.observe(elapsed)
+                handler = getattr(self._local, "handler", None)
+                if handler is not None:
+                    self.observe("send", elapsed, handler)
+
+        ui.on_message = instrumented_on_message
+        ui.expose_api = instrumented_expose_api
+        ui.send_message = instrumented_send_message
+        expose_api("GET", self._path, self.render)
+
+    def provide(self, method: str, handler: Callable):
+        """Like Bridge.provide, with the handler timed."""
+        Bridge.provide(method, self.timed("bridge", method, handler))
+
+    def timed(self, kind: str, name: str, handler: Callable) -> Callable:
+        """Wrap a handler so that its calls, errors and durations are recorded.
+
+        The wrapper keeps the signature of the handler, which WebUI and the bricks inspect.
+
+        Args:
+            kind (str): Where the handler is called from, e.g. "ws", "http", "bridge", "camera".
+            name (str): Name of the handler, e.g. its message type or route.
+            handler (Callable): The handler.
+
+        Returns:
+            Callable: The timed handler.
+        """
+        key = (kind, name)
+        with self._lock:
+            self._handlers.setdefault(key, [0, 0, Histogram()])
+
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            outer = getattr(self._local, "handler", None)
+            self._local.handler = name
+            failed = True
+            start = time.perf_counter()
+            try:
+                result = handler(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                elapsed = time.perf_counter() - start
+                self._local.handler = outer
+                with self._lock:
+                    entry = self._handlers[key]
+                    entry[0] += 1
+                    entry[1] += failed
+                    entry[2].observe(elapsed)
+
+        return wrapper
+
+    @contextmanager
+    def stage(self, stage: str, handler: str | None = None):
+        """Time a step of the processing of a request, e.g. `with metrics.stage("image_decode"):`.
+
+        Args:
+            stage (str): Name of the step.
+            handler (str, optional): Handler the step belongs to. Defaults to the handler running in this thread.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, handler)
+
+    def observe(self, stage: str, seconds: float, handler: str | None = None):
+        """Record the duration of a step measured elsewhere, e.g. the time a request waited in a queue."""
+        handler = handler or getattr(self._local, "handler", None) or "none"
+        with self._lock:
+            histogram = self._stages.get((handler, stage))
+            if histogram is None:
+                histogram = self._stages[(handler, stage)] = Histogram()
+            histogram.observe(seconds)
+
+    def render(self) -> PlainTextResponse:
+        """Return the metrics in the Prometheus text exposition format."""
+        name = self._prefix
+        lines = []
+
+        def histogram(metric: str, labels: str, h: Histogram):
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS_S, h.counts):
+                cumulative += count
+                le = "+Inf" if math.isinf(bound) else repr(bound)
+                lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{metric}_sum{{{labels}}} {h.sum:.6f}")
+            lines.append(f"{metric}_count{{{labels}}} {h.count}")
+
+        with self._lock:
+            lines += [f"# HELP {name}_handler_calls_total Calls of each handler.", f"# TYPE {name}_handler_calls_total counter"]
+            lines += [f"{name}_handler_calls_total{{{_labels(kind=k, handler=h)}}} {e[0]}" for (k, h), e in self._handlers.items()]
+            lines += [f"# HELP {name}_handler_errors_total Calls of each handler that raised.", f"# TYPE {name}_handler_errors_total counter"]
+            lines += [f"{name}_handler_errors_total{{{_labels(kind=k, handler=h)}}} {e[1]}" for (k, h), e in self._handlers.items()]
+            lines += [f"# HELP {name}_handler_duration_seconds Duration of each handler call.", f"# TYPE {name}_handler_duration_seconds histogram"]
+            for (k, h), e in self._handlers.items():
+                histogram(f"{name}_handler_duration_seconds", _labels(kind=k, handler=h), e[2])
+            lines += [f"# HELP {name}_stage_duration_seconds Duration of each step of the handlers.", f"# TYPE {name}_stage_duration_seconds histogram"]
+            for (h, s), stage_histogram in self._stages.items():
+                histogram(f"{name}_stage_duration_seconds", _labels(handler=h, stage=s), stage_histogram)
+            lines += [f"# HELP {name}_send_duration_seconds Time to send each WebSocket message, by type.", f"# TYPE {name}_send_duration_seconds histogram"]
+            for message_type, send_histogram in self._sends.items():
+                histogram(f"{name}_send_duration_seconds", _labels(type=message_type), send_histogram)
+        return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
@@ -5,11 +5,18 @@
 from arduino.app_utils import App
 from arduino.app_bricks.web_ui import WebUI
 from arduino.app_bricks.video_imageclassification import VideoImageClassification
-from datetime import datetime, UTC
-import json
+from detection_events import DetectionEvents
+from handler_metrics import HandlerMetrics
 
 ui = WebUI()
+# Handlers are timed, and the measures served in the Prometheus format on /metrics
+metrics = HandlerMetrics(ui)
 detection_stream = VideoImageClassification(confidence=0.5, debounce_sec=0.0)
+# One batched message per frame, only with what changed, at most 5 per second to each client
+detection_events = DetectionEvents(ui, "classifications", max_rate=5.0)
+
+ui.on_connect(detection_events.add_client)
+ui.on_disconnect(detection_events.remove_client)
 
 ui.on_message("override_th", lambda sid, threshold: detection_stream.override_threshold(threshold))
 
@@ -21,22 +28,8 @@ detection_stream.on_detect("person", person_detected)
 
 # Example usage: Register a callback for when all objects are detected
 def send_detections_to_ui(classifications: dict):
-  if len(classifications) == 0:
-      return
-      
-  entries = []
-  for key, value in classifications.items():
-    entry = {
-      "content": key,
-      "confidence": value,
-      "timestamp": datetime.now(UTC).isoformat()
-    }
-    entries.append(entry)    
-  
-  if len(entries) > 0:
-    msg = json.dumps(entries)
-    ui.send_message("classifications", message=msg)
-
-detection_stream.on_detect_all(send_detections_to_ui)
+  detection_events.publish(classifications)
+
+detection_stream.on_detect_all(metrics.timed("detection", "detect_all", send_detections_to_ui))
 
 App.run()
@@ -0,0 +1,139 @@
+# SPDX-FileCopyrightText: Copyright (C) ARDUINO SRL (http://www.arduino.cc)
+#
+# SPDX-License-Identifier: MPL-2.0
+
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+import threading
+import time
+from typing import Any
+from arduino.app_utils import Logger
+
+logger = Logger("ForecastCache")
+
+
+class _Flight:
+    """A fetch in progress, shared by every caller asking for the same key meanwhile."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Exception | None = None
+
+
+class ForecastCache:
+    """Size-bounded TTL cache in front of a slow fetch function, with request coalescing.
+
+    A value is fetched at most once per `ttl` for each key. Concurrent callers asking for a key that is being
+    fetched wait for that single fetch instead of starting their own (single-flight). When more than
+    `max_entries` keys are cached, the least recently used one is evicted. If a fetch fails and an expired value
+    is still cached, the expired value is returned instead of the error.
+
+    Hits, misses, coalesced calls, errors, evictions and fetch latencies are counted, see `stats()`.
+    """
+
+    def __init__(self, fetch: Callable[[Any], Any], ttl: float = 900.0, max_entries: int = 16, key: Callable[[Any], Hashable] = None):
+        """Configure the cache.
+
+        Args:
+            fetch (Callable[[Any], Any]): Called with the requested argument to get a value not cached yet.
+            ttl (float, optional): Time in seconds a fetched value is used for. Defaults to 900.
+            max_entries (int, optional): Maximum number of cached values. Defaults to 16.
+            key (Callable[[Any], Hashable], optional): Computes the cache key of an argument. Defaults to the
+                argument itself.
+
+        Raises:
+            ValueError: If ttl or max_entries is not positive.
+        """
+        if ttl <= 0 or max_entries <= 0:
+            raise ValueError("ttl and max_entries must be positive")
+        self._fetch = fetch
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._key = key or (lambda arg: arg)
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()  # key -> (expiry, value)
+        self._flights: dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.evictions = 0
+        self._fetch_count = 0
+        self._fetch_total = 0.0
+        self._fetch_max = 0.0
+
+    def get(self, arg: Any) -> Any:
+        """Return the cached value for arg, fetching it if missing or expired.
+
+        Raises:
+            Exception: Whatever the fetch function raised, if there is no expired value to fall back to.
+        """
+        key = self._key(arg)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            self._run(key, arg, flight)
+        else:
+            flight.done.wait()
+
+        if flight.error is None:
+            return flight.value
+        if entry is not None:
+            logger.warning(f"Failed to refresh '{key}', using the expired value: {flight.error}")
+            return entry[1]
+        raise flight.error
+
+    def _run(self, key: Hashable, arg: Any, flight: _Flight):
+        started = time.monotonic()
+        try:
+            flight.value = self._fetch(arg)
+        except Exception as e:
+            flight.error = e
+        elapsed = time.monotonic() - started
+
+        with self._lock:
+            self._fetch_count += 1
+            self._fetch_total += elapsed
+            self._fetch_max = max(self._fetch_max, elapsed)
+            if flight.error is None:
+                self._entries[key] = (time.monotonic() + self._ttl, flight.value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self.errors += 1
+            del self._flights[key]
+        flight.done.set()
+        logger.info(f"Fetched '{key}' in {elapsed * 1000:.0f} ms. {self.stats()}")
+
+    def stats(self) -> dict:
+        """Return the cache statistics. Latencies are in milliseconds."""
+        with self._lock:
+            requests = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / requests, 3) if requests else None,
+                "fetch_avg_ms": round(self._fetch_total / self._fetch_count * 1000, 1) if self._fetch_count else None,
+                "fetch_max_ms": round(self._fetch_max * 1000, 1) if self._fetch_count else None,
+            }
@@ -4,12 +4,17 @@
 
 from arduino.app_bricks.weather_forecast import WeatherForecast
 from arduino.app_utils import *
+from forecast_cache import ForecastCache
 
 forecaster = WeatherForecast()
 
+# Forecasts change slowly: each city is looked up at most every 15 minutes, and concurrent
+# requests for the same city share a single lookup. Up to 16 cities are kept.
+forecasts = ForecastCache(forecaster.get_forecast_by_city, ttl=900, max_entries=16, key=lambda city: city.strip().lower())
+
 
 def get_weather_forecast(city: str) -> str:
-    forecast = forecaster.get_forecast_by_city(city)
+    forecast = forecasts.get(city)
     print(f"Weather forecast for {city}: {forecast.description}")
     return forecast.category
 